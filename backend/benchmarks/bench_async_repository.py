@@ -0,0 +1,146 @@
+"""Compare concurrent dashboard refreshes on the sync and asyncio repository paths.
+
+Run from the backend directory (a throwaway SQLite file is used unless DATABASE_URL is set):
+
+    PYTHONPATH=src python benchmarks/bench_async_repository.py --users 200 --days 30
+
+Modes:
+  sync-inline   blocking ``PostgresRepository`` called straight from the coroutines
+  sync-thread   the same repository offloaded with ``asyncio.to_thread``
+  async         ``AsyncPostgresRepository`` (aiosqlite/asyncpg)
+
+Besides requests/s the benchmark reports the worst event-loop lag observed by a 1 ms ticker,
+which is what other requests on the same worker feel while a query is running.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from agents.planner import PlannerAgent
+from core.models import DailyLog, FoodPortion, MealEntry, UserProfile
+from core.serialization import plan_from_json, profile_to_json
+
+
+def _profile(name: str) -> UserProfile:
+    return UserProfile(
+        name=name,
+        age=35,
+        weight_kg=72,
+        height_cm=175,
+        sex="female",
+        activity_level="moderate",
+        goal="maintain",
+        systolic_bp=118,
+        diastolic_bp=76,
+        sodium_mg=1600,
+    )
+
+
+def _log(user: str, day: datetime) -> DailyLog:
+    return DailyLog(
+        user=user,
+        date=day,
+        meals=[
+            MealEntry(
+                timestamp=day.replace(hour=13),
+                description="Almoço",
+                items=[
+                    FoodPortion(label="grilled chicken", quantity=120, unit="g"),
+                    FoodPortion(label="brown rice", quantity=150, unit="g"),
+                ],
+            )
+        ],
+    )
+
+
+async def _seed(users: list[str], days: int) -> None:
+    from database.postgres import get_repository
+
+    repository = get_repository()
+    repository.reset()
+    start = datetime(2024, 1, 1)
+    for user in users:
+        profile = _profile(user)
+        plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(profile)}))["plan"])
+        repository.upsert_profile(profile)
+        repository.save_plan(plan)
+        for offset in range(days):
+            repository.append_log(_log(user, start + timedelta(days=offset)))
+
+
+async def _ticker(stop: asyncio.Event, lags: list[float]) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + 0.001
+        await asyncio.sleep(0.001)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+def _repository(mode: str):
+    from database.async_repository import AsyncPostgresRepository, SyncRepositoryAdapter
+    from database.postgres import get_repository
+
+    if mode == "sync-inline":
+        return SyncRepositoryAdapter(get_repository(), offload=False)
+    if mode == "sync-thread":
+        return SyncRepositoryAdapter(get_repository())
+    return AsyncPostgresRepository()
+
+
+async def _measure(mode: str, users: list[str], concurrency: int) -> None:
+    from core.orchestrator import Orchestrator
+
+    orchestrator = Orchestrator(logging.getLogger("bench"), repository=_repository(mode))
+    await orchestrator.refresh_dashboard(users[0], trace_id="warmup")
+    orchestrator.stage_cache.clear()
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def refresh(user: str) -> None:
+        async with semaphore:
+            await orchestrator.refresh_dashboard(user, trace_id=f"bench-{user}")
+
+    stop = asyncio.Event()
+    lags: list[float] = []
+    ticker = asyncio.create_task(_ticker(stop, lags))
+    started = time.perf_counter()
+    await asyncio.gather(*(refresh(user) for user in users))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await ticker
+    max_lag_ms = max(lags, default=0.0) * 1000
+    print(
+        f"{mode:<12} {len(users) / elapsed:>10.1f} req/s "
+        f"{elapsed * 1000:>10.1f} ms total {max_lag_ms:>8.1f} ms max loop lag"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument(
+        "--modes", nargs="+", default=["sync-inline", "sync-thread", "async"]
+    )
+    args = parser.parse_args()
+
+    users = [f"bench-{idx:04d}" for idx in range(args.users)]
+    await _seed(users, args.days)
+    print(f"users={args.users} days={args.days} concurrency={args.concurrency}")
+    for mode in args.modes:
+        await _measure(mode, users, args.concurrency)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.setdefault("DATABASE_URL", f"sqlite+pysqlite:///{workdir}/bench.db")
+        logging.disable(logging.INFO)
+        asyncio.run(main())
@@ -0,0 +1,141 @@
+"""Bytes per entry and encode/decode time of each dashboard cache codec.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/bench_cache_codecs.py --logs 30 --rounds 500
+
+The dashboard comes from the real pipeline (planner, calc, trend, coach, UI agents) over
+``--logs`` diary days in an in-memory repository. For each serializer and compression pair
+the benchmark reports the stored blob size (header included, as ``set_dashboard`` writes it)
+and the median time to encode a dashboard, to decode it back into a ``DashboardState`` and
+to produce the JSON body ``GET /dashboard`` splices into its response. Pairs whose optional
+package (``orjson``, ``msgpack``, ``zstandard``) is not installed are listed as skipped.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from datetime import datetime, timedelta
+from functools import partial
+from typing import Callable
+
+from agents.planner import PlannerAgent
+from core.cache import RedisDashboardCache
+from core.codecs import COMPRESSIONS, SERIALIZERS, CacheCodec, CodecUnavailableError
+from core.models import DailyLog, FoodPortion, MealEntry, UserProfile
+from core.orchestrator import Orchestrator
+from core.serialization import plan_from_json, profile_to_json
+from database.memory import MemoryRepository
+from domain.entities import DashboardState
+
+USER = "bench-user"
+
+
+class DictRedis:
+    def __init__(self) -> None:
+        self.store: dict[str, bytes] = {}
+
+    def get(self, key: str) -> bytes | None:
+        return self.store.get(key)
+
+    def set(self, key: str, value, ex=None, px=None, nx: bool = False) -> bool | None:
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def delete(self, key: str) -> None:
+        self.store.pop(key, None)
+
+
+async def _dashboard(logs: int) -> DashboardState:
+    profile = UserProfile(
+        name=USER,
+        age=35,
+        weight_kg=72,
+        height_cm=175,
+        sex="female",
+        activity_level="moderate",
+        goal="maintain",
+        systolic_bp=118,
+        diastolic_bp=76,
+        sodium_mg=1600,
+    )
+    repository = MemoryRepository()
+    repository.upsert_profile(profile)
+    repository.save_plan(
+        plan_from_json((await PlannerAgent()({"profile": profile_to_json(profile)}))["plan"])
+    )
+    start = datetime(2024, 1, 1, 12, 0)
+    for offset in range(logs):
+        day = start + timedelta(days=offset)
+        repository.append_log(
+            DailyLog(
+                user=USER,
+                date=day,
+                meals=[
+                    MealEntry(
+                        timestamp=day,
+                        description="almoço",
+                        items=[
+                            FoodPortion(label="grilled chicken breast", quantity=150, unit="g"),
+                            FoodPortion(label="brown rice", quantity=180, unit="g"),
+                            FoodPortion(label="water", quantity=500, unit="ml"),
+                        ],
+                    )
+                ],
+            )
+        )
+    orchestrator = Orchestrator(logging.getLogger("bench"), repository=repository)
+    return await orchestrator.refresh_dashboard(USER)
+
+
+def _median_us(action: Callable[[], object], rounds: int) -> float:
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        action()
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    return statistics.median(samples)
+
+
+def _run(logs: int, rounds: int, min_bytes: int) -> None:
+    dashboard = asyncio.run(_dashboard(logs))
+    print(f"logs={logs} rounds={rounds} compress_min_bytes={min_bytes}")
+    print(f"{'codec':<16} {'bytes':>8} {'encode':>10} {'decode':>10} {'body':>10}")
+    for serializer in SERIALIZERS:
+        for compression in COMPRESSIONS:
+            try:
+                codec = CacheCodec(serializer, compression, min_bytes)
+            except CodecUnavailableError as exc:
+                print(f"{serializer}+{compression:<{15 - len(serializer)}} skipped: {exc}")
+                continue
+            redis = DictRedis()
+            cache = RedisDashboardCache(client=redis, codec=codec)
+            cache.set_dashboard(USER, dashboard)
+            assert cache.get_dashboard(USER) == dashboard
+            size = len(redis.store[f"dashboard:{USER}"])
+            encode = _median_us(partial(cache.set_dashboard, USER, dashboard), rounds)
+            decode = _median_us(partial(cache.get_cached, USER), rounds)
+            body = _median_us(partial(cache.get_cached, USER, body=True), rounds)
+            print(
+                f"{codec.name:<16} {size:>8} {encode:>8.1f}us {decode:>8.1f}us {body:>8.1f}us"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logs", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=500)
+    parser.add_argument("--compress-min-bytes", type=int, default=1024)
+    args = parser.parse_args()
+    _run(args.logs, args.rounds, args.compress_min_bytes)
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
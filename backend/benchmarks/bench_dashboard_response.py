@@ -0,0 +1,190 @@
+"""Serve a cached dashboard through GET /dashboard: pre-encoded bytes vs. decode and re-encode.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/bench_dashboard_response.py --requests 2000 --logs 30
+
+Both apps answer from the same Redis-style cache (an in-memory dict standing in for the
+server) and are driven through their ASGI interface with authentication stubbed out, so the
+numbers isolate the response path. ``legacy`` is the previous handler: decode the blob into
+a ``DashboardState``, ``dashboard_to_json`` it, wrap it in ``Envelope[DashboardResponse]``
+and let FastAPI validate and serialize. ``bytes`` is the current route, which splices the
+cached JSON into the envelope. The benchmark checks both bodies carry the same dashboard.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("AUTH_SECRET", "bench-secret-0123456789")
+os.environ.setdefault("DATABASE_URL", "sqlite+pysqlite:///:memory:")
+
+from fastapi import FastAPI, Request
+
+from agents.planner import PlannerAgent
+from api import router as api_router
+from api.schemas import DashboardResponse, Envelope, ResponseMeta
+from api.security import AuthContext, _authenticate
+from core.cache import RedisDashboardCache
+from core.models import DailyLog, FoodPortion, MealEntry, UserProfile
+from core.orchestrator import Orchestrator
+from core.serialization import dashboard_to_json, plan_from_json, profile_to_json
+from database.memory import MemoryRepository
+
+USER = "bench-user"
+
+
+class DictRedis:
+    def __init__(self) -> None:
+        self.store: dict[str, bytes] = {}
+
+    def get(self, key: str) -> bytes | None:
+        return self.store.get(key)
+
+    def set(self, key: str, value, ex=None, px=None, nx: bool = False) -> bool | None:
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def delete(self, key: str) -> None:
+        self.store.pop(key, None)
+
+
+async def _orchestrator(logs: int) -> Orchestrator:
+    profile = UserProfile(
+        name=USER,
+        age=35,
+        weight_kg=72,
+        height_cm=175,
+        sex="female",
+        activity_level="moderate",
+        goal="maintain",
+        systolic_bp=118,
+        diastolic_bp=76,
+        sodium_mg=1600,
+    )
+    repository = MemoryRepository()
+    repository.upsert_profile(profile)
+    repository.save_plan(
+        plan_from_json((await PlannerAgent()({"profile": profile_to_json(profile)}))["plan"])
+    )
+    start = datetime(2024, 1, 1, 12, 0)
+    for offset in range(logs):
+        day = start + timedelta(days=offset)
+        repository.append_log(
+            DailyLog(
+                user=USER,
+                date=day,
+                meals=[
+                    MealEntry(
+                        timestamp=day,
+                        description="almoço",
+                        items=[
+                            FoodPortion(label="grilled chicken breast", quantity=150, unit="g"),
+                            FoodPortion(label="brown rice", quantity=180, unit="g"),
+                            FoodPortion(label="water", quantity=500, unit="ml"),
+                        ],
+                    )
+                ],
+            )
+        )
+    orchestrator = Orchestrator(
+        logging.getLogger("bench"),
+        repository=repository,
+        cache=RedisDashboardCache(client=DictRedis()),
+    )
+    await orchestrator.refresh_dashboard(USER)
+    return orchestrator
+
+
+def _apps(orchestrator: Orchestrator) -> dict[str, FastAPI]:
+    api_router.orchestrator = orchestrator
+    current = FastAPI()
+    current.include_router(api_router.router)
+
+    legacy = FastAPI()
+
+    @legacy.get("/api/v1/dashboard/{user}", response_model=Envelope[DashboardResponse])
+    async def legacy_dashboard(user: str, request: Request) -> Envelope[DashboardResponse]:
+        board = await orchestrator.refresh_dashboard(user, trace_id="trace-bench")
+        return Envelope(
+            data=DashboardResponse(dashboard=dashboard_to_json(board)),
+            meta=ResponseMeta(trace_id="trace-bench", actor=user),
+        )
+
+    auth = AuthContext(subject=USER, scopes=["dashboard:read"], issued_at=datetime.now(timezone.utc))
+    for app in (current, legacy):
+        app.dependency_overrides[_authenticate] = lambda: auth
+    return {"legacy": legacy, "bytes": current}
+
+
+async def _get(app: FastAPI, path: str) -> bytes:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"x-trace-id", b"trace-bench")],
+        "client": ("bench", 1234),
+        "server": ("bench", 80),
+    }
+    chunks: list[bytes] = []
+
+    async def receive() -> dict:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict) -> None:
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return b"".join(chunks)
+
+
+async def _run(requests: int, logs: int) -> None:
+    orchestrator = await _orchestrator(logs)
+    apps = _apps(orchestrator)
+    path = f"/api/v1/dashboard/{USER}"
+    bodies = {name: await _get(app, path) for name, app in apps.items()}
+    documents = {name: json.loads(body) for name, body in bodies.items()}
+    same = documents["legacy"]["data"]["dashboard"] == documents["bytes"]["data"]["dashboard"]
+    print(f"logs={logs} body={len(bodies['bytes'])} bytes same_document={'yes' if same else 'NO'}")
+    for name, app in apps.items():
+        for _ in range(50):
+            await _get(app, path)
+        samples = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            await _get(app, path)
+            samples.append((time.perf_counter() - started) * 1_000_000)
+        p99 = statistics.quantiles(samples, n=100)[98]
+        print(
+            f"{name:<7} p50={statistics.median(samples):>8.1f} us  p99={p99:>8.1f} us  "
+            f"{1_000_000 / statistics.mean(samples):>8.0f} req/s"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--logs", type=int, default=30)
+    args = parser.parse_args()
+    asyncio.run(_run(args.requests, args.logs))
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
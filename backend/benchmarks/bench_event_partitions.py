@@ -0,0 +1,136 @@
+"""Diary bursts from many users through the partitioned event bus at different worker counts.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/bench_event_partitions.py --users 1000 --workers 1 4 16 64
+
+Every user posts a diary at the same moment, twice in a row; ``POST /diary`` is modelled by
+``Orchestrator.ingest_diary``, which returns once ``calc.requested`` is enqueued. The
+repository is in memory with ``--io-ms`` of simulated round-trip per call, standing in for a
+remote database, so the scaling comes from overlapping I/O across user partitions. The
+benchmark reports diary latency, the time until every pipeline finished, and checks that
+each user's events ran in publish order. ``--batch-max 1`` delivers ``calc.requested`` one
+event at a time; larger batches read every user's snapshot in one unit of work.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from dataclasses import replace
+from typing import Any, Callable, TypeVar
+
+from agents.planner import PlannerAgent
+from core.models import UserProfile
+from core.serialization import plan_from_json, profile_to_json
+
+T = TypeVar("T")
+
+
+def _profile(name: str) -> UserProfile:
+    return UserProfile(
+        name=name,
+        age=35,
+        weight_kg=72,
+        height_cm=175,
+        sex="female",
+        activity_level="moderate",
+        goal="maintain",
+        systolic_bp=118,
+        diastolic_bp=76,
+        sodium_mg=1600,
+    )
+
+
+async def _repository(users: list[str], io_ms: float):
+    from database.async_repository import SyncRepositoryAdapter
+    from database.memory import MemoryRepository
+
+    class RemoteRepository(SyncRepositoryAdapter):
+        """In-memory data behind a fixed per-call latency."""
+
+        async def _call(self, method: Callable[..., T], *args: Any) -> T:
+            await asyncio.sleep(io_ms / 1000)
+            return method(*args)
+
+    memory = MemoryRepository()
+    template = _profile("template")
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(template)}))["plan"])
+    for user in users:
+        memory.upsert_profile(_profile(user))
+        memory.save_plan(replace(plan, user=user))
+    return RemoteRepository(memory, offload=False)
+
+
+async def _measure(
+    users: list[str], workers: int, partitions: int, io_ms: float, batch_max: int
+) -> None:
+    from core.orchestrator import Orchestrator
+    from services.event_bus import AsyncEventBus, Event
+
+    bus = AsyncEventBus(
+        logging.getLogger("bench"), workers=workers, partitions=partitions, max_queue=2 * len(users)
+    )
+    orchestrator = Orchestrator(
+        logging.getLogger("bench"), repository=await _repository(users, io_ms), event_bus=bus
+    )
+    order: dict[str, list[str]] = {}
+    handler = bus.batch_handlers["calc.requested"].handler
+    batches: list[int] = []
+
+    async def recording_handler(events: list[Event]) -> None:
+        batches.append(len(events))
+        for event in events:
+            order.setdefault(event.payload["user"], []).append(event.trace_id)
+        await handler(events)
+
+    bus.register_batch("calc.requested", recording_handler, max_batch=batch_max)
+    latencies: list[float] = []
+
+    async def post_diary(user: str, seq: int) -> None:
+        started = time.perf_counter()
+        await orchestrator.ingest_diary(
+            user, ["almoço: 120g frango grelhado e 150g arroz integral"], trace_id=f"{user}-{seq}"
+        )
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(post_diary(user, 0) for user in users))
+    await asyncio.gather(*(post_diary(user, 1) for user in users))
+    accepted = time.perf_counter() - started
+    await bus.stop()
+    elapsed = time.perf_counter() - started
+
+    ordered = all(trace_ids == [f"{user}-0", f"{user}-1"] for user, trace_ids in order.items())
+    p99 = statistics.quantiles(latencies, n=100)[98]
+    print(
+        f"workers={workers:<4} {len(latencies) / elapsed:>9.1f} pipelines/s "
+        f"{elapsed * 1000:>9.1f} ms total  diary p50={statistics.median(latencies):>7.2f} ms "
+        f"p99={p99:>7.2f} ms  accepted in {accepted * 1000:>7.1f} ms "
+        f"calc batch={statistics.mean(batches):>5.1f} fifo={'ok' if ordered else 'BROKEN'}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--partitions", type=int, default=256)
+    parser.add_argument("--io-ms", type=float, default=2.0)
+    parser.add_argument("--batch-max", type=int, nargs="+", default=[1, 64])
+    args = parser.parse_args()
+
+    users = [f"bench-{idx:04d}" for idx in range(args.users)]
+    print(f"users={args.users} partitions={args.partitions} io_ms={args.io_ms}")
+    for batch_max in args.batch_max:
+        print(f"calc.requested batch_max={batch_max}")
+        for workers in args.workers:
+            asyncio.run(_measure(users, workers, args.partitions, args.io_ms, batch_max))
+
+
+if __name__ == "__main__":
+    logging.disable(logging.INFO)
+    main()
@@ -0,0 +1,104 @@
+"""Cost of profile and plan reads with and without the repository cache.
+
+Run from the backend directory (a throwaway SQLite file is used unless DATABASE_URL is set):
+
+    PYTHONPATH=src python benchmarks/bench_repository_cache.py --users 200 --rounds 20
+
+Every round reads each user's profile and latest plan through ``PostgresRepository``, then
+takes one batched pipeline snapshot of all users, as ``calc.requested`` batches do. With the
+cache on, each read still runs the cheap version query (``user_profiles.version`` or
+``MAX(nutrition_plans.version)``) but skips fetching the payload and ``plan_from_json``; the
+gap between the two modes is what the cache saves per read.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from agents.planner import PlannerAgent
+from core.models import UserProfile
+from core.serialization import plan_from_json, profile_to_json
+
+
+def _profile(name: str) -> UserProfile:
+    return UserProfile(
+        name=name,
+        age=35,
+        weight_kg=72,
+        height_cm=175,
+        sex="female",
+        activity_level="moderate",
+        goal="maintain",
+        systolic_bp=118,
+        diastolic_bp=76,
+        sodium_mg=1600,
+    )
+
+
+async def _seed(users: list[str]) -> None:
+    from database.postgres import PostgresRepository
+
+    repository = PostgresRepository()
+    repository.reset()
+    for user in users:
+        profile = _profile(user)
+        plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(profile)}))["plan"])
+        repository.upsert_profile(profile)
+        repository.save_plan(plan)
+
+
+def _measure(mode: str, users: list[str], rounds: int, history: int) -> None:
+    from database.caching import RepositoryCache
+    from database.postgres import PostgresRepository
+
+    cache = RepositoryCache(max_entries=len(users)) if mode == "cache" else None
+    repository = PostgresRepository(cache=cache)
+    reads: list[float] = []
+    snapshots: list[float] = []
+    # the first round only fills the cache
+    for round_idx in range(rounds + 1):
+        started = time.perf_counter()
+        for user in users:
+            repository.get_profile(user)
+            repository.latest_plan(user)
+        elapsed = time.perf_counter() - started
+        with repository.unit_of_work() as work:
+            snapshot_started = time.perf_counter()
+            work.snapshots(users, history)
+            snapshot_elapsed = time.perf_counter() - snapshot_started
+        if round_idx:
+            reads.append(elapsed / (2 * len(users)))
+            snapshots.append(snapshot_elapsed)
+    hit_ratio = cache.stats()["plan"]["hit_ratio"] if cache is not None else 0.0
+    print(
+        f"{mode:<8} {statistics.median(reads) * 1e6:>10.1f} us/read "
+        f"{statistics.median(snapshots) * 1000:>10.2f} ms/snapshot batch "
+        f"{hit_ratio:>8.2f} plan hit ratio"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--history", type=int, default=30)
+    args = parser.parse_args()
+
+    users = [f"bench-{idx:04d}" for idx in range(args.users)]
+    await _seed(users)
+    print(f"users={args.users} rounds={args.rounds}")
+    for mode in ("no-cache", "cache"):
+        _measure(mode, users, args.rounds, args.history)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.setdefault("DATABASE_URL", f"sqlite+pysqlite:///{workdir}/bench.db")
+        logging.disable(logging.INFO)
+        asyncio.run(main())
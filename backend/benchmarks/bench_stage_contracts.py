@@ -0,0 +1,178 @@
+"""Compare the JSON agent contracts with the typed in-process ones.
+
+Run from the backend directory:
+
+    PYTHONPATH=src python benchmarks/bench_stage_contracts.py --days 365
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from agents.calc import CalcAgent
+from agents.coach import CoachAgent
+from agents.planner import PlannerAgent
+from agents.trend import TrendAgent
+from agents.ui import UIAgent
+from core.models import DailyLog, FoodPortion, MealEntry, NutritionPlan, UserProfile
+from core.serialization import (
+    coaching_from_json,
+    dashboard_from_json,
+    log_to_json,
+    macro_from_json,
+    macro_to_json,
+    micro_from_json,
+    micro_to_json,
+    plan_from_json,
+    plan_to_json,
+    profile_to_json,
+    trend_from_json,
+    trend_to_json,
+)
+
+PROFILE = UserProfile(
+    name="bench-user",
+    age=35,
+    weight_kg=72,
+    height_cm=175,
+    sex="female",
+    activity_level="moderate",
+    goal="maintain",
+    systolic_bp=118,
+    diastolic_bp=76,
+    sodium_mg=1600,
+)
+
+
+def _history(days: int) -> list[DailyLog]:
+    start = datetime(2024, 1, 1)
+    logs = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        logs.append(
+            DailyLog(
+                user=PROFILE.name,
+                date=day,
+                meals=[
+                    MealEntry(
+                        timestamp=day.replace(hour=hour),
+                        description=label,
+                        items=[
+                            FoodPortion(label="grilled chicken", quantity=120 + offset % 30, unit="g"),
+                            FoodPortion(label="brown rice", quantity=150, unit="g"),
+                            FoodPortion(label="water", quantity=300, unit="ml"),
+                        ],
+                    )
+                    for hour, label in ((8, "Café"), (13, "Almoço"), (20, "Jantar"))
+                ],
+            )
+        )
+    return logs
+
+
+class _Agents:
+    def __init__(self) -> None:
+        self.calc = CalcAgent()
+        self.trend = TrendAgent()
+        self.coach = CoachAgent()
+        self.ui = UIAgent()
+
+
+async def json_pipeline(agents: _Agents, plan: NutritionPlan, logs: list[DailyLog]) -> None:
+    calc = await agents.calc(
+        {"plan": plan_to_json(plan), "log": log_to_json(logs[-1]), "profile": profile_to_json(PROFILE)}
+    )
+    macros = macro_from_json(calc["macros"])
+    micros = micro_from_json(calc["micros"])
+    trends_json = (await agents.trend({"logs": [log_to_json(log) for log in logs]}))["trends"]
+    trends = [trend_from_json(item) for item in trends_json]
+    coach = await agents.coach(
+        {
+            "macros": macro_to_json(macros),
+            "targets": macro_to_json(plan.macro_targets),
+            "micros": micro_to_json(micros),
+            "trends": [trend_to_json(trend) for trend in trends],
+        }
+    )
+    messages = [coaching_from_json(item) for item in coach["messages"]]
+    ui = await agents.ui(
+        {
+            "user": PROFILE.name,
+            "plan": plan_to_json(plan),
+            "targets": macro_to_json(plan.macro_targets),
+            "actuals": macro_to_json(macros),
+            "micros": micro_to_json(micros),
+            "micro_targets": micro_to_json(plan.micro_targets),
+            "hydration_target": plan.hydration.total_liters,
+            "hydration_actual": calc["hydration_l"],
+            "charts": [],
+            "messages": [{"title": m.title, "body": m.body, "severity": m.severity} for m in messages],
+            "logs": [log_to_json(log) for log in logs],
+            "calc_alerts": calc["alerts"],
+        }
+    )
+    dashboard_from_json(ui["dashboard"])
+
+
+async def typed_pipeline(agents: _Agents, plan: NutritionPlan, logs: list[DailyLog]) -> None:
+    calc = agents.calc.calculate(plan, logs[-1], PROFILE)
+    trends = agents.trend.analyze(logs)
+    messages = agents.coach.compose(calc.macros, plan.macro_targets, calc.micros, trends)
+    agents.ui.render(
+        user=PROFILE.name,
+        plan=plan,
+        macros_actual=calc.macros,
+        macros_target=plan.macro_targets,
+        micros_actual=calc.micros,
+        micro_targets=plan.micro_targets,
+        hydration_target=plan.hydration.total_liters,
+        hydration_actual=calc.hydration_l,
+        logs=logs,
+        charts=[],
+        messages=messages,
+        calc_alerts=calc.alerts,
+    )
+
+
+async def _measure(
+    name: str,
+    pipeline: Callable[[_Agents, NutritionPlan, list[DailyLog]], Awaitable[None]],
+    agents: _Agents,
+    plan: NutritionPlan,
+    logs: list[DailyLog],
+    iterations: int,
+) -> None:
+    await pipeline(agents, plan, logs)  # warm-up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await pipeline(agents, plan, logs)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / iterations
+
+    tracemalloc.start()
+    await pipeline(agents, plan, logs)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<8} {elapsed_ms:>10.2f} ms/run {peak / 1024:>10.1f} KiB peak allocation")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(PROFILE)}))["plan"])
+    logs = _history(args.days)
+    agents = _Agents()
+    print(f"history={args.days} days iterations={args.iterations}")
+    await _measure("json", json_pipeline, agents, plan, logs, args.iterations)
+    await _measure("typed", typed_pipeline, agents, plan, logs, args.iterations)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20241016_0002"
+down_revision = "20240601_0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "nutrition_plans",
+        sa.Column("version", sa.Integer(), nullable=False, server_default="1"),
+    )
+    # number existing plans per user in creation order before enforcing uniqueness
+    op.execute(
+        """
+        UPDATE nutrition_plans
+        SET version = (
+            SELECT COUNT(*)
+            FROM nutrition_plans AS older
+            WHERE older."user" = nutrition_plans."user"
+              AND (
+                older.created_at < nutrition_plans.created_at
+                OR (older.created_at = nutrition_plans.created_at AND older.id <= nutrition_plans.id)
+              )
+        )
+        """
+    )
+    op.create_index(
+        "uq_nutrition_plans_user_version",
+        "nutrition_plans",
+        ["user", "version"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_nutrition_plans_user_version", table_name="nutrition_plans")
+    with op.batch_alter_table("nutrition_plans") as batch:
+        batch.drop_column("version")
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import uuid
+from collections.abc import Iterator
+from datetime import date, datetime
+from typing import Any
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "20241016_0003"
+down_revision = "20241016_0002"
+branch_labels = None
+depends_on = None
+
+_TOTALS = (
+    "calories_total",
+    "protein_total",
+    "carbs_total",
+    "fat_total",
+    "fiber_total",
+    "omega3_total",
+    "iron_total",
+    "calcium_total",
+    "sodium_total",
+    "hydration_total",
+)
+
+_BATCH_SIZE = 500
+
+# Frozen copy of the agents.calc rollup as of this revision: a migration must keep producing
+# the same rows when the runtime estimates change later.
+_UNIT_TO_GRAMS = {
+    "g": 1.0,
+    "gram": 1.0,
+    "grams": 1.0,
+    "kg": 1000.0,
+    "ml": 1.0,
+    "l": 1000.0,
+    "oz": 28.3495,
+    "lb": 453.592,
+    "cup": 240.0,
+    "tbsp": 15.0,
+    "tsp": 5.0,
+    "slice": 30.0,
+    "unit": 75.0,
+}
+
+# per gram: calories, protein, carbs, fat, fiber, omega3, iron, calcium, sodium
+_CATEGORY_DENSITIES = {
+    "protein": (4.1, 1.0, 0.05, 0.02, 0.01, 60, 0.12, 5, 4),
+    "carb": (3.9, 0.06, 0.8, 0.02, 0.07, 20, 0.05, 2, 1.5),
+    "fat": (8.8, 0.02, 0.02, 1.0, 0.0, 90, 0.02, 1, 2),
+    "mixed": (5.0, 0.2, 0.5, 0.1, 0.04, 45, 0.08, 4, 3),
+}
+
+_CATEGORY_KEYWORDS = (
+    ("protein", ("chicken", "fish", "egg", "tofu", "beef", "protein")),
+    ("carb", ("rice", "bread", "fruit", "pasta", "oat", "carb")),
+    ("fat", ("avocado", "oil", "nuts", "seed", "butter")),
+)
+
+
+def _classify(label: str) -> str:
+    name = label.lower()
+    for category, keywords in _CATEGORY_KEYWORDS:
+        if any(keyword in name for keyword in keywords):
+            return category
+    return "mixed"
+
+
+def _log_totals(payload: dict[str, Any]) -> list[float]:
+    """Nutrient totals of one log, rounded like ``summarize_log``; hydration last."""
+
+    totals = [0.0] * 9
+    liters = 0.0
+    for meal in payload.get("meals", []):
+        for item in meal.get("items", []):
+            unit = item["unit"].lower()
+            grams = item["quantity"] * _UNIT_TO_GRAMS.get(unit, 100.0)
+            density = _CATEGORY_DENSITIES[_classify(item["label"])]
+            totals = [total + grams * factor for total, factor in zip(totals, density, strict=True)]
+            if unit in {"ml", "l", "cup"} or "water" in item["label"].lower():
+                liters += grams / 1000
+    return [round(total, 1) for total in totals] + [round(liters, 3)]
+
+
+def _log_day(payload: dict[str, Any]) -> date:
+    value = payload["date"]
+    return (value if isinstance(value, datetime) else datetime.fromisoformat(value)).date()
+
+
+def _summaries(bind: sa.engine.Connection) -> Iterator[dict[str, Any]]:
+    """Fold ``daily_logs`` into per-day rows, reading the table in keyset-paginated chunks.
+
+    Logs arrive ordered by user, so only the current user's days are held in memory.
+    """
+
+    logs = sa.table(
+        "daily_logs",
+        sa.column("id", sa.String(length=64)),
+        sa.column("user", sa.String(length=120)),
+        sa.column("payload", sa.JSON()),
+    )
+    days: dict[date, tuple[list[float], int]] = {}
+    current_user: str | None = None
+    after: tuple[str, str] | None = None
+    while True:
+        query = sa.select(logs.c.user, logs.c.id, logs.c.payload).order_by(logs.c.user, logs.c.id)
+        if after is not None:
+            query = query.where(sa.tuple_(logs.c.user, logs.c.id) > after)
+        chunk = bind.execute(query.limit(_BATCH_SIZE)).all()
+        for user, _log_id, payload in chunk:
+            if user != current_user:
+                yield from _rows(current_user, days)
+                current_user, days = user, {}
+            day = _log_day(payload)
+            totals = _log_totals(payload)
+            if day in days:
+                current, count = days[day]
+                merged = [round(a + b, 1) for a, b in zip(current[:-1], totals[:-1], strict=True)]
+                totals = merged + [round(current[-1] + totals[-1], 3)]
+                days[day] = (totals, count + 1)
+            else:
+                days[day] = (totals, 1)
+        if len(chunk) < _BATCH_SIZE:
+            break
+        after = (chunk[-1].user, chunk[-1].id)
+    yield from _rows(current_user, days)
+
+
+def _rows(user: str | None, days: dict[date, tuple[list[float], int]]) -> Iterator[dict[str, Any]]:
+    for day, (totals, count) in sorted(days.items()):
+        yield {
+            "id": str(uuid.uuid4()),
+            "user": user,
+            "summary_date": day,
+            **dict(zip(_TOTALS, totals, strict=True)),
+            "log_count": count,
+        }
+
+
+def upgrade() -> None:
+    op.create_table(
+        "daily_summaries",
+        sa.Column("id", sa.String(length=64), primary_key=True),
+        sa.Column("user", sa.String(length=120), nullable=False),
+        sa.Column("summary_date", sa.Date(), nullable=False),
+        *(sa.Column(name, sa.Float(), nullable=False, server_default="0") for name in _TOTALS),
+        sa.Column("log_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()
+        ),
+        sa.Column(
+            "updated_at",
+            sa.DateTime(timezone=True),
+            nullable=False,
+            server_default=sa.func.now(),
+            onupdate=sa.func.now(),
+        ),
+    )
+    op.create_index(
+        "uq_daily_summaries_user_date",
+        "daily_summaries",
+        ["user", "summary_date"],
+        unique=True,
+    )
+
+    summaries = sa.table(
+        "daily_summaries",
+        sa.column("id", sa.String(length=64)),
+        sa.column("user", sa.String(length=120)),
+        sa.column("summary_date", sa.Date()),
+        *(sa.column(name, sa.Float()) for name in _TOTALS),
+        sa.column("log_count", sa.Integer()),
+    )
+    batch: list[dict[str, Any]] = []
+    for row in _summaries(op.get_bind()):
+        batch.append(row)
+        if len(batch) >= _BATCH_SIZE:
+            op.bulk_insert(summaries, batch)
+            batch = []
+    if batch:
+        op.bulk_insert(summaries, batch)
+
+
+def downgrade() -> None:
+    op.drop_index("uq_daily_summaries_user_date", table_name="daily_summaries")
+    op.drop_table("daily_summaries")
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from alembic import op
+
+revision = "20241016_0004"
+down_revision = "20241016_0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # built without blocking log inserts on Postgres; SQLite ignores the flag
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_daily_logs_user_log_date",
+            "daily_logs",
+            ["user", "log_date", "id"],
+            postgresql_concurrently=True,
+        )
+    # both are prefixes of a composite index now
+    op.drop_index("ix_daily_logs_user", table_name="daily_logs")
+    op.drop_index("ix_nutrition_plans_user", table_name="nutrition_plans")
+
+
+def downgrade() -> None:
+    op.create_index("ix_nutrition_plans_user", "nutrition_plans", ["user"])
+    op.create_index("ix_daily_logs_user", "daily_logs", ["user"])
+    op.drop_index("ix_daily_logs_user_log_date", table_name="daily_logs")
@@ -1,15 +1,18 @@
 from __future__ import annotations
 
 from asyncio import sleep
-from dataclasses import replace
-from typing import Mapping
+from dataclasses import dataclass, replace
+from datetime import date
+from typing import Iterable, Mapping
 
 from core.models import (
     ActivityLevel,
     DailyLog,
+    DailySummary,
     Goal,
     MacroBreakdown,
     MicroBreakdown,
+    NutritionPlan,
     Sex,
     UserProfile,
 )
@@ -249,18 +252,68 @@ def estimate_micro_intake(log: DailyLog | None) -> MicroBreakdown:
     )
 
 
-def hydration_from_log(log: DailyLog | None, fallback: float) -> float:
-    """Estimate hydration from liquid items while respecting a fallback target."""
+def liquid_intake_liters(log: DailyLog) -> float:
+    """Sum the liquid items of a log, in liters, with no fallback applied."""
 
-    if not log:
-        return round(fallback * 0.6, 2)
     liters = 0.0
     for meal in log.meals:
         for item in meal.items:
             unit = item.unit.lower()
             if unit in {"ml", "l", "cup"} or "water" in item.label.lower():
                 liters += normalize_quantity(item.quantity, item.unit) / 1000
-    return round(max(liters, fallback * 0.5), 2)
+    return liters
+
+
+def hydration_from_log(log: DailyLog | None, fallback: float) -> float:
+    """Estimate hydration from liquid items while respecting a fallback target."""
+
+    if not log:
+        return round(fallback * 0.6, 2)
+    return round(max(liquid_intake_liters(log), fallback * 0.5), 2)
+
+
+def summarize_log(log: DailyLog) -> DailySummary:
+    """Rollup contribution of a single log to its day."""
+
+    return DailySummary(
+        user=log.user,
+        date=log.date.date(),
+        macros=estimate_macro_intake(log),
+        micros=estimate_micro_intake(log),
+        hydration_l=round(liquid_intake_liters(log), 3),
+    )
+
+
+def merge_daily_summaries(current: DailySummary, addition: DailySummary) -> DailySummary:
+    macros = add_macros(current.macros, addition.macros)
+    micros = add_micros(current.micros, addition.micros)
+    return DailySummary(
+        user=current.user,
+        date=current.date,
+        macros=MacroBreakdown(*(round(value, 1) for value in _macro_values(macros))),
+        micros=MicroBreakdown(*(round(value, 1) for value in _micro_values(micros))),
+        hydration_l=round(current.hydration_l + addition.hydration_l, 3),
+        log_count=current.log_count + addition.log_count,
+    )
+
+
+def summarize_logs(logs: Iterable[DailyLog]) -> list[DailySummary]:
+    """Fold logs into one rollup per day, oldest → newest."""
+
+    days: dict[tuple[str, date], DailySummary] = {}
+    for log in logs:
+        summary = summarize_log(log)
+        key = (summary.user, summary.date)
+        days[key] = merge_daily_summaries(days[key], summary) if key in days else summary
+    return sorted(days.values(), key=lambda day: day.date)
+
+
+def _macro_values(macros: MacroBreakdown) -> tuple[float, float, float, float]:
+    return macros.calories, macros.protein_g, macros.carbs_g, macros.fats_g
+
+
+def _micro_values(micros: MicroBreakdown) -> tuple[float, float, float, float, float]:
+    return micros.fiber_g, micros.omega3_mg, micros.iron_mg, micros.calcium_mg, micros.sodium_mg
 
 
 def apply_clinical_adjustments(
@@ -318,6 +371,19 @@ def validate_ranges(
     return alerts
 
 
+@dataclass(slots=True)
+class CalcResult:
+    macros: MacroBreakdown
+    micros: MicroBreakdown
+    hydration_l: float
+    bmr: float
+    tdee: float
+    calorie_goal: float
+    macro_targets: MacroBreakdown
+    micro_targets: MicroBreakdown
+    alerts: list[str]
+
+
 class CalcAgent(BaseAgent):
     def __init__(self) -> None:
         super().__init__("Calc-Agent")
@@ -332,7 +398,37 @@ class CalcAgent(BaseAgent):
         )
         log_data = payload.get("log")
         log = log_from_json(log_data) if log_data else None
-        clinical_adjustments: Mapping[str, float] | None = payload.get("clinical_adjustments")
+        result = self.calculate(plan, log, profile, payload.get("clinical_adjustments"))
+        return {
+            "macros": macro_to_json(result.macros),
+            "micros": micro_to_json(result.micros),
+            "hydration_l": result.hydration_l,
+            "metabolism": {
+                "bmr_tmb": round(result.bmr, 1),
+                "tdee_get": round(result.tdee, 1),
+                "calorie_goal": round(result.calorie_goal, 1),
+            },
+            "targets": {
+                "macros": macro_to_json(result.macro_targets),
+                "micros": micro_to_json(result.micro_targets),
+            },
+            "weekly_projection": weekly_projection(result.macros, result.hydration_l),
+            "alerts": result.alerts,
+        }
+
+    def calculate(
+        self,
+        plan: NutritionPlan,
+        log: DailyLog | None,
+        profile: UserProfile | None = None,
+        clinical_adjustments: Mapping[str, float] | None = None,
+        day: DailySummary | None = None,
+    ) -> CalcResult:
+        """Typed entry point for in-process callers; ``run`` wraps it for JSON payloads.
+
+        When ``day`` (the stored rollup for the log's day) is given, intake comes from it
+        instead of re-estimating every item of ``log``.
+        """
 
         bmr = (
             mifflin_st_jeor(profile.weight_kg, profile.height_cm, profile.age, profile.sex)
@@ -348,11 +444,16 @@ class CalcAgent(BaseAgent):
         )
         micro_targets = compute_micro_targets(profile) if profile else plan.micro_targets
 
-        macros_actual = estimate_macro_intake(log)
+        if day is not None:
+            macros_actual = day.macros
+            micros_actual = day.micros
+            hydration_actual = round(max(day.hydration_l, plan.hydration.total_liters * 0.5), 2)
+        else:
+            macros_actual = estimate_macro_intake(log)
+            micros_actual = estimate_micro_intake(log)
+            hydration_actual = hydration_from_log(log, plan.hydration.total_liters)
         macros_adjusted = apply_clinical_adjustments(macros_actual, clinical_adjustments)
         macros_final = replace(macros_adjusted, calories=round(macros_adjusted.calories, 1))
-        micros_actual = estimate_micro_intake(log)
-        hydration_actual = hydration_from_log(log, plan.hydration.total_liters)
 
         alerts = validate_ranges(
             macros_final,
@@ -363,19 +464,14 @@ class CalcAgent(BaseAgent):
             plan.hydration.total_liters,
         )
 
-        return {
-            "macros": macro_to_json(macros_final),
-            "micros": micro_to_json(micros_actual),
-            "hydration_l": hydration_actual,
-            "metabolism": {
-                "bmr_tmb": round(bmr, 1),
-                "tdee_get": round(tdee, 1),
-                "calorie_goal": round(calorie_goal, 1),
-            },
-            "targets": {
-                "macros": macro_to_json(macro_targets),
-                "micros": micro_to_json(micro_targets),
-            },
-            "weekly_projection": weekly_projection(macros_final, hydration_actual),
-            "alerts": alerts,
-        }
+        return CalcResult(
+            macros=macros_final,
+            micros=micros_actual,
+            hydration_l=hydration_actual,
+            bmr=bmr,
+            tdee=tdee,
+            calorie_goal=calorie_goal,
+            macro_targets=macro_targets,
+            micro_targets=micro_targets,
+            alerts=alerts,
+        )
@@ -41,6 +41,16 @@ class CoachAgent(BaseAgent):
         targets = macro_from_json(payload["targets"])
         micros = micro_from_json(payload["micros"])
         trends = [trend_from_json(item) for item in payload.get("trends", [])]
+        messages = self.compose(macros, targets, micros, trends)
+        return {"messages": [coaching_to_json(message) for message in messages]}
+
+    def compose(
+        self,
+        macros: MacroBreakdown,
+        targets: MacroBreakdown,
+        micros: MicroBreakdown,
+        trends: list[TrendInsight],
+    ) -> list[CoachingMessage]:
         messages: list[CoachingMessage] = [disclaimer_message()]
         messages.append(self._positive_reinforcement(macros, targets))
         messages.append(self._progress_over_perfection())
@@ -49,7 +59,7 @@ class CoachAgent(BaseAgent):
         messages.extend(self._nutrient_guidance(macros, targets, micros))
         messages.extend(self._trend_messages(trends))
         messages.append(self._behavior_tip())
-        return {"messages": [coaching_to_json(message) for message in messages]}
+        return messages
 
     def _positive_reinforcement(
         self, macros: MacroBreakdown, targets: MacroBreakdown
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from asyncio import sleep
 from datetime import datetime
+from typing import Iterable, Sequence
 
 from components.dashboard import (
     build_alerts,
@@ -11,7 +12,16 @@ from components.dashboard import (
     build_today_section,
     build_week_section,
 )
-from core.models import DashboardState
+from core.models import (
+    CoachingMessage,
+    DailyLog,
+    DailySummary,
+    DashboardChart,
+    DashboardState,
+    MacroBreakdown,
+    MicroBreakdown,
+    NutritionPlan,
+)
 from core.serialization import (
     chart_from_json,
     coaching_from_json,
@@ -30,18 +40,39 @@ class DashboardAgent(BaseAgent):
 
     async def run(self, payload: JSONDict) -> JSONDict:
         await sleep(0)
-        plan = plan_from_json(payload["plan"])
-        macros_actual = macro_from_json(payload["actuals"])
-        macros_target = macro_from_json(payload["targets"])
-        micros_actual = micro_from_json(payload["micros"])
-        micro_targets = micro_from_json(payload["micro_targets"])
-        hydration_target = float(payload["hydration_target"])
-        hydration_actual = float(payload["hydration_actual"])
-        logs = [log_from_json(item) for item in payload.get("logs", [])]
-        charts = [chart_from_json(chart) for chart in payload.get("charts", [])]
-        messages = [coaching_from_json(msg) for msg in payload.get("messages", [])]
-        calc_alerts = payload.get("calc_alerts", [])
+        board = self.build(
+            user=payload["user"],
+            plan=plan_from_json(payload["plan"]),
+            macros_actual=macro_from_json(payload["actuals"]),
+            macros_target=macro_from_json(payload["targets"]),
+            micros_actual=micro_from_json(payload["micros"]),
+            micro_targets=micro_from_json(payload["micro_targets"]),
+            hydration_target=float(payload["hydration_target"]),
+            hydration_actual=float(payload["hydration_actual"]),
+            logs=[log_from_json(item) for item in payload.get("logs", [])],
+            charts=[chart_from_json(chart) for chart in payload.get("charts", [])],
+            messages=[coaching_from_json(msg) for msg in payload.get("messages", [])],
+            calc_alerts=payload.get("calc_alerts", []),
+        )
+        return {"dashboard": dashboard_to_json(board)}
 
+    def build(
+        self,
+        *,
+        user: str,
+        plan: NutritionPlan,
+        macros_actual: MacroBreakdown,
+        macros_target: MacroBreakdown,
+        micros_actual: MicroBreakdown,
+        micro_targets: MicroBreakdown,
+        hydration_target: float,
+        hydration_actual: float,
+        logs: Sequence[DailyLog],
+        charts: list[DashboardChart],
+        messages: list[CoachingMessage],
+        calc_alerts: Iterable[str],
+        days: Sequence[DailySummary] | None = None,
+    ) -> DashboardState:
         cards = build_status_cards(
             macros_actual, macros_target, hydration_actual, hydration_target
         )
@@ -53,7 +84,7 @@ class DashboardAgent(BaseAgent):
             hydration_actual,
             hydration_target,
         )
-        week = build_week_section(plan, logs, macros_target)
+        week = build_week_section(plan, logs, macros_target, days)
         meal_insights = build_meal_insights(plan, macros_target)
         alerts = build_alerts(
             plan,
@@ -67,8 +98,8 @@ class DashboardAgent(BaseAgent):
         )
         navigation = build_navigation_links()
 
-        board = DashboardState(
-            user=payload["user"],
+        return DashboardState(
+            user=user,
             cards=cards,
             charts=charts,
             coach_messages=messages,
@@ -79,4 +110,3 @@ class DashboardAgent(BaseAgent):
             navigation=navigation,
             last_updated=datetime.utcnow(),
         )
-        return {"dashboard": dashboard_to_json(board)}
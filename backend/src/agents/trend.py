@@ -2,8 +2,9 @@ from __future__ import annotations
 
 from asyncio import sleep
 from statistics import mean
+from typing import Sequence
 
-from core.models import TrendInsight
+from core.models import DailyLog, DailySummary, TrendInsight
 from core.serialization import log_from_json, trend_to_json
 from .base import BaseAgent, JSONDict
 
@@ -16,16 +17,30 @@ class TrendAgent(BaseAgent):
         await sleep(0)
         logs_payload = payload.get("logs", [])
         logs = [log_from_json(item) for item in logs_payload]
+        return {"trends": [trend_to_json(insight) for insight in self.analyze(logs)]}
+
+    def analyze(self, logs: Sequence[DailyLog]) -> list[TrendInsight]:
         if not logs:
-            insight = TrendInsight(pattern="Sem histórico", signal="-", projection="Coletando dados")
-            return {"trends": [trend_to_json(insight)]}
+            return [TrendInsight(pattern="Sem histórico", signal="-", projection="Coletando dados")]
         calories = [sum(item.quantity for m in log.meals for item in m.items) * 2 for log in logs]
+        return self._calorie_trend(calories)
+
+    def analyze_days(self, days: Sequence[DailySummary]) -> list[TrendInsight]:
+        """Insights from stored per-day rollups.
+
+        The signal is the estimated kcal of each day, not the per-log quantity proxy of ``analyze``.
+        """
+
+        if not days:
+            return [TrendInsight(pattern="Sem histórico", signal="-", projection="Coletando dados")]
+        return self._calorie_trend([day.macros.calories for day in days])
+
+    def _calorie_trend(self, calories: Sequence[float]) -> list[TrendInsight]:
         avg = mean(calories)
         recent = calories[-1]
         delta = recent - avg
         projection = "Alta calórica" if delta > 100 else "Controle em dia"
-        insights = [
+        return [
             TrendInsight(pattern="Calorias médias", signal=f"{avg:.0f} kcal", projection=projection),
             TrendInsight(pattern="Variação", signal=f"{delta:+.0f} kcal", projection="Ajuste gradual"),
         ]
-        return {"trends": [trend_to_json(insight) for insight in insights]}
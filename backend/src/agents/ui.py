@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from asyncio import sleep
+from typing import Any
 
-from core.serialization import dashboard_to_json
+from core.models import DashboardState
 from .base import BaseAgent, JSONDict
 from .dashboard_agent import DashboardAgent
 
@@ -16,3 +17,6 @@ class UIAgent(BaseAgent):
         await sleep(0)
         result = await self.dashboard_agent(payload)
         return {"dashboard": result["dashboard"]}
+
+    def render(self, **sections: Any) -> DashboardState:
+        return self.dashboard_agent.build(**sections)
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
+import json
 from typing import Literal
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
 from pydantic import BaseModel, Field, field_validator, model_validator
 
 from core.logging import configure_logging
@@ -19,6 +20,24 @@ logger = configure_logging()
 orchestrator = get_orchestrator(logger)
 
 
+def _dashboard_envelope(body: bytes, stale: bool, age: float, meta: ResponseMeta) -> Response:
+    """``Envelope[DashboardResponse]`` built around cached dashboard JSON without re-encoding it."""
+    content = b"".join(
+        (
+            b'{"data":{"dashboard":',
+            body,
+            b',"stale":',
+            b"true" if stale else b"false",
+            b',"age_seconds":',
+            json.dumps(round(age, 3)).encode("utf-8"),
+            b'},"meta":',
+            meta.model_dump_json().encode("utf-8"),
+            b',"message":null}',
+        )
+    )
+    return Response(content=content, media_type="application/json")
+
+
 def _resolve_trace_id(request: Request) -> str:
     header_trace = request.headers.get(TRACE_HEADER)
     trace_id = getattr(request.state, "trace_id", header_trace or generate_trace_id())
@@ -115,22 +134,28 @@ async def dashboard(
     user: str,
     request: Request,
     auth: AuthContext = require_auth(["dashboard:read"]),
-) -> Envelope[DashboardResponse]:
+) -> Envelope[DashboardResponse] | Response:
     trace_id = _resolve_trace_id(request)
     record_counter(
         "api.calls", attributes={"route": "dashboard", "actor": auth.subject}
     )
     if auth.subject != user:
         raise HTTPException(status_code=403, detail="Usuário autenticado não corresponde ao painel")
+    meta = ResponseMeta(trace_id=trace_id, actor=auth.subject)
     try:
         with start_span(
             "api.dashboard",
             {"trace_id": trace_id, "actor": auth.subject, "route": "dashboard"},
         ):
-            board = await orchestrator.refresh_dashboard(user, trace_id=trace_id)
+            read = await orchestrator.read_dashboard(user, trace_id=trace_id, body=True)
+            if read.body is not None:
+                # cache hit: the stored JSON goes out as is, skipping decode, validation and re-encode
+                return _dashboard_envelope(read.body, read.stale, read.age(), meta)
     except ValueError as exc:  # pragma: no cover - runtime
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     return Envelope(
-        data=DashboardResponse(dashboard=dashboard_to_json(board)),
-        meta=ResponseMeta(trace_id=trace_id, actor=auth.subject),
+        data=DashboardResponse(
+            dashboard=dashboard_to_json(read.dashboard), stale=read.stale, age_seconds=read.age()
+        ),
+        meta=meta,
     )
@@ -41,5 +41,7 @@ class DiaryResponse(BaseModel):
 
 class DashboardResponse(BaseModel):
     dashboard: dict
+    stale: bool = False
+    age_seconds: float | None = None
 
     model_config = {"extra": "forbid"}
@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request, status
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
@@ -12,10 +15,21 @@ from core.tracing import TRACE_HEADER, generate_trace_id
 from core.telemetry import set_current_trace_id
 
 logger = configure_logging()
-get_orchestrator(logger)
+orchestrator = get_orchestrator(logger)
 ensure_auth_configured()
 
-app = FastAPI(title="NICA-Pro Modular Monolith", version="2.0.0")
+
+@asynccontextmanager
+async def _lifespan(_: FastAPI):
+    if orchestrator.event_bus.workers > 0:
+        # start consumers and re-queue events a previous process journaled but never finished
+        await orchestrator.event_bus.recover()
+    yield
+    # let queued pipeline events finish before the worker exits
+    await orchestrator.event_bus.stop(timeout=float(os.getenv("EVENT_BUS_DRAIN_SECONDS", "10")))
+
+
+app = FastAPI(title="NICA-Pro Modular Monolith", version="2.0.0", lifespan=_lifespan)
 
 
 def _error_response(message: str, status_code: int, trace_id: str) -> JSONResponse:
@@ -0,0 +1,109 @@
+"""Pipeline worker process: runs the pipeline events the API enqueued in the shared queue.
+
+    PIPELINE_QUEUE_PATH=./nica-pipeline.db PYTHONPATH=backend/src python -m app.worker
+
+The API process (same ``PIPELINE_QUEUE_PATH``) only writes ``calc.requested`` to the queue.
+Each worker claims jobs under a lease, runs calc → trend → coach → dashboard on its own
+``AsyncEventBus`` consumers and writes the dashboard to the database and the dashboard cache.
+Run as many worker processes as needed; one user's jobs never run concurrently.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+from logging import Logger
+
+from core.logging import configure_logging
+from core.orchestrator import Orchestrator, get_orchestrator
+from services.event_bus import init_event_bus
+from services.idempotency import init_idempotency_store
+from services.pipeline_queue import PipelineQueue, init_pipeline_queue
+
+
+async def run_worker(
+    orchestrator: Orchestrator,
+    queue: PipelineQueue,
+    stop: asyncio.Event,
+    *,
+    claim_batch: int = 64,
+    poll_interval: float = 0.05,
+    drain_timeout: float | None = 10.0,
+) -> int:
+    """Claim and run jobs until ``stop`` is set, then drain the bus; returns jobs claimed."""
+    bus = orchestrator.event_bus
+    bus.start()
+    claimed = 0
+    # leases are renewed for as long as jobs may be held, including while submit blocks
+    # and while the bus drains
+    heartbeat = asyncio.create_task(_renew_leases(orchestrator.logger, queue))
+    try:
+        while not stop.is_set():
+            events = await queue.claim(claim_batch)
+            if events:
+                claimed += len(events)
+                # blocks while the bus is at max_queue, so a busy worker stops claiming
+                await bus.submit(events)
+                continue
+            try:
+                await asyncio.wait_for(stop.wait(), poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        await bus.stop(timeout=drain_timeout)
+    finally:
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+    return claimed
+
+
+async def _renew_leases(logger: Logger, queue: PipelineQueue) -> None:
+    while True:
+        await asyncio.sleep(queue.lease_seconds / 3)
+        try:
+            await queue.heartbeat()
+        except Exception as exc:  # the next beat retries well before the lease runs out
+            logger.warning(
+                "pipeline_worker.heartbeat_failed",
+                extra={"worker_id": queue.worker_id, "error": repr(exc)},
+            )
+
+
+async def _serve(logger: Logger, queue: PipelineQueue) -> None:
+    workers = int(os.getenv("PIPELINE_WORKER_CONCURRENCY", "16"))
+    bus = init_event_bus(
+        logger, idempotency=init_idempotency_store(logger), journal=queue, workers=workers
+    )
+    orchestrator = get_orchestrator(logger, event_bus=bus)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    logger.info("pipeline_worker.started", extra={"worker_id": queue.worker_id, "workers": workers})
+    claimed = await run_worker(
+        orchestrator,
+        queue,
+        stop,
+        claim_batch=int(os.getenv("PIPELINE_WORKER_CLAIM_BATCH", str(bus.batch_max))),
+        poll_interval=float(os.getenv("PIPELINE_WORKER_POLL_MS", "50")) / 1000,
+        drain_timeout=float(os.getenv("EVENT_BUS_DRAIN_SECONDS", "10")),
+    )
+    # whatever did not finish goes back to the queue for the other workers
+    released = queue.release()
+    await queue.close()
+    logger.info(
+        "pipeline_worker.stopped",
+        extra={"worker_id": queue.worker_id, "claimed": claimed, "released": released},
+    )
+
+
+def main() -> None:
+    logger = configure_logging()
+    queue = init_pipeline_queue(logger)
+    if queue is None:
+        raise ValueError("Defina PIPELINE_QUEUE_PATH com a fila compartilhada do pipeline")
+    asyncio.run(_serve(logger, queue))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,12 @@ from __future__ import annotations
 
 from datetime import datetime
 from statistics import mean
-from typing import Iterable
+from typing import Iterable, Sequence
 
 from core.models import (
     DashboardAlert,
     DailyLog,
+    DailySummary,
     MacroBreakdown,
     MealInspection,
     MicroBreakdown,
@@ -133,10 +134,20 @@ def build_week_section(
     plan: NutritionPlan,
     logs: Iterable[DailyLog],
     macros_target: MacroBreakdown,
+    days: Sequence[DailySummary] | None = None,
 ) -> WeekSection:
     bars: list[WeeklyDayStat] = []
     log_list = list(logs)
-    if log_list:
+    if days:
+        for day in sorted(days, key=lambda summary: summary.date)[-7:]:
+            bars.append(
+                WeeklyDayStat(
+                    day=day.date.strftime("%a"),
+                    calories=round(day.macros.calories, 1),
+                    status=_status_from_value(day.macros.calories, macros_target.calories),
+                )
+            )
+    elif log_list:
         for log in sorted(log_list, key=lambda entry: entry.date)[-7:]:
             macros = estimate_macro_intake(log)
             status = _status_from_value(macros.calories, macros_target.calories)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+
+from .telemetry import record_counter, record_gauge
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_GAUGE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+@dataclass
+class CircuitBreaker:
+    """Stop calling a failing dependency until it has had time to recover.
+
+    ``failure_threshold`` consecutive failures open the circuit; calls are then refused
+    for ``reset_seconds``. After that one probe is let through (half-open): its success
+    closes the circuit, its failure opens it again for another ``reset_seconds``.
+    """
+
+    resource: str = "default"
+    failure_threshold: int = 5
+    reset_seconds: float = 10.0
+    state: str = field(default=CLOSED, init=False)
+    failures: int = field(default=0, init=False)
+    _opened_at: float = field(default=0.0, init=False)
+    _probing: bool = field(default=False, init=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @property
+    def degraded(self) -> bool:
+        """True unless the circuit is closed; does not consume the half-open probe."""
+
+        return self.state != CLOSED
+
+    def allow(self) -> bool:
+        """Whether the caller may use the dependency now; a half-open circuit admits one probe."""
+
+        if self.state == CLOSED:
+            return True
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self._transition(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return self.state == CLOSED
+
+    def record_success(self) -> None:
+        if self.state == CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.failures >= self.failure_threshold
+            ):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        record_counter(
+            "circuit_breaker.transitions",
+            attributes={"resource": self.resource, "from": self.state, "to": state},
+        )
+        record_gauge(
+            "circuit_breaker.state", _STATE_GAUGE[state], attributes={"resource": self.resource}
+        )
+        self.state = state
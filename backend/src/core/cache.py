@@ -1,22 +1,75 @@
 from __future__ import annotations
 
+import hashlib
 import os
-from dataclasses import dataclass
-from typing import Protocol
+import struct
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Mapping, Protocol, Sequence
 
 try:  # pragma: no cover - exercised in environments without redis installed
-    from redis import Redis  # type: ignore
+    from redis import BlockingConnectionPool, Redis, WatchError  # type: ignore
     _redis_import_error: Exception | None = None
 except Exception as exc:  # pragma: no cover - optional dependency
+    BlockingConnectionPool = None  # type: ignore
     Redis = None  # type: ignore
+    WatchError = RuntimeError  # type: ignore
     _redis_import_error = exc
 
+from core.breaker import CircuitBreaker
+from core.codecs import (
+    CacheCodec,
+    CodecUnavailableError,
+    EncodedPayload,
+    dumps_json,
+    loads_json,
+)
+from core.constants import PAYLOAD_VERSION
 from core.serialization import dashboard_from_json, dashboard_to_json
+from core.telemetry import record_counter, record_histogram
 from domain.entities import DashboardState
 
+# entry header: magic, flags, serializer id, compression id, write time (epoch seconds) and the
+# length of the PAYLOAD_VERSION that follows it, then the encoded payload
+_ENTRY_HEADER = struct.Struct("!2sBBBdB")
+_ENTRY_MAGIC = b"N2"
+_FLAG_STALE = 1
+_FLAGS_OFFSET = 2
+# pub/sub message kinds: a peer stored a fresh copy, or a peer invalidated the user
+_MESSAGE_WRITE = "set"
+_MESSAGE_INVALIDATE = "del"
+# refresh token handed out when no shared lease can be taken; releasing it is a no-op
+LOCAL_REFRESH_TOKEN = "local"
+
+
+@dataclass(slots=True)
+class CachedDashboard:
+    """A dashboard read from the cache, decoded or as ``dashboard_to_json`` JSON bytes.
+
+    ``stale`` means it was invalidated or outlived the soft TTL since ``stored_at``; it is
+    still the last good copy and can be served while a refresh runs.
+    """
+
+    stored_at: float
+    stale: bool = False
+    dashboard: DashboardState | None = None
+    body: bytes | None = None
+
+    def age(self, now: float | None = None) -> float:
+        return max(0.0, (now if now is not None else time.time()) - self.stored_at)
+
 
 class DashboardCache(Protocol):
     def get_dashboard(self, user: str) -> DashboardState | None:
+        """The cached dashboard if it is fresh."""
+        ...
+
+    def get_cached(self, user: str, body: bool = False) -> CachedDashboard | None:
+        """Fresh or stale entry; with ``body`` the JSON bytes are returned undecoded."""
         ...
 
     def set_dashboard(self, user: str, dashboard: DashboardState) -> None:
@@ -25,54 +78,909 @@ class DashboardCache(Protocol):
     def invalidate(self, user: str) -> None:
         ...
 
+    def get_many(self, users: Sequence[str], body: bool = False) -> dict[str, CachedDashboard]:
+        """``get_cached`` for many users in one round trip; users without an entry are left out."""
+        ...
+
+    def set_many(self, dashboards: Mapping[str, DashboardState]) -> None:
+        ...
+
+    def invalidate_many(self, users: Sequence[str]) -> None:
+        ...
+
+    def acquire_refresh(self, user: str) -> str | None:
+        """Take the refresh lease for ``user``: its token, or None while another one holds it."""
+        ...
+
+    def release_refresh(self, user: str, token: str) -> None:
+        ...
+
 
 @dataclass(slots=True)
 class NoopDashboardCache(DashboardCache):
     def get_dashboard(self, user: str) -> DashboardState | None:  # pragma: no cover - trivial
         return None
 
+    def get_cached(self, user: str, body: bool = False) -> CachedDashboard | None:  # pragma: no cover - trivial
+        return None
+
     def set_dashboard(self, user: str, dashboard: DashboardState) -> None:  # pragma: no cover - trivial
         return None
 
     def invalidate(self, user: str) -> None:  # pragma: no cover - trivial
         return None
 
+    def get_many(
+        self, users: Sequence[str], body: bool = False
+    ) -> dict[str, CachedDashboard]:  # pragma: no cover - trivial
+        return {}
+
+    def set_many(self, dashboards: Mapping[str, DashboardState]) -> None:  # pragma: no cover - trivial
+        return None
+
+    def invalidate_many(self, users: Sequence[str]) -> None:  # pragma: no cover - trivial
+        return None
+
+    def acquire_refresh(self, user: str) -> str | None:  # pragma: no cover - trivial
+        # nothing is shared between processes, so every caller may rebuild
+        return LOCAL_REFRESH_TOKEN
+
+    def release_refresh(self, user: str, token: str) -> None:  # pragma: no cover - trivial
+        return None
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    stored_at: float
+    flags: int
+    payload_version: str
+    payload: EncodedPayload
+
+
+def _pack_entry(payload: EncodedPayload, stored_at: float, flags: int = 0) -> bytes:
+    version = PAYLOAD_VERSION.encode("ascii")
+    header = _ENTRY_HEADER.pack(
+        _ENTRY_MAGIC,
+        flags,
+        payload.serializer_id,
+        payload.compression_id,
+        stored_at,
+        len(version),
+    )
+    return header + version + payload.data
+
+
+def _unpack_entry(blob: bytes) -> _Entry | None:
+    """The entry in ``blob``, or None when it does not start with the entry header."""
+    if blob[:2] != _ENTRY_MAGIC or len(blob) < _ENTRY_HEADER.size:
+        return None
+    _, flags, serializer_id, compression_id, stored_at, size = _ENTRY_HEADER.unpack_from(blob)
+    start = _ENTRY_HEADER.size + size
+    version = blob[_ENTRY_HEADER.size : start].decode("ascii")
+    return _Entry(
+        stored_at, flags, version, EncodedPayload(serializer_id, compression_id, blob[start:])
+    )
+
+
+def _reply_bytes(reply: Any) -> bytes | None:
+    """A reply of a client built with ``decode_responses=False``; anything else holds no entry."""
+    return reply if isinstance(reply, bytes) else None
+
+
+def _flag_entry(blob: bytes, flag: int) -> bytes | None:
+    """``blob`` with ``flag`` set in its header, or None for a blob without one."""
+    if blob[:2] != _ENTRY_MAGIC:
+        return None
+    flags = blob[_FLAGS_OFFSET] | flag
+    return blob[:_FLAGS_OFFSET] + bytes((flags,)) + blob[_FLAGS_OFFSET + 1 :]
+
 
 @dataclass(slots=True)
 class RedisDashboardCache(DashboardCache):
+    """Dashboards in Redis, each blob prefixed by a header: write time, stale flag, codec ids
+    and ``PAYLOAD_VERSION``.
+
+    ``codec`` picks the serializer and compression this process writes with; reads decode any
+    codec from the header, and entries from another ``PAYLOAD_VERSION`` (or a codec this
+    process lacks) count as misses, so mixed-version fleets rebuild instead of misreading.
+
+    ``ttl_seconds`` is the key expiry. With ``soft_ttl_seconds`` set (stale-while-revalidate),
+    entries older than it read as stale and ``invalidate`` only flags the entry, so the
+    last good copy keeps being served until the key expires (the hard TTL).
+
+    Refresh leases (``SET NX PX``) let one process rebuild a user's dashboard while the others
+    wait for its write or serve stale data; a lease expires after ``lease_seconds`` so a
+    holder that dies mid-rebuild does not block the user.
+    """
+
     client: Redis
     ttl_seconds: int = 300
     key_prefix: str = "dashboard"
+    soft_ttl_seconds: float | None = None
+    lease_seconds: float = 10.0
+    codec: CacheCodec = field(default_factory=CacheCodec)
 
     def _key(self, user: str) -> str:
         return f"{self.key_prefix}:{user}"
 
+    def _lease_key(self, user: str) -> str:
+        return f"lease:{self.key_prefix}:{user}"
+
     def get_dashboard(self, user: str) -> DashboardState | None:
-        cached = self.client.get(self._key(user))
-        if not cached:
+        cached = self.get_cached(user)
+        return cached.dashboard if cached is not None and not cached.stale else None
+
+    def get_cached(self, user: str, body: bool = False) -> CachedDashboard | None:
+        with self._command("get"):
+            blob = self.client.get(self._key(user))
+        return self._read(_reply_bytes(blob), body)
+
+    def get_many(self, users: Sequence[str], body: bool = False) -> dict[str, CachedDashboard]:
+        if not users:
+            return {}
+        with self._command("mget", len(users)):
+            blobs = self.client.mget([self._key(user) for user in users])
+        found = {}
+        for user, blob in zip(users, blobs, strict=True):
+            cached = self._read(_reply_bytes(blob), body)
+            if cached is not None:
+                found[user] = cached
+        return found
+
+    def _read(self, blob: bytes | None, body: bool) -> CachedDashboard | None:
+        if not blob:
+            return None
+        entry = _unpack_entry(blob)
+        if entry is None:
+            record_counter("dashboard_cache.incompatible", attributes={"reason": "header"})
             return None
-        return dashboard_from_json(RedisDashboardCache._decode(cached))
+        if entry.payload_version != PAYLOAD_VERSION:
+            record_counter("dashboard_cache.incompatible", attributes={"reason": "payload_version"})
+            return None
+        stale = bool(entry.flags & _FLAG_STALE) or (
+            self.soft_ttl_seconds is not None
+            and time.time() - entry.stored_at > self.soft_ttl_seconds
+        )
+        try:
+            if body:
+                # JSON payloads are only decompressed, so they can be spliced into a response
+                return CachedDashboard(
+                    entry.stored_at, stale, body=CacheCodec.json_bytes(entry.payload)
+                )
+            dashboard = dashboard_from_json(CacheCodec.decode(entry.payload))
+        except CodecUnavailableError:
+            record_counter("dashboard_cache.incompatible", attributes={"reason": "codec"})
+            return None
+        return CachedDashboard(entry.stored_at, stale, dashboard=dashboard)
 
     def set_dashboard(self, user: str, dashboard: DashboardState) -> None:
-        payload = dashboard_to_json(dashboard)
-        self.client.set(self._key(user), RedisDashboardCache._encode(payload), ex=self.ttl_seconds)
+        blob = self._blob(dashboard)
+        with self._command("set"):
+            self.client.set(self._key(user), blob, ex=self.ttl_seconds)
+
+    def set_many(self, dashboards: Mapping[str, DashboardState]) -> None:
+        if not dashboards:
+            return
+        blobs = {self._key(user): self._blob(dashboard) for user, dashboard in dashboards.items()}
+        pipe = self.client.pipeline(transaction=False)
+        for key, blob in blobs.items():
+            pipe.set(key, blob, ex=self.ttl_seconds)
+        with self._command("pipeline_set", len(blobs)):
+            pipe.execute()
+
+    def _blob(self, dashboard: DashboardState) -> bytes:
+        blob = _pack_entry(self.codec.encode(dashboard_to_json(dashboard)), time.time())
+        record_histogram(
+            "dashboard_cache.entry_bytes", len(blob), attributes={"codec": self.codec.name}
+        )
+        return blob
 
     def invalidate(self, user: str) -> None:
-        self.client.delete(self._key(user))
+        self.invalidate_many([user])
 
-    @staticmethod
-    def _encode(payload: object) -> bytes:
-        return RedisDashboardCache._json_module().dumps(payload).encode("utf-8")
+    def invalidate_many(self, users: Sequence[str]) -> None:
+        if not users:
+            return
+        keys = [self._key(user) for user in users]
+        if self.soft_ttl_seconds is None:
+            with self._command("del", len(keys)):
+                self.client.delete(*keys)
+            return
+        self._flag_stale(keys)
 
-    @staticmethod
-    def _decode(blob: bytes) -> dict:
-        return RedisDashboardCache._json_module().loads(blob.decode("utf-8"))
+    def _flag_stale(self, keys: list[str]) -> None:
+        """Flag the entries at ``keys`` stale, leaving alone any rewritten in the meantime.
+
+        The read and the rewrite form a WATCH/MULTI transaction: a ``set_dashboard`` landing
+        between them aborts it, and the retry drops the keys whose value changed, so the fresh
+        copy is never replaced by the old blob flagged stale.
+        """
+        expected: dict[str, bytes] | None = None
+        while keys:
+            with self.client.pipeline(transaction=True) as pipe:
+                pipe.watch(*keys)
+                with self._command("mget", len(keys)):
+                    replies = pipe.mget(keys)
+                current = {}
+                for key, reply in zip(keys, replies, strict=True):
+                    blob = _reply_bytes(reply)
+                    if blob and (expected is None or expected.get(key) == blob):
+                        current[key] = blob
+                if expected is None:
+                    expected = current
+                if not current:
+                    return
+                pipe.multi()
+                for key, blob in current.items():
+                    flagged = _flag_entry(blob, _FLAG_STALE)
+                    if flagged is None:
+                        pipe.delete(key)
+                    else:
+                        pipe.set(key, flagged, keepttl=True)
+                try:
+                    with self._command("multi_flag", len(current)):
+                        pipe.execute()
+                    return
+                except WatchError:
+                    record_counter("dashboard_cache.invalidate_conflicts")
+                    keys = list(current)
+
+    def acquire_refresh(self, user: str) -> str | None:
+        token = uuid.uuid4().hex
+        with self._command("set_nx"):
+            acquired = self.client.set(
+                self._lease_key(user), token, nx=True, px=max(1, int(self.lease_seconds * 1000))
+            )
+        outcome = "acquired" if acquired else "contended"
+        record_counter("dashboard_cache.leases", attributes={"outcome": outcome})
+        return token if acquired else None
+
+    def release_refresh(self, user: str, token: str) -> None:
+        key = self._lease_key(user)
+        with self._command("get"):
+            held = self.client.get(key)
+        # an expired lease may already belong to another process; only the holder deletes it
+        if held is not None and (held.decode() if isinstance(held, bytes) else held) == token:
+            with self._command("del"):
+                self.client.delete(key)
+
+    @contextmanager
+    def _command(self, command: str, keys: int = 1) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            record_histogram("redis.command_ms", elapsed_ms, attributes={"command": command})
+            if keys > 1:
+                record_histogram("redis.batch_keys", keys, attributes={"command": command})
+
+
+def encode_dashboard_body(dashboard: DashboardState) -> bytes:
+    return dumps_json(dashboard_to_json(dashboard))
+
+
+@dataclass(slots=True)
+class _LocalDashboard:
+    """A local-tier entry; the decoded state and the JSON body are each filled on demand."""
+
+    expires_at: float
+    stored_at: float
+    stale: bool = False
+    dashboard: DashboardState | None = None
+    body: bytes | None = None
+
+    def serve(self, body: bool, soft_ttl_seconds: float | None) -> CachedDashboard:
+        if body and self.body is None and self.dashboard is not None:
+            self.body = encode_dashboard_body(self.dashboard)
+        if not body and self.dashboard is None and self.body is not None:
+            self.dashboard = dashboard_from_json(loads_json(self.body))
+        stale = self.stale or (
+            soft_ttl_seconds is not None and time.time() - self.stored_at > soft_ttl_seconds
+        )
+        return CachedDashboard(self.stored_at, stale, self.dashboard, self.body)
+
+
+@dataclass(slots=True)
+class TieredDashboardCache(DashboardCache):
+    """Bounded in-process LRU/TTL tier in front of a shared (Redis) dashboard cache.
+
+    Hot dashboards are served from memory without a round trip or a decode. Every
+    ``set_dashboard``/``invalidate`` publishes the user on ``channel``; each process listens
+    in a daemon thread and drops its local copy, so workers converge right after a write.
+    With a ``soft_ttl_seconds`` a peer's invalidation flags the copy stale instead, while a
+    peer's write still drops it so the fresh Redis copy is read rather than rebuilt.
+    ``local_ttl_seconds`` bounds staleness if an invalidation message is ever lost.
+
+    ``client`` publishes; ``subscriber`` (default ``client``) holds the subscription, whose
+    listener blocks for up to a second per poll and so needs the default socket timeouts.
+    """
+
+    remote: DashboardCache
+    client: Any
+    max_entries: int = 1024
+    local_ttl_seconds: float = 30.0
+    soft_ttl_seconds: float | None = None
+    channel: str = "dashboard:invalidate"
+    subscriber: Any = None
+    origin: str = field(default_factory=lambda: uuid.uuid4().hex)
+    # the breaker guarding ``remote``; while it is not closed invalidations are not published
+    breaker: CircuitBreaker | None = None
+    hits: Counter[str] = field(default_factory=Counter)
+    misses: Counter[str] = field(default_factory=Counter)
+    evictions: Counter[str] = field(default_factory=Counter)
+    _entries: OrderedDict[str, _LocalDashboard] = field(default_factory=OrderedDict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+    # bumped by every invalidation; a remote read only fills the local tier if it did not move
+    _generation: int = 0
+    _pubsub: Any = None
+    _listener: threading.Thread | None = None
+    _stopped: threading.Event = field(default_factory=threading.Event)
+
+    def start(self) -> None:
+        """Subscribe to invalidations and start the listener thread (idempotent)."""
+        if self._listener is not None:
+            return
+        self._pubsub = (self.subscriber or self.client).pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(self.channel)
+        self._stopped.clear()
+        self._listener = threading.Thread(
+            target=self._listen, name="dashboard-cache-invalidation", daemon=True
+        )
+        self._listener.start()
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.join(timeout=2)
+            self._listener = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+    def get_dashboard(self, user: str) -> DashboardState | None:
+        cached = self.get_cached(user)
+        return cached.dashboard if cached is not None and not cached.stale else None
+
+    def get_cached(self, user: str, body: bool = False) -> CachedDashboard | None:
+        entry, generation = self._local(user)
+        if entry is not None:
+            return self._from_local(entry, body)
+        cached = self.remote.get_cached(user, body=body)
+        self._remember(user, generation, cached)
+        return cached
+
+    def get_many(self, users: Sequence[str], body: bool = False) -> dict[str, CachedDashboard]:
+        found: dict[str, CachedDashboard] = {}
+        missing: dict[str, int] = {}
+        for user in users:
+            entry, generation = self._local(user)
+            if entry is not None:
+                found[user] = self._from_local(entry, body)
+            else:
+                missing[user] = generation
+        if missing:
+            remote = self.remote.get_many(list(missing), body=body)
+            for user, generation in missing.items():
+                cached = remote.get(user)
+                self._remember(user, generation, cached)
+                if cached is not None:
+                    found[user] = cached
+        return found
+
+    def _from_local(self, entry: _LocalDashboard, body: bool) -> CachedDashboard:
+        return entry.serve(body, self.soft_ttl_seconds)
+
+    def _remember(self, user: str, generation: int, cached: CachedDashboard | None) -> None:
+        if cached is None:
+            self._count(self.misses, "dashboard_cache.misses", "redis")
+            return
+        self._count(self.hits, "dashboard_cache.hits", "redis")
+        self._store(
+            user, generation, cached.stored_at, cached.stale, cached.dashboard, cached.body
+        )
+
+    def set_dashboard(self, user: str, dashboard: DashboardState) -> None:
+        self.set_many({user: dashboard})
+
+    def set_many(self, dashboards: Mapping[str, DashboardState]) -> None:
+        if not dashboards:
+            return
+        if len(dashboards) == 1:
+            [(user, dashboard)] = dashboards.items()
+            self.remote.set_dashboard(user, dashboard)
+        else:
+            self.remote.set_many(dashboards)
+        with self._lock:
+            # a remote read still in flight must not overwrite these fresh copies
+            self._generation += 1
+            generation = self._generation
+        stored_at = time.time()
+        for user, dashboard in dashboards.items():
+            self._store(user, generation, stored_at, False, dashboard=dashboard)
+        self._publish(_MESSAGE_WRITE, list(dashboards))
+
+    def invalidate(self, user: str) -> None:
+        self._drop(user)
+        self.remote.invalidate(user)
+        self._publish(_MESSAGE_INVALIDATE, [user])
+
+    def invalidate_many(self, users: Sequence[str]) -> None:
+        if not users:
+            return
+        for user in users:
+            self._drop(user)
+        self.remote.invalidate_many(users)
+        self._publish(_MESSAGE_INVALIDATE, users)
+
+    def acquire_refresh(self, user: str) -> str | None:
+        return self.remote.acquire_refresh(user)
+
+    def release_refresh(self, user: str, token: str) -> None:
+        self.remote.release_refresh(user, token)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {
+            tier: {
+                "hits": self.hits[tier],
+                "misses": self.misses[tier],
+                "evictions": self.evictions[tier],
+            }
+            for tier in ("local", "redis")
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _local(self, user: str) -> tuple[_LocalDashboard | None, int]:
+        with self._lock:
+            entry = self._entries.get(user)
+            if entry is not None and entry.expires_at < time.monotonic():
+                del self._entries[user]
+                self._evict("ttl")
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(user)
+            generation = self._generation
+        if entry is not None:
+            self._count(self.hits, "dashboard_cache.hits", "local")
+        else:
+            self._count(self.misses, "dashboard_cache.misses", "local")
+        return entry, generation
+
+    def _store(
+        self,
+        user: str,
+        generation: int,
+        stored_at: float,
+        stale: bool,
+        dashboard: DashboardState | None = None,
+        body: bytes | None = None,
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        expires_at = time.monotonic() + self.local_ttl_seconds
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[user] = _LocalDashboard(expires_at, stored_at, stale, dashboard, body)
+            self._entries.move_to_end(user)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evict("size")
+
+    def _drop(self, user: str, written: bool = False) -> None:
+        """Forget ``user``'s local copy; ``written`` means a fresh copy is already in Redis."""
+        with self._lock:
+            self._generation += 1
+            if written:
+                # the next read fetches the fresh copy instead of rebuilding a stale one
+                if self._entries.pop(user, None) is not None:
+                    self._evict("peer_write")
+            elif self.soft_ttl_seconds is not None:
+                # keep serving the last good copy, flagged so readers refresh it
+                entry = self._entries.get(user)
+                if entry is not None:
+                    entry.stale = True
+            elif self._entries.pop(user, None) is not None:
+                self._evict("invalidated")
+
+    def _publish(self, kind: str, users: Sequence[str]) -> None:
+        if self.breaker is not None and self.breaker.degraded:
+            record_counter("dashboard_cache.bypassed", attributes={"op": "publish", "reason": "open"})
+            return
+        try:
+            if len(users) == 1:
+                self.client.publish(self.channel, f"{self.origin}:{kind}:{users[0]}")
+                return
+            pipe = self.client.pipeline(transaction=False)
+            for user in users:
+                pipe.publish(self.channel, f"{self.origin}:{kind}:{user}")
+            pipe.execute()
+        except Exception:  # pragma: no cover - the local TTL still bounds staleness
+            record_counter("dashboard_cache.publish_errors")
+
+    def _listen(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                message = self._pubsub.get_message(timeout=1.0)
+            except Exception:  # pragma: no cover - connection loss
+                # messages may have been missed while disconnected: start over cold
+                record_counter("dashboard_cache.listener_errors")
+                with self._lock:
+                    self._generation += 1
+                    self._entries.clear()
+                self._stopped.wait(1.0)
+                continue
+            if not message or message.get("type") != "message":
+                continue
+            data = message["data"]
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            origin, _, rest = data.partition(":")
+            if origin == self.origin:
+                continue
+            kind, _, user = rest.partition(":")
+            if kind not in (_MESSAGE_WRITE, _MESSAGE_INVALIDATE):
+                # "origin:user" from a process predating message kinds
+                kind, user = _MESSAGE_INVALIDATE, rest
+            record_counter("dashboard_cache.invalidations_received", attributes={"kind": kind})
+            self._drop(user, written=kind == _MESSAGE_WRITE)
+
+    def _evict(self, reason: str) -> None:
+        self.evictions["local"] += 1
+        record_counter("dashboard_cache.evictions", attributes={"tier": "local", "reason": reason})
 
     @staticmethod
-    def _json_module():  # pragma: no cover - indirection for testability
-        import json
+    def _count(counter: Counter[str], metric: str, tier: str) -> None:
+        counter[tier] += 1
+        record_counter(metric, attributes={"tier": tier})
+
+
+@dataclass(slots=True)
+class LocalDashboardCache(DashboardCache):
+    """Process-local LRU/TTL dashboard store; the fallback while the shared cache is bypassed.
+
+    Nothing is shared with other processes, so every caller may rebuild and copies are only
+    as fresh as ``ttl_seconds`` allows.
+    """
+
+    max_entries: int = 1024
+    ttl_seconds: float = 30.0
+    soft_ttl_seconds: float | None = None
+    _entries: OrderedDict[str, _LocalDashboard] = field(default_factory=OrderedDict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+    # bumped by every write; a remote read only fills this store if it did not move
+    _generation: int = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get_dashboard(self, user: str) -> DashboardState | None:
+        cached = self.get_cached(user)
+        return cached.dashboard if cached is not None and not cached.stale else None
+
+    def get_cached(self, user: str, body: bool = False) -> CachedDashboard | None:
+        with self._lock:
+            entry = self._entries.get(user)
+            if entry is not None and entry.expires_at < time.monotonic():
+                del self._entries[user]
+                entry = None
+            if entry is None:
+                return None
+            self._entries.move_to_end(user)
+        return entry.serve(body, self.soft_ttl_seconds)
+
+    def get_many(self, users: Sequence[str], body: bool = False) -> dict[str, CachedDashboard]:
+        found = {}
+        for user in users:
+            cached = self.get_cached(user, body=body)
+            if cached is not None:
+                found[user] = cached
+        return found
+
+    def set_dashboard(self, user: str, dashboard: DashboardState) -> None:
+        self.set_many({user: dashboard})
+
+    def set_many(self, dashboards: Mapping[str, DashboardState]) -> None:
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        stored_at = time.time()
+        for user, dashboard in dashboards.items():
+            self.remember(user, generation, CachedDashboard(stored_at, dashboard=dashboard))
+
+    def remember(self, user: str, generation: int, cached: CachedDashboard) -> None:
+        if self.max_entries <= 0:
+            return
+        entry = _LocalDashboard(
+            time.monotonic() + self.ttl_seconds,
+            cached.stored_at,
+            cached.stale,
+            cached.dashboard,
+            cached.body,
+        )
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[user] = entry
+            self._entries.move_to_end(user)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user: str) -> None:
+        self.invalidate_many([user])
+
+    def invalidate_many(self, users: Sequence[str]) -> None:
+        with self._lock:
+            self._generation += 1
+            for user in users:
+                if self.soft_ttl_seconds is None:
+                    self._entries.pop(user, None)
+                elif user in self._entries:
+                    self._entries[user].stale = True
 
-        return json
+    def acquire_refresh(self, user: str) -> str | None:
+        return LOCAL_REFRESH_TOKEN
+
+    def release_refresh(self, user: str, token: str) -> None:
+        return None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+@dataclass(slots=True)
+class GuardedDashboardCache(DashboardCache):
+    """Shared dashboard cache behind a per-call latency budget and a circuit breaker.
+
+    A call that raises or takes longer than ``budget_seconds`` counts as a failure; enough of
+    them in a row open ``breaker`` and ``remote`` is skipped entirely in favour of ``fallback``
+    until a half-open probe succeeds. Writes and successful reads also land in ``fallback`` so
+    it holds recent copies when the circuit opens. Invalidations that could not reach
+    ``remote`` are replayed, up to ``max_pending`` users, before its next call.
+
+    The budget is enforced by ``remote``'s client: ``init_dashboard_cache`` builds it with
+    pool, connect and socket timeouts of ``budget_seconds``, so a hung command raises instead
+    of blocking the caller. Calls that still overrun it (several round trips, a replay before
+    the command) are counted as failures after the fact.
+    """
+
+    remote: DashboardCache
+    fallback: LocalDashboardCache = field(default_factory=LocalDashboardCache)
+    breaker: CircuitBreaker = field(
+        default_factory=lambda: CircuitBreaker(resource="dashboard_cache")
+    )
+    budget_seconds: float = 0.1
+    max_pending: int = 10_000
+    bypassed: Counter[str] = field(default_factory=Counter)
+    _pending: dict[str, None] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def get_dashboard(self, user: str) -> DashboardState | None:
+        cached = self.get_cached(user)
+        return cached.dashboard if cached is not None and not cached.stale else None
+
+    def get_cached(self, user: str, body: bool = False) -> CachedDashboard | None:
+        generation = self.fallback.generation
+        ok, cached = self._call("get", lambda: self.remote.get_cached(user, body=body))
+        if not ok:
+            return self.fallback.get_cached(user, body=body)
+        if cached is not None:
+            self.fallback.remember(user, generation, cached)
+        return cached
+
+    def get_many(self, users: Sequence[str], body: bool = False) -> dict[str, CachedDashboard]:
+        if not users:
+            return {}
+        generation = self.fallback.generation
+        ok, found = self._call("get_many", lambda: self.remote.get_many(users, body=body))
+        if not ok:
+            return self.fallback.get_many(users, body=body)
+        for user, cached in found.items():
+            self.fallback.remember(user, generation, cached)
+        return found
+
+    def set_dashboard(self, user: str, dashboard: DashboardState) -> None:
+        self.fallback.set_dashboard(user, dashboard)
+        self._call("set", lambda: self.remote.set_dashboard(user, dashboard))
+
+    def set_many(self, dashboards: Mapping[str, DashboardState]) -> None:
+        if not dashboards:
+            return
+        self.fallback.set_many(dashboards)
+        self._call("set_many", lambda: self.remote.set_many(dashboards))
+
+    def invalidate(self, user: str) -> None:
+        self.fallback.invalidate(user)
+        ok, _ = self._call("invalidate", lambda: self.remote.invalidate(user))
+        if not ok:
+            self._defer([user])
+
+    def invalidate_many(self, users: Sequence[str]) -> None:
+        if not users:
+            return
+        self.fallback.invalidate_many(users)
+        ok, _ = self._call("invalidate_many", lambda: self.remote.invalidate_many(users))
+        if not ok:
+            self._defer(users)
+
+    def acquire_refresh(self, user: str) -> str | None:
+        ok, token = self._call("acquire_refresh", lambda: self.remote.acquire_refresh(user))
+        # without the shared lease every process may rebuild, as with no cache at all
+        return token if ok else LOCAL_REFRESH_TOKEN
+
+    def release_refresh(self, user: str, token: str) -> None:
+        if token != LOCAL_REFRESH_TOKEN:
+            self._call("release_refresh", lambda: self.remote.release_refresh(user, token))
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.breaker.state,
+            "failures": self.breaker.failures,
+            "bypassed": dict(self.bypassed),
+            "pending_invalidations": len(self._pending),
+        }
+
+    def _call(self, op: str, command: Callable[[], Any]) -> tuple[bool, Any]:
+        if not self.breaker.allow():
+            self._bypass(op, "open")
+            return False, None
+        started = time.perf_counter()
+        try:
+            if self._pending:
+                self._replay()
+            result = command()
+        except Exception:
+            self.breaker.record_failure()
+            self._bypass(op, "error")
+            return False, None
+        if time.perf_counter() - started > self.budget_seconds:
+            # the answer is still used, but a slow backend counts towards opening the circuit
+            record_counter("dashboard_cache.over_budget", attributes={"op": op})
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return True, result
+
+    def _bypass(self, op: str, reason: str) -> None:
+        self.bypassed[reason] += 1
+        record_counter("dashboard_cache.bypassed", attributes={"op": op, "reason": reason})
+
+    def _defer(self, users: Sequence[str]) -> None:
+        with self._lock:
+            for user in users:
+                self._pending[user] = None
+            while len(self._pending) > self.max_pending:
+                # the hard TTL still expires whatever could not be replayed
+                del self._pending[next(iter(self._pending))]
+                record_counter("dashboard_cache.pending_dropped")
+
+    def _replay(self) -> None:
+        with self._lock:
+            users, self._pending = list(self._pending), {}
+        try:
+            self.remote.invalidate_many(users)
+        except Exception:
+            self._defer(users)
+            raise
+        record_counter("dashboard_cache.invalidations_replayed", len(users))
+
+
+def stage_fingerprint(stage: str, inputs: Mapping[str, Any]) -> str:
+    """Stable in-process hash of a stage's inputs, scoped by ``PAYLOAD_VERSION``.
+
+    Domain objects are dataclasses, so ``repr`` covers every field deterministically
+    without paying for a JSON encode of the whole payload.
+    """
+
+    material = repr((PAYLOAD_VERSION, stage, sorted(inputs.items())))
+    return hashlib.blake2b(material.encode("utf-8"), digest_size=16).hexdigest()
+
+
+@dataclass(slots=True)
+class StageResultCache:
+    """Bounded LRU/TTL store for pipeline stage outputs keyed by input fingerprint."""
+
+    max_entries: int = 2048
+    ttl_seconds: float = 900.0
+    _entries: OrderedDict[tuple[str, str], tuple[float, dict[str, Any]]] = field(
+        default_factory=OrderedDict
+    )
+    hits: Counter[str] = field(default_factory=Counter)
+    misses: Counter[str] = field(default_factory=Counter)
+    evictions: Counter[str] = field(default_factory=Counter)
+
+    def get(self, stage: str, fingerprint: str) -> dict[str, Any] | None:
+        key = (stage, fingerprint)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._entries[key]
+            self._evict(stage, "ttl")
+            entry = None
+        if entry is None:
+            self.misses[stage] += 1
+            record_counter("stage_cache.misses", attributes={"stage": stage})
+            return None
+        self._entries.move_to_end(key)
+        self.hits[stage] += 1
+        record_counter("stage_cache.hits", attributes={"stage": stage})
+        return entry[1]
+
+    def set(self, stage: str, fingerprint: str, outputs: dict[str, Any]) -> None:
+        self._entries[(stage, fingerprint)] = (time.monotonic() + self.ttl_seconds, outputs)
+        self._entries.move_to_end((stage, fingerprint))
+        while len(self._entries) > self.max_entries:
+            (evicted_stage, _), _ = self._entries.popitem(last=False)
+            self._evict(evicted_stage, "size")
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        stages = set(self.hits) | set(self.misses) | set(self.evictions)
+        return {
+            stage: {
+                "hits": self.hits[stage],
+                "misses": self.misses[stage],
+                "evictions": self.evictions[stage],
+            }
+            for stage in sorted(stages)
+        }
+
+    def _evict(self, stage: str, reason: str) -> None:
+        self.evictions[stage] += 1
+        record_counter("stage_cache.evictions", attributes={"stage": stage, "reason": reason})
+
+
+def init_stage_cache(logger) -> StageResultCache:
+    max_entries = int(os.getenv("STAGE_CACHE_MAX_ENTRIES", "2048"))
+    ttl = float(os.getenv("STAGE_CACHE_TTL_SECONDS", "900"))
+    logger.info("stage_cache.enabled", extra={"max_entries": max_entries, "ttl_seconds": ttl})
+    return StageResultCache(max_entries=max_entries, ttl_seconds=ttl)
+
+
+def connect_redis(redis_url: str, logger, timeout_seconds: float = 1.0) -> Redis:
+    """Redis client over a bounded, blocking connection pool sized from the environment.
+
+    Callers wait up to ``REDIS_POOL_TIMEOUT_SECONDS`` for a free connection instead of opening
+    one per concurrent request; that wait is exported as ``redis.pool_wait_ms``. Timeouts not
+    set in the environment default to ``timeout_seconds``.
+    """
+    default = str(timeout_seconds)
+    settings: dict[str, Any] = {
+        "max_connections": int(os.getenv("REDIS_MAX_CONNECTIONS", "50")),
+        "timeout": float(os.getenv("REDIS_POOL_TIMEOUT_SECONDS", default)),
+        "socket_timeout": float(os.getenv("REDIS_SOCKET_TIMEOUT_SECONDS", default)),
+        "socket_connect_timeout": float(os.getenv("REDIS_CONNECT_TIMEOUT_SECONDS", default)),
+    }
+    logger.info("redis.pool", extra=settings)
+    pool_class = _instrumented_pool()
+    if pool_class is None:
+        raise RuntimeError(f"redis indisponível: {_redis_import_error}")
+    # ``Redis.from_url`` always builds a plain ConnectionPool, so the pool is built here
+    pool = pool_class.from_url(redis_url, decode_responses=False, **settings)
+    return Redis(connection_pool=pool)
+
+
+def _instrumented_pool() -> type[BlockingConnectionPool] | None:
+    if BlockingConnectionPool is None:
+        return None
+
+    class InstrumentedConnectionPool(BlockingConnectionPool):
+        def get_connection(self, *args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return super().get_connection(*args, **kwargs)
+            finally:
+                waited_ms = (time.perf_counter() - started) * 1000
+                record_histogram("redis.pool_wait_ms", waited_ms)
+
+    return InstrumentedConnectionPool
 
 
 def init_dashboard_cache(logger) -> DashboardCache:
@@ -88,6 +996,86 @@ def init_dashboard_cache(logger) -> DashboardCache:
         return NoopDashboardCache()
 
     ttl = int(os.getenv("CACHE_TTL_SECONDS", "300"))
-    client = Redis.from_url(redis_url, decode_responses=False)
-    logger.info("cache.enabled", extra={"backend": "redis", "ttl_seconds": ttl})
-    return RedisDashboardCache(client=client, ttl_seconds=ttl)
+    soft_raw = os.getenv("CACHE_SOFT_TTL_SECONDS")
+    soft_ttl = float(soft_raw) if soft_raw else None
+    if soft_ttl is not None:
+        # stale-while-revalidate: CACHE_HARD_TTL_SECONDS caps how long a stale copy is served
+        ttl = int(os.getenv("CACHE_HARD_TTL_SECONDS", str(ttl)))
+        if soft_ttl >= ttl:
+            raise ValueError("CACHE_SOFT_TTL_SECONDS deve ser menor que o TTL rígido do cache")
+    codec = CacheCodec(
+        serializer=os.getenv("CACHE_CODEC", "json"),
+        compression=os.getenv("CACHE_COMPRESSION", "none"),
+        compress_min_bytes=int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "1024")),
+    )
+    budget_seconds = float(os.getenv("CACHE_BUDGET_MS", "100")) / 1000
+    breaker_failures = int(os.getenv("CACHE_BREAKER_FAILURES", "5"))
+    # with the breaker on, every guarded command (reads, writes, invalidations, leases and
+    # replays) gives up at the budget instead of stalling the caller for the default timeout
+    client = connect_redis(
+        redis_url, logger, timeout_seconds=budget_seconds if breaker_failures > 0 else 1.0
+    )
+    logger.info(
+        "cache.enabled",
+        extra={
+            "backend": "redis",
+            "ttl_seconds": ttl,
+            "soft_ttl_seconds": soft_ttl,
+            "codec": codec.name,
+        },
+    )
+    cache = RedisDashboardCache(
+        client=client,
+        ttl_seconds=ttl,
+        soft_ttl_seconds=soft_ttl,
+        lease_seconds=float(os.getenv("CACHE_LEASE_SECONDS", "10")),
+        codec=codec,
+    )
+    remote: DashboardCache = cache
+    breaker = None
+    if breaker_failures > 0:
+        breaker = CircuitBreaker(
+            resource="dashboard_cache",
+            failure_threshold=breaker_failures,
+            reset_seconds=float(os.getenv("CACHE_BREAKER_RESET_SECONDS", "10")),
+        )
+        remote = GuardedDashboardCache(
+            remote=cache,
+            fallback=LocalDashboardCache(
+                max_entries=int(os.getenv("CACHE_FALLBACK_MAX_ENTRIES", "1024")),
+                ttl_seconds=float(os.getenv("CACHE_FALLBACK_TTL_SECONDS", "30")),
+                soft_ttl_seconds=soft_ttl,
+            ),
+            breaker=breaker,
+            budget_seconds=budget_seconds,
+        )
+        logger.info(
+            "cache.breaker_enabled",
+            extra={
+                "budget_ms": budget_seconds * 1000,
+                "failure_threshold": breaker.failure_threshold,
+                "reset_seconds": breaker.reset_seconds,
+            },
+        )
+    local_entries = int(os.getenv("CACHE_LOCAL_MAX_ENTRIES", "0"))
+    if local_entries <= 0:
+        return remote
+    tiered = TieredDashboardCache(
+        remote=remote,
+        client=client,
+        max_entries=local_entries,
+        local_ttl_seconds=float(os.getenv("CACHE_LOCAL_TTL_SECONDS", "30")),
+        soft_ttl_seconds=soft_ttl,
+        breaker=breaker,
+        subscriber=connect_redis(redis_url, logger) if breaker is not None else None,
+    )
+    try:
+        tiered.start()
+    except Exception as exc:
+        logger.warning("cache.local_tier_disabled", extra={"reason": str(exc)})
+        return remote
+    logger.info(
+        "cache.local_tier_enabled",
+        extra={"max_entries": tiered.max_entries, "ttl_seconds": tiered.local_ttl_seconds},
+    )
+    return tiered
@@ -0,0 +1,150 @@
+"""Byte codecs for cached payloads: a serializer plus optional compression above a threshold.
+
+Every encoded payload is described by two one-byte ids (serializer, compression) that the
+cache stores next to it, so a reader decodes whatever codec the writer was configured with.
+``json`` is always available; ``orjson``, ``msgpack`` and ``zstd`` (``zstandard``) are
+optional and fail at configuration time when missing.
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, Callable
+
+try:  # pragma: no cover - optional dependency
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None
+
+SERIALIZERS = {"json": 1, "orjson": 2, "msgpack": 3}
+COMPRESSIONS = {"none": 0, "zlib": 1, "zstd": 2}
+# ids whose payload is JSON text, whichever library wrote it
+_JSON_SERIALIZERS = frozenset({SERIALIZERS["json"], SERIALIZERS["orjson"]})
+
+
+class CodecUnavailableError(ValueError):
+    """The codec is unknown, or the library it needs is not installed in this process."""
+
+
+def _import(module: str, codec: str) -> Any:
+    try:
+        return __import__(module)
+    except ImportError as exc:
+        raise CodecUnavailableError(
+            f"Codec de cache '{codec}' requer o pacote '{module}', que não está instalado"
+        ) from exc
+
+
+def dumps_json(payload: object) -> bytes:
+    """Compact JSON bytes, through orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads_json(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@cache
+def _serializer(serializer_id: int) -> tuple[Callable[[object], bytes], Callable[[bytes], Any]]:
+    if serializer_id == SERIALIZERS["json"]:
+        return (
+            lambda payload: json.dumps(payload, separators=(",", ":")).encode("utf-8"),
+            loads_json,
+        )
+    if serializer_id == SERIALIZERS["orjson"]:
+        return _import("orjson", "orjson").dumps, loads_json
+    if serializer_id == SERIALIZERS["msgpack"]:
+        msgpack = _import("msgpack", "msgpack")
+        return (
+            lambda payload: msgpack.packb(payload, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False),
+        )
+    raise CodecUnavailableError(f"Serializador de cache desconhecido: {serializer_id}")
+
+
+@cache
+def _compression(compression_id: int) -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    if compression_id == COMPRESSIONS["none"]:
+        return (lambda data: data), (lambda data: data)
+    if compression_id == COMPRESSIONS["zlib"]:
+        return (lambda data: zlib.compress(data, 6)), zlib.decompress
+    if compression_id == COMPRESSIONS["zstd"]:
+        zstandard = _import("zstandard", "zstd")
+        # (de)compressor objects are not safe to share between threads, so one per call
+        return (
+            lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+            lambda data: zstandard.ZstdDecompressor().decompress(data),
+        )
+    raise CodecUnavailableError(f"Compressão de cache desconhecida: {compression_id}")
+
+
+@dataclass(frozen=True, slots=True)
+class EncodedPayload:
+    serializer_id: int
+    compression_id: int
+    data: bytes
+
+
+@dataclass(frozen=True, slots=True)
+class CacheCodec:
+    """Serializer and compression a cache writes with; any registered pair can be read back.
+
+    Payloads shorter than ``compress_min_bytes``, or that compression would not shrink, are
+    stored uncompressed (compression id 0).
+    """
+
+    serializer: str = "json"
+    compression: str = "none"
+    compress_min_bytes: int = 1024
+
+    def __post_init__(self) -> None:
+        if self.serializer not in SERIALIZERS:
+            raise CodecUnavailableError(f"Serializador de cache desconhecido: {self.serializer}")
+        if self.compression not in COMPRESSIONS:
+            raise CodecUnavailableError(f"Compressão de cache desconhecida: {self.compression}")
+        # resolve now so a missing optional package fails at startup, not on the first write
+        _serializer(SERIALIZERS[self.serializer])
+        _compression(COMPRESSIONS[self.compression])
+
+    @property
+    def name(self) -> str:
+        return f"{self.serializer}+{self.compression}"
+
+    def encode(self, payload: object) -> EncodedPayload:
+        serializer_id = SERIALIZERS[self.serializer]
+        dumps, _ = _serializer(serializer_id)
+        return self.compress(serializer_id, dumps(payload))
+
+    def compress(self, serializer_id: int, data: bytes) -> EncodedPayload:
+        """Wrap already serialized bytes, compressing them when they are large enough."""
+        compression_id = COMPRESSIONS[self.compression]
+        if compression_id and len(data) >= self.compress_min_bytes:
+            compress, _ = _compression(compression_id)
+            packed = compress(data)
+            if len(packed) < len(data):
+                return EncodedPayload(serializer_id, compression_id, packed)
+        return EncodedPayload(serializer_id, COMPRESSIONS["none"], data)
+
+    @staticmethod
+    def decode(payload: EncodedPayload) -> Any:
+        _, loads = _serializer(payload.serializer_id)
+        return loads(CacheCodec._decompress(payload))
+
+    @staticmethod
+    def json_bytes(payload: EncodedPayload) -> bytes:
+        """The payload as JSON bytes; JSON payloads only get decompressed, never re-encoded."""
+        if payload.serializer_id in _JSON_SERIALIZERS:
+            return CacheCodec._decompress(payload)
+        return dumps_json(CacheCodec.decode(payload))
+
+    @staticmethod
+    def _decompress(payload: EncodedPayload) -> bytes:
+        _, decompress = _compression(payload.compression_id)
+        return decompress(payload.data)
@@ -1 +1,5 @@
 PAYLOAD_VERSION = "2024-06-01"
+
+# Diary entries loaded per pipeline run: calc uses the latest, the week section the last 7
+# and the trend agent a rolling month.
+HISTORY_WINDOW_LOGS = 30
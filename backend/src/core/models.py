@@ -5,6 +5,7 @@ from domain.entities import (
     CaloricTarget,
     CoachingMessage,
     DailyLog,
+    DailySummary,
     DashboardAlert,
     DashboardCard,
     DashboardChart,
@@ -37,6 +38,7 @@ __all__ = [
     "CaloricTarget",
     "CoachingMessage",
     "DailyLog",
+    "DailySummary",
     "DashboardAlert",
     "DashboardCard",
     "DashboardChart",
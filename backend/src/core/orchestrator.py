@@ -1,21 +1,34 @@
 from __future__ import annotations
 
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
 from dataclasses import dataclass
 from logging import Logger
 from typing import Any, Awaitable, Callable
-from uuid import uuid4
 
 from agents.base import JSONDict
-from agents.calc import CalcAgent
+from agents.calc import CalcAgent, summarize_logs
 from agents.coach import CoachAgent
 from agents.nlp_agent import NLPAgent
 from agents.planner import PlannerAgent
 from agents.trend import TrendAgent
 from agents.ui import UIAgent
-from core.cache import DashboardCache, NoopDashboardCache, init_dashboard_cache
-from core.constants import PAYLOAD_VERSION
+from core.cache import (
+    CachedDashboard,
+    DashboardCache,
+    NoopDashboardCache,
+    StageResultCache,
+    init_dashboard_cache,
+    init_stage_cache,
+)
+from core.constants import HISTORY_WINDOW_LOGS, PAYLOAD_VERSION
 from core.models import (
+    CoachingMessage,
     DailyLog,
+    DailySummary,
     DashboardState,
     MacroBreakdown,
     MicroBreakdown,
@@ -24,29 +37,35 @@ from core.models import (
     UserProfile,
 )
 from core.serialization import (
-    chart_to_json,
-    dashboard_from_json,
     dashboard_to_json,
     log_from_json,
     log_to_json,
-    macro_from_json,
-    macro_to_json,
-    micro_from_json,
-    micro_to_json,
     plan_from_json,
     plan_to_json,
     profile_to_json,
-    trend_from_json,
-    trend_to_json,
 )
-from database import get_repository
-from domain.repositories import Repository
-from services.event_bus import AsyncEventBus, Event
+from database import as_async_repository, get_async_repository
+from domain.repositories import (
+    AsyncRepository,
+    AsyncUnitOfWork,
+    PipelineSnapshot,
+    Repository,
+    StalePlanError,
+)
+from services.event_bus import AsyncEventBus, Event, EventBusFullError, init_event_bus
+from services.idempotency import init_idempotency_store
+from services.pipeline_queue import init_pipeline_queue
 from services import charting
 from services.realtime import RealtimePublisher
+from .pipeline import Stage, StageGraph
+from .singleflight import SingleFlight
 from .validation import validate_profile
 from .tracing import generate_trace_id
-from .telemetry import record_counter, set_current_trace_id, start_span
+from .telemetry import record_counter, record_histogram, set_current_trace_id, start_span
+
+# first and longest pause between polls while another process holds the rebuild lease
+_LEASE_POLL_SECONDS = 0.05
+_LEASE_POLL_MAX_SECONDS = 0.25
 
 
 @dataclass
@@ -63,22 +82,30 @@ class PipelineState:
     plan: NutritionPlan
     profile: UserProfile
     logs: list[DailyLog]
+    days: list[DailySummary]
     calc: CalcSnapshot | None = None
     trends: list[TrendInsight] | None = None
-    coach_messages: list[str] | None = None
+    coach_messages: list[CoachingMessage] | None = None
+    dashboard: DashboardState | None = None
 
 
 class Orchestrator:
     def __init__(
         self,
         logger: Logger,
-        repository: Repository | None = None,
+        repository: Repository | AsyncRepository | None = None,
         realtime: RealtimePublisher | None = None,
         event_bus: AsyncEventBus | None = None,
         cache: DashboardCache | None = None,
+        stage_executor: Executor | None = None,
+        stage_cache: StageResultCache | None = None,
+        history_window: int = HISTORY_WINDOW_LOGS,
+        lease_wait_seconds: float = 2.0,
     ) -> None:
         self.logger = logger
-        self.repository = repository or get_repository()
+        self.repository = (
+            as_async_repository(repository) if repository else get_async_repository()
+        )
         self.planner = PlannerAgent()
         self.nlp = NLPAgent()
         self.calc = CalcAgent()
@@ -89,11 +116,54 @@ class Orchestrator:
         self.event_bus = event_bus or AsyncEventBus(logger)
         self.cache = cache or NoopDashboardCache()
         self.tracer = start_span  # alias to reuse context manager
+        # keyed by (user, dashboard version) so a read after a write never joins an older rebuild
+        self.dashboard_flights: SingleFlight[DashboardState] = SingleFlight(resource="dashboard")
+        self._dashboard_versions: dict[str, int] = {}
+        self._revalidations: dict[str, asyncio.Task[DashboardState]] = {}
+        self.history_window = history_window
+        self.lease_wait_seconds = lease_wait_seconds
+        self.stage_cache = stage_cache or StageResultCache()
+        self.pipeline = StageGraph(
+            self._pipeline_stages(), executor=stage_executor, memo=self.stage_cache
+        )
         self._register_pipeline_handlers()
 
+    def _pipeline_stages(self) -> list[Stage]:
+        return [
+            Stage(
+                name="calc",
+                reads=frozenset({"plan", "profile", "days"}),
+                writes=frozenset({"calc"}),
+                run=self._stage_calc,
+                cpu_bound=True,
+                memoize=True,
+            ),
+            Stage(
+                name="trends",
+                reads=frozenset({"days"}),
+                writes=frozenset({"trends"}),
+                run=self._stage_trends,
+                cpu_bound=True,
+                memoize=True,
+            ),
+            Stage(
+                name="coach",
+                reads=frozenset({"plan", "calc", "trends"}),
+                writes=frozenset({"coach_messages"}),
+                run=self._stage_coach,
+                cpu_bound=True,
+                memoize=True,
+            ),
+            Stage(
+                name="dashboard",
+                reads=frozenset({"user", "plan", "logs", "days", "calc", "coach_messages"}),
+                writes=frozenset({"dashboard"}),
+                run=self._stage_dashboard,
+            ),
+        ]
+
     def _register_pipeline_handlers(self) -> None:
-        self.event_bus.register("calc.requested", self._on_calc_requested)
-        self.event_bus.register("trend.requested", self._on_trend_requested)
+        self.event_bus.register_batch("calc.requested", self._on_calc_requested)
         self.event_bus.register("coach.requested", self._on_coach_requested)
         self.event_bus.register("dashboard.requested", self._on_dashboard_requested_event)
 
@@ -103,76 +173,63 @@ class Orchestrator:
     def _default_micros(self) -> MicroBreakdown:
         return MicroBreakdown(fiber_g=0, omega3_mg=0, iron_mg=0, calcium_mg=0, sodium_mg=0)
 
-    def _build_pipeline_state(self, user: str) -> PipelineState:
-        plan = self.repository.latest_plan(user)
-        if not plan:
+    async def _build_pipeline_state(self, user: str, work: AsyncUnitOfWork) -> PipelineState:
+        return self._state_from_snapshot(user, await work.snapshot(user, self.history_window))
+
+    def _state_from_snapshot(self, user: str, snapshot: PipelineSnapshot) -> PipelineState:
+        if not snapshot.plan:
             raise ValueError("Nenhum plano cadastrado")
-        profile = self.repository.get_profile(user)
-        if not profile:
+        if not snapshot.profile:
             raise ValueError("Perfil não encontrado")
-        logs = self.repository.logs(user)
-        return PipelineState(user=user, plan=plan, profile=profile, logs=logs)
+        return PipelineState(
+            user=user,
+            plan=snapshot.plan,
+            profile=snapshot.profile,
+            logs=snapshot.logs,
+            # backends without stored rollups still get them, derived from the log window
+            days=snapshot.days or summarize_logs(snapshot.logs),
+        )
 
-    async def _stage_calc(self, state: PipelineState, trace_id: str) -> PipelineState:
+    def _stage_calc(self, state: PipelineState, trace_id: str) -> PipelineState:
         set_current_trace_id(trace_id)
-        latest_log = state.logs[-1] if state.logs else None
-        calc_payload: JSONDict = {
-            "plan": plan_to_json(state.plan),
-            "log": log_to_json(latest_log) if latest_log else None,
-            "profile": profile_to_json(state.profile),
-            "trace_id": trace_id,
-            "payload_version": PAYLOAD_VERSION,
-        }
+        latest_day = state.days[-1] if state.days else None
         with self.tracer(
             "pipeline.calc",
             {"trace_id": trace_id, "user": state.user, "agent": "calc"},
         ):
-            calc_result = await self.calc(calc_payload)
+            calc_result = self.calc.calculate(state.plan, None, state.profile, day=latest_day)
             record_counter("agent.invocations", attributes={"agent": "calc"})
-        macros = macro_from_json(calc_result["macros"])
-        micros = micro_from_json(calc_result["micros"])
-        hydration_actual = float(calc_result["hydration_l"])
         state.calc = CalcSnapshot(
-            macros=macros,
-            micros=micros,
-            hydration_actual=hydration_actual,
-            alerts=calc_result.get("alerts", []),
+            macros=calc_result.macros,
+            micros=calc_result.micros,
+            hydration_actual=calc_result.hydration_l,
+            alerts=calc_result.alerts,
         )
         return state
 
-    async def _stage_trends(self, state: PipelineState, trace_id: str) -> PipelineState:
+    def _stage_trends(self, state: PipelineState, trace_id: str) -> PipelineState:
         set_current_trace_id(trace_id)
-        trends_payload = {
-            "logs": [log_to_json(log) for log in state.logs],
-            "trace_id": trace_id,
-            "payload_version": PAYLOAD_VERSION,
-        }
         with self.tracer(
             "pipeline.trend",
             {"trace_id": trace_id, "user": state.user, "agent": "trend"},
         ):
-            trend_result = await self.trend(trends_payload)
+            state.trends = self.trend.analyze_days(state.days)
             record_counter("agent.invocations", attributes={"agent": "trend"})
-        state.trends = [trend_from_json(item) for item in trend_result.get("trends", [])]
         return state
 
-    async def _stage_coach(self, state: PipelineState, trace_id: str) -> PipelineState:
+    def _stage_coach(self, state: PipelineState, trace_id: str) -> PipelineState:
         set_current_trace_id(trace_id)
-        coach_payload = {
-            "macros": macro_to_json(state.calc.macros if state.calc else self._default_macros()),
-            "targets": macro_to_json(state.plan.macro_targets),
-            "micros": micro_to_json(state.calc.micros if state.calc else self._default_micros()),
-            "trends": [trend_to_json(trend) for trend in (state.trends or [])],
-            "trace_id": trace_id,
-            "payload_version": PAYLOAD_VERSION,
-        }
         with self.tracer(
             "pipeline.coach",
             {"trace_id": trace_id, "user": state.user, "agent": "coach"},
         ):
-            coach_result = await self.coach(coach_payload)
+            state.coach_messages = self.coach.compose(
+                state.calc.macros if state.calc else self._default_macros(),
+                state.plan.macro_targets,
+                state.calc.micros if state.calc else self._default_micros(),
+                state.trends or [],
+            )
             record_counter("agent.invocations", attributes={"agent": "coach"})
-        state.coach_messages = coach_result.get("messages", [])
         return state
 
     async def _stage_dashboard(self, state: PipelineState, trace_id: str) -> DashboardState:
@@ -191,64 +248,71 @@ class Orchestrator:
                     state.plan.hydration.total_liters, state.calc.hydration_actual
                 )
             )
-        coach_result = state.coach_messages or []
-        ui_payload = {
-            "user": state.user,
-            "plan": plan_to_json(state.plan),
-            "targets": macro_to_json(state.plan.macro_targets),
-            "actuals": macro_to_json(state.calc.macros if state.calc else self._default_macros()),
-            "micros": micro_to_json(state.calc.micros if state.calc else self._default_micros()),
-            "micro_targets": micro_to_json(state.plan.micro_targets),
-            "hydration_target": state.plan.hydration.total_liters,
-            "hydration_actual": state.calc.hydration_actual if state.calc else 0,
-            "charts": [chart_to_json(chart) for chart in charts],
-            "messages": coach_result,
-            "logs": [log_to_json(log) for log in state.logs],
-            "calc_alerts": state.calc.alerts if state.calc else [],
-            "trace_id": trace_id,
-            "payload_version": PAYLOAD_VERSION,
-        }
         with self.tracer(
             "pipeline.dashboard",
             {"trace_id": trace_id, "user": state.user, "agent": "dashboard"},
         ):
-            ui_result = await self.ui(ui_payload)
+            dashboard = self.ui.render(
+                user=state.user,
+                plan=state.plan,
+                macros_actual=state.calc.macros if state.calc else self._default_macros(),
+                macros_target=state.plan.macro_targets,
+                micros_actual=state.calc.micros if state.calc else self._default_micros(),
+                micro_targets=state.plan.micro_targets,
+                hydration_target=state.plan.hydration.total_liters,
+                hydration_actual=state.calc.hydration_actual if state.calc else 0.0,
+                logs=state.logs,
+                charts=charts,
+                messages=state.coach_messages or [],
+                calc_alerts=state.calc.alerts if state.calc else [],
+                days=state.days,
+            )
             record_counter("agent.invocations", attributes={"agent": "dashboard"})
-        dashboard = dashboard_from_json(ui_result["dashboard"])
-        self.repository.save_dashboard(dashboard)
-        await self._broadcast(state.user, "dashboard.updated", dashboard_to_json(dashboard))
+        state.dashboard = dashboard
         self._log_event("dashboard.refresh", user=state.user, charts=len(charts), trace_id=trace_id)
         return dashboard
 
-    async def _on_calc_requested(self, event: Event) -> None:
-        state = self._build_pipeline_state(event.payload["user"])
-        state = await self._stage_calc(state, event.trace_id)
-        await self.event_bus.publish(
-            Event(
-                name="trend.requested",
-                payload={"state": state},
-                trace_id=event.trace_id,
-                version=event.version,
-                idempotency_key=f"trend:{state.user}:{event.version}:{event.trace_id}",
-            )
+    async def _on_calc_requested(self, events: list[Event]) -> list[Exception | None]:
+        # one snapshot read serves the whole batch; calc and trends of each user run concurrently
+        # and a user that fails only fails its own event
+        users = [event.payload["user"] for event in events]
+        async with self.repository.unit_of_work() as work:
+            snapshots = await work.snapshots(users, self.history_window)
+        outcomes: list[Exception | None] = [None] * len(events)
+        runs: list[tuple[int, PipelineState, Event]] = []
+        for idx, (user, event) in enumerate(zip(users, events, strict=True)):
+            try:
+                runs.append((idx, self._state_from_snapshot(user, snapshots[user]), event))
+            except ValueError as exc:
+                outcomes[idx] = exc
+        results = await asyncio.gather(
+            *(
+                self.pipeline.run(state, event.trace_id, stages=("calc", "trends"))
+                for _, state, event in runs
+            ),
+            return_exceptions=True,
         )
-
-    async def _on_trend_requested(self, event: Event) -> None:
-        state: PipelineState = event.payload["state"]
-        state = await self._stage_trends(state, event.trace_id)
-        await self.event_bus.publish(
-            Event(
-                name="coach.requested",
-                payload={"state": state},
-                trace_id=event.trace_id,
-                version=event.version,
-                idempotency_key=f"coach:{state.user}:{event.version}:{event.trace_id}",
+        for (idx, state, event), result in zip(runs, results, strict=True):
+            if isinstance(result, Exception):
+                outcomes[idx] = result
+                continue
+            if isinstance(result, BaseException):
+                raise result
+            await self.event_bus.publish(
+                Event(
+                    name="coach.requested",
+                    payload={"state": state},
+                    trace_id=event.trace_id,
+                    version=event.version,
+                    idempotency_key=f"coach:{state.user}:{event.version}:{event.trace_id}",
+                    partition_key=state.user,
+                )
             )
-        )
+        return outcomes
 
     async def _on_coach_requested(self, event: Event) -> None:
         state: PipelineState = event.payload["state"]
-        state = await self._stage_coach(state, event.trace_id)
+        await self.pipeline.run(state, event.trace_id, stages=("coach",))
         await self.event_bus.publish(
             Event(
                 name="dashboard.requested",
@@ -256,12 +320,17 @@ class Orchestrator:
                 trace_id=event.trace_id,
                 version=event.version,
                 idempotency_key=f"dashboard:{state.user}:{event.version}:{event.trace_id}",
+                partition_key=state.user,
             )
         )
 
     async def _on_dashboard_requested_event(self, event: Event) -> None:
         state: PipelineState = event.payload["state"]
-        await self._stage_dashboard(state, event.trace_id)
+        dashboard = await self._stage_dashboard(state, event.trace_id)
+        await self.repository.save_dashboard(dashboard)
+        # with a shared cache this is what lets the API serve a dashboard a worker process built
+        self.cache.set_dashboard(state.user, dashboard)
+        await self._broadcast(state.user, "dashboard.updated", dashboard_to_json(dashboard))
 
     async def build_plan(
         self, profile: UserProfile, trace_id: str | None = None
@@ -278,9 +347,9 @@ class Orchestrator:
             )
             record_counter("agent.invocations", attributes={"agent": "planner"})
         plan = plan_from_json(plan_result["plan"])
-        self.repository.upsert_profile(profile)
-        self.repository.save_plan(plan)
-        self.cache.invalidate(profile.name)
+        await self.repository.upsert_profile(profile)
+        await self.repository.save_plan(plan)
+        self._invalidate_dashboard(profile.name)
         await self._broadcast(profile.name, "plan.updated", plan_result["plan"])
         self._log_event("plan.generated", user=profile.name, days=len(plan.days), trace_id=trace_id)
         return plan, notes
@@ -292,27 +361,151 @@ class Orchestrator:
             {"user": user, "entries": entries, "trace_id": trace_id, "payload_version": PAYLOAD_VERSION}
         )
         log = log_from_json(log_result["log"])
-        self.repository.append_log(log)
-        self.cache.invalidate(user)
+        await self.repository.append_log(log)
+        self._invalidate_dashboard(user)
         await self._broadcast(user, "diary.processed", log_result["log"])
         self._log_event("diary.ingested", user=user, meals=len(log.meals), trace_id=trace_id)
-        await self._trigger_pipeline(user=user, trace_id=trace_id)
+        try:
+            await self._trigger_pipeline(user=user, trace_id=trace_id)
+        except EventBusFullError:
+            # the log is stored and the cache invalidated; the next read rebuilds the dashboard
+            self._log_event("pipeline.deferred", user=user, trace_id=trace_id)
         return log
 
+    def dashboard_version(self, user: str) -> int:
+        """Bumped by every plan or log write this process makes for ``user``."""
+        return self._dashboard_versions.get(user, 0)
+
+    def _invalidate_dashboard(self, user: str) -> None:
+        self._dashboard_versions[user] = self.dashboard_version(user) + 1
+        self.cache.invalidate(user)
+
     async def refresh_dashboard(self, user: str, trace_id: str | None = None) -> DashboardState:
+        read = await self.read_dashboard(user, trace_id)
+        assert read.dashboard is not None
+        return read.dashboard
+
+    async def read_dashboard(
+        self, user: str, trace_id: str | None = None, *, body: bool = False
+    ) -> CachedDashboard:
+        """The cached dashboard, or one rebuilt through the single-flight on a miss.
+
+        A stale cached copy is returned right away while one background rebuild refreshes
+        it. With ``body`` a cache hit carries the JSON bytes instead of the decoded state.
+        """
         trace_id = trace_id or generate_trace_id()
         set_current_trace_id(trace_id)
-        cached = self.cache.get_dashboard(user)
-        if cached:
-            record_counter("cache.hits", attributes={"resource": "dashboard"})
+        cached = self.cache.get_cached(user, body=body)
+        if cached is not None:
+            attributes = {"resource": "dashboard", "format": "bytes" if body else "state"}
+            if cached.stale:
+                record_counter("cache.stale", attributes=attributes)
+                record_histogram("cache.stale_age_seconds", cached.age(), attributes=attributes)
+                self._revalidate(user, trace_id)
+            else:
+                record_counter("cache.hits", attributes=attributes)
             return cached
         record_counter("cache.misses", attributes={"resource": "dashboard"})
-        state = self._build_pipeline_state(user)
-        state = await self._stage_calc(state, trace_id)
-        state = await self._stage_trends(state, trace_id)
-        state = await self._stage_coach(state, trace_id)
-        board = await self._stage_dashboard(state, trace_id)
-        self.cache.set_dashboard(user, board)
+        key = (user, self.dashboard_version(user))
+        if self.dashboard_flights.in_flight(key):
+            self._log_event("dashboard.coalesced", user=user, trace_id=trace_id)
+        board = await self.dashboard_flights.run(
+            key, lambda: self._rebuild_under_lease(user, trace_id, key[1])
+        )
+        return CachedDashboard(stored_at=time.time(), dashboard=board)
+
+    async def _rebuild_under_lease(self, user: str, trace_id: str, version: int) -> DashboardState:
+        # across processes only the lease holder rebuilds; the others wait for its write
+        token = self.cache.acquire_refresh(user)
+        if token is None:
+            board = await self._await_refresh(user)
+            if board is not None:
+                return board
+            # the holder is slow or died: rebuild here, under the lease if it expired meanwhile
+            token = self.cache.acquire_refresh(user)
+        try:
+            return await self._rebuild_dashboard(user, trace_id, version)
+        finally:
+            if token is not None:
+                self.cache.release_refresh(user, token)
+
+    async def _await_refresh(self, user: str) -> DashboardState | None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.lease_wait_seconds
+        delay = min(_LEASE_POLL_SECONDS, self.lease_wait_seconds / 10)
+        # the cache client blocks, so each poll runs in a worker thread; the interval backs off
+        # with jitter so processes waiting on the same lease do not hit Redis in lockstep
+        while (remaining := deadline - loop.time()) > 0:
+            await asyncio.sleep(min(remaining, delay * random.uniform(0.5, 1.5)))
+            cached = await asyncio.to_thread(self.cache.get_cached, user)
+            if cached is not None:
+                self._record_lease_wait(started, "filled")
+                return cached.dashboard
+            delay = min(delay * 2, _LEASE_POLL_MAX_SECONDS)
+        self._record_lease_wait(started, "timeout")
+        return None
+
+    @staticmethod
+    def _record_lease_wait(started: float, outcome: str) -> None:
+        waited_ms = (asyncio.get_running_loop().time() - started) * 1000
+        record_histogram("cache.lease_wait_ms", waited_ms, attributes={"outcome": outcome})
+
+    def _revalidate(self, user: str, trace_id: str) -> None:
+        # one background rebuild per user; it joins a rebuild a cache miss already started
+        if user in self._revalidations:
+            return
+        token = self.cache.acquire_refresh(user)
+        if token is None:
+            # another process is refreshing this dashboard; keep serving the stale copy
+            return
+        version = self.dashboard_version(user)
+        task = asyncio.ensure_future(
+            self.dashboard_flights.run(
+                (user, version), lambda: self._rebuild_dashboard(user, trace_id, version)
+            )
+        )
+        self._revalidations[user] = task
+        task.add_done_callback(lambda done: self._revalidated(user, trace_id, token, done))
+
+    def _revalidated(self, user: str, trace_id: str, token: str, task: asyncio.Task) -> None:
+        del self._revalidations[user]
+        self.cache.release_refresh(user, token)
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None:
+            # the stale copy stays in place; the next read tries again
+            self.logger.warning(
+                "dashboard.revalidate_failed",
+                extra={"user": user, "trace_id": trace_id, "error": str(error)},
+            )
+
+    async def _rebuild_dashboard(self, user: str, trace_id: str, version: int) -> DashboardState:
+        try:
+            board = await self._run_dashboard_pipeline(user, trace_id)
+        except StalePlanError:
+            # a new plan landed while the pipeline ran; rebuild once from a fresh snapshot
+            record_counter("repository.plan_conflicts", attributes={"resource": "dashboard"})
+            self._log_event("dashboard.plan_conflict", user=user, trace_id=trace_id)
+            board = await self._run_dashboard_pipeline(user, trace_id)
+        await self._broadcast(user, "dashboard.updated", dashboard_to_json(board))
+        if self.dashboard_version(user) == version:
+            self.cache.set_dashboard(user, board)
+        else:
+            # a write landed while this ran: the board predates it and must not be cached as fresh
+            record_counter("cache.discarded_writes", attributes={"resource": "dashboard"})
+        return board
+
+    async def _run_dashboard_pipeline(self, user: str, trace_id: str) -> DashboardState:
+        # one borrowed connection: snapshot reads up front, the dashboard write on exit
+        async with self.repository.unit_of_work() as work:
+            state = await self._build_pipeline_state(user, work)
+            await self.pipeline.run(state, trace_id)
+            board = state.dashboard
+            if board is None:
+                raise RuntimeError("Pipeline terminou sem produzir o dashboard")
+            work.save_dashboard(board)
         return board
 
     async def full_cycle(
@@ -364,6 +557,7 @@ class Orchestrator:
                 trace_id=trace_id,
                 version=PAYLOAD_VERSION,
                 idempotency_key=f"calc:{user}:{PAYLOAD_VERSION}:{trace_id}",
+                partition_key=user,
             )
         )
 
@@ -381,8 +575,28 @@ class Orchestrator:
 _orchestrator: Orchestrator | None = None
 
 
-def get_orchestrator(logger: Logger) -> Orchestrator:
+def _init_stage_executor(logger: Logger) -> Executor | None:
+    workers = int(os.getenv("PIPELINE_EXECUTOR_WORKERS", "0"))
+    if workers <= 0:
+        return None
+    logger.info("pipeline.executor", extra={"workers": workers})
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline-stage")
+
+
+def get_orchestrator(logger: Logger, event_bus: AsyncEventBus | None = None) -> Orchestrator:
     global _orchestrator
     if not _orchestrator:
-        _orchestrator = Orchestrator(logger, cache=init_dashboard_cache(logger))
+        _orchestrator = Orchestrator(
+            logger,
+            cache=init_dashboard_cache(logger),
+            event_bus=event_bus
+            or init_event_bus(
+                logger,
+                idempotency=init_idempotency_store(logger),
+                outbox=init_pipeline_queue(logger),
+            ),
+            stage_executor=_init_stage_executor(logger),
+            stage_cache=init_stage_cache(logger),
+            lease_wait_seconds=float(os.getenv("CACHE_LEASE_WAIT_MS", "2000")) / 1000,
+        )
     return _orchestrator
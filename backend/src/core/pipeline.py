@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Iterable
+
+from .cache import StageResultCache, stage_fingerprint
+from .telemetry import record_histogram, start_span
+
+StageRunner = Callable[[Any, str], Awaitable[object]]
+StageFunction = Callable[[Any, str], object]
+
+
+@dataclass(frozen=True, slots=True)
+class Stage:
+    """A pipeline step declaring which ``PipelineState`` fields it reads and writes.
+
+    ``run`` is a coroutine function, or a plain function when ``cpu_bound`` is set.
+    """
+
+    name: str
+    reads: frozenset[str]
+    writes: frozenset[str]
+    run: StageRunner | StageFunction
+    cpu_bound: bool = False
+    memoize: bool = False
+
+
+@dataclass(slots=True)
+class StageTiming:
+    name: str
+    started_at: float
+    finished_at: float
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.finished_at - self.started_at) * 1000
+
+
+@dataclass(slots=True)
+class PipelineRun:
+    timings: dict[str, StageTiming] = field(default_factory=dict)
+    critical_path: list[str] = field(default_factory=list)
+    memoized: list[str] = field(default_factory=list)
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    @property
+    def wall_ms(self) -> float:
+        return (self.finished_at - self.started_at) * 1000
+
+    @property
+    def critical_path_ms(self) -> float:
+        return sum(self.timings[name].duration_ms for name in self.critical_path)
+
+
+class StageGraph:
+    """Schedule stages by data dependency, running independent ones concurrently.
+
+    A stage depends on every stage that writes a field it reads; fields nobody writes are
+    treated as inputs already present on the state. Every stage is a task on the running
+    loop; CPU-bound stages are plain functions run in ``executor`` (the loop's default
+    executor when none is given), so independent ones overlap and none holds the loop.
+    Stages marked ``memoize`` reuse their previous outputs from ``memo`` when their inputs
+    are unchanged.
+    """
+
+    def __init__(
+        self,
+        stages: Iterable[Stage],
+        executor: Executor | None = None,
+        memo: StageResultCache | None = None,
+    ) -> None:
+        self.stages: dict[str, Stage] = {}
+        producers: dict[str, str] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Estágio duplicado: {stage.name}")
+            for field_name in stage.writes:
+                if field_name in producers:
+                    raise ValueError(
+                        f"Campo {field_name} escrito por {producers[field_name]} e {stage.name}"
+                    )
+                producers[field_name] = stage.name
+            self.stages[stage.name] = stage
+        self.executor = executor
+        self.memo = memo
+        self._dependencies = {
+            name: frozenset(
+                producers[field_name]
+                for field_name in stage.reads
+                if field_name in producers and producers[field_name] != name
+            )
+            for name, stage in self.stages.items()
+        }
+        self.order = self._topological_order()
+
+    def dependencies(self, name: str) -> frozenset[str]:
+        return self._dependencies[name]
+
+    def _topological_order(self) -> list[str]:
+        order: list[str] = []
+        visiting: set[str] = set()
+        done: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Ciclo detectado no grafo de estágios em {name}")
+            visiting.add(name)
+            for dep in sorted(self._dependencies[name]):
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    async def run(
+        self, state: Any, trace_id: str, stages: Iterable[str] | None = None
+    ) -> PipelineRun:
+        """Run ``stages`` (all by default); dependencies outside the selection are assumed met."""
+
+        selected = set(stages) if stages is not None else set(self.stages)
+        unknown = selected - set(self.stages)
+        if unknown:
+            raise ValueError(f"Estágios desconhecidos: {sorted(unknown)}")
+        run = PipelineRun(started_at=time.perf_counter())
+        tasks: dict[str, asyncio.Task[None]] = {}
+        for name in self.order:
+            if name not in selected:
+                continue
+            deps = [tasks[dep] for dep in self._dependencies[name] if dep in tasks]
+            tasks[name] = asyncio.create_task(self._execute(name, deps, state, trace_id, run))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            raise
+        run.finished_at = time.perf_counter()
+        run.critical_path = self._critical_path(run)
+        self._export_critical_path(run, trace_id)
+        return run
+
+    async def _execute(
+        self,
+        name: str,
+        deps: list[asyncio.Task[None]],
+        state: Any,
+        trace_id: str,
+        run: PipelineRun,
+    ) -> None:
+        if deps:
+            await asyncio.gather(*deps)
+        stage = self.stages[name]
+        started_at = time.perf_counter()
+        fingerprint: str | None = None
+        if stage.memoize and self.memo is not None:
+            fingerprint = stage_fingerprint(
+                name, {field_name: getattr(state, field_name) for field_name in stage.reads}
+            )
+            outputs = self.memo.get(name, fingerprint)
+            if outputs is not None:
+                for field_name, value in outputs.items():
+                    setattr(state, field_name, value)
+                run.timings[name] = StageTiming(name, started_at, time.perf_counter())
+                run.memoized.append(name)
+                return
+        if stage.cpu_bound:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            await loop.run_in_executor(self.executor, context.run, stage.run, state, trace_id)
+        else:
+            await stage.run(state, trace_id)
+        if fingerprint is not None and self.memo is not None:
+            self.memo.set(
+                name,
+                fingerprint,
+                {field_name: getattr(state, field_name) for field_name in stage.writes},
+            )
+        run.timings[name] = StageTiming(name, started_at, time.perf_counter())
+
+    def _critical_path(self, run: PipelineRun) -> list[str]:
+        if not run.timings:
+            return []
+        current: str | None = max(run.timings.values(), key=lambda t: t.finished_at).name
+        path: list[str] = []
+        while current is not None:
+            path.append(current)
+            upstream = [dep for dep in self._dependencies[current] if dep in run.timings]
+            current = (
+                max(upstream, key=lambda dep: run.timings[dep].finished_at) if upstream else None
+            )
+        return list(reversed(path))
+
+    def _export_critical_path(self, run: PipelineRun, trace_id: str) -> None:
+        attributes = {
+            "trace_id": trace_id,
+            "stages": ">".join(run.critical_path),
+            "critical_path_ms": round(run.critical_path_ms, 3),
+            "wall_ms": round(run.wall_ms, 3),
+        }
+        with start_span("pipeline.critical_path", attributes):
+            record_histogram(
+                "pipeline.critical_path_ms",
+                run.critical_path_ms,
+                attributes={"stages": attributes["stages"]},
+            )
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+from .telemetry import record_counter
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Flight(Generic[T]):
+    task: asyncio.Task[T]
+    waiters: int = 1
+
+
+@dataclass
+class SingleFlight(Generic[T]):
+    """Coalesce concurrent calls sharing a key into a single in-flight execution.
+
+    The first caller for a key starts the work; callers arriving while it is running
+    await the same task and receive the same result (or the same exception).
+    """
+
+    resource: str = "default"
+    _flights: dict[Hashable, _Flight[T]] = field(default_factory=dict, init=False)
+    coalesced: int = field(default=0, init=False)
+
+    def in_flight(self, key: Hashable) -> int:
+        """Return how many callers are currently waiting on ``key`` (0 when idle)."""
+
+        flight = self._flights.get(key)
+        return flight.waiters if flight else 0
+
+    async def run(self, key: Hashable, factory: Callable[[], Awaitable[T]]) -> T:
+        flight = self._flights.get(key)
+        if flight is None:
+            task = asyncio.ensure_future(factory())
+            flight = _Flight(task=task)
+            self._flights[key] = flight
+            task.add_done_callback(lambda _task, key=key, flight=flight: self._finish(key, flight))
+        else:
+            flight.waiters += 1
+            self.coalesced += 1
+            record_counter("singleflight.coalesced", attributes={"resource": self.resource})
+        # shield so a cancelled waiter does not cancel the run shared with other callers
+        return await asyncio.shield(flight.task)
+
+    def _finish(self, key: Hashable, flight: _Flight[T]) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        record_counter("singleflight.executions", attributes={"resource": self.resource})
+        if not flight.task.cancelled():
+            # mark the exception as retrieved when every waiter already went away
+            flight.task.exception()
@@ -92,3 +92,15 @@ def start_span(name: str, attributes: Mapping[str, object] | None = None):
 def record_counter(name: str, amount: int = 1, attributes: Mapping[str, object] | None = None) -> None:
     counter = _meter.create_counter(name)
     counter.add(amount, attributes=attributes or {})
+
+
+def record_histogram(
+    name: str, value: float, attributes: Mapping[str, object] | None = None
+) -> None:
+    histogram = _meter.create_histogram(name)
+    histogram.record(value, attributes=attributes or {})
+
+
+def record_gauge(name: str, value: float, attributes: Mapping[str, object] | None = None) -> None:
+    gauge = _meter.create_gauge(name)
+    gauge.set(value, attributes=attributes or {})
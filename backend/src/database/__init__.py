@@ -1,9 +1,22 @@
+from .async_repository import (
+    AsyncPostgresRepository,
+    SyncRepositoryAdapter,
+    as_async_repository,
+    get_async_repository,
+)
+from .caching import RepositoryCache, init_repository_cache
 from .cli import healthcheck, migrate, migrate_and_seed, seed
 from .postgres import get_repository, PostgresRepository
 
 __all__ = [
     "get_repository",
+    "get_async_repository",
+    "as_async_repository",
     "PostgresRepository",
+    "AsyncPostgresRepository",
+    "SyncRepositoryAdapter",
+    "RepositoryCache",
+    "init_repository_cache",
     "migrate",
     "seed",
     "migrate_and_seed",
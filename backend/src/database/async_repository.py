@@ -0,0 +1,373 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import inspect
+import os
+from contextlib import AbstractContextManager, asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Sequence, TypeVar
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import StaticPool
+
+from domain.entities import DailyLog, DailySummary, DashboardState, NutritionPlan, UserProfile
+from domain.repositories import (
+    AsyncRepository,
+    AsyncUnitOfWork,
+    LogCursor,
+    LogPage,
+    PipelineSnapshot,
+    Repository,
+    UnitOfWork,
+)
+
+from . import operations
+from .caching import RepositoryCache, init_repository_cache
+from .models import Base
+from .postgres import _get_database_url, get_repository
+from .seeds import ensure_reference_data
+
+T = TypeVar("T")
+
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+_ASYNC_ENGINE: AsyncEngine | None = None
+
+
+def async_database_url(url: str) -> str:
+    """Rewrite a sync SQLAlchemy URL (pysqlite/psycopg2) to its asyncio driver."""
+
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    driver = _ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"Sem driver assíncrono para {backend}")
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+
+def async_driver_available(url: str) -> bool:
+    driver = _ASYNC_DRIVERS.get(make_url(url).get_backend_name())
+    if driver is None:
+        return False
+    return all(importlib.util.find_spec(module) for module in (driver, "greenlet"))
+
+
+def _engine_options(url: str) -> dict[str, Any]:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return {"pool_pre_ping": True}
+    if parsed.database in (None, "", ":memory:"):
+        # an in-memory database only exists on the connection that created it
+        return {"poolclass": StaticPool}
+    return {}
+
+
+def _get_async_engine() -> AsyncEngine:
+    global _ASYNC_ENGINE
+    if _ASYNC_ENGINE is None:
+        url = async_database_url(_get_database_url())
+        _ASYNC_ENGINE = create_async_engine(url, **_engine_options(url))
+    return _ASYNC_ENGINE
+
+
+class AsyncSqlUnitOfWork(AsyncUnitOfWork):
+    """Async ``SqlUnitOfWork``: one connection, a read-only snapshot, one write batch."""
+
+    def __init__(
+        self,
+        engine: AsyncEngine,
+        session_factory: async_sessionmaker[AsyncSession],
+        ready: Callable[[], Awaitable[None]],
+        cache: RepositoryCache | None = None,
+    ) -> None:
+        self._engine = engine
+        self._session_factory = session_factory
+        self._ready = ready
+        self._cache = cache
+        self._connection: AsyncConnection | None = None
+        self._session: AsyncSession | None = None
+        self._pending: list[operations.PendingWrite] = []
+        self._plan_version: int | None = None
+
+    async def __aenter__(self) -> AsyncSqlUnitOfWork:
+        await self._ready()
+        self._connection = await self._engine.connect()
+        self._session = self._session_factory(bind=self._connection)
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, *_: object) -> None:
+        try:
+            if exc_type is None:
+                await self.commit()
+        finally:
+            self._pending.clear()
+            if self._session is not None:
+                await self._session.close()
+            if self._connection is not None:
+                await self._connection.close()
+            self._session = self._connection = None
+
+    def _active_session(self) -> AsyncSession:
+        if self._session is None:
+            raise RuntimeError("Unidade de trabalho usada fora do bloco async with")
+        return self._session
+
+    async def snapshot(self, user: str, history: int) -> PipelineSnapshot:
+        session = self._active_session()
+        async with session.begin():
+            snapshot = await session.run_sync(
+                operations.pipeline_snapshot, user, history, self._cache
+            )
+        self._plan_version = snapshot.plan_version
+        return snapshot
+
+    async def snapshots(self, users: Sequence[str], history: int) -> dict[str, PipelineSnapshot]:
+        session = self._active_session()
+        async with session.begin():
+            return await session.run_sync(
+                operations.pipeline_snapshots, users, history, self._cache
+            )
+
+    def save_dashboard(self, dashboard: DashboardState) -> None:
+        self._pending.append((operations.save_dashboard, (dashboard, self._plan_version)))
+
+    def append_log(self, log: DailyLog) -> None:
+        self._pending.append((operations.append_log, (log,)))
+
+    async def commit(self) -> None:
+        if not self._pending:
+            return
+        session = self._active_session()
+        pending, self._pending = self._pending, []
+        async with session.begin():
+            await session.run_sync(operations.apply_writes, pending)
+
+
+class AsyncPostgresRepository(AsyncRepository):
+    """Repository on SQLAlchemy's asyncio extension (asyncpg/aiosqlite).
+
+    Queries are the same ``database.operations`` used by ``PostgresRepository``, executed
+    through ``AsyncSession.run_sync`` so I/O never blocks the event loop.
+    """
+
+    def __init__(
+        self, engine: AsyncEngine | None = None, cache: RepositoryCache | None = None
+    ) -> None:
+        self._engine = engine or _get_async_engine()
+        # decoded profiles and plans, reused while their database version is unchanged
+        self.cache = cache
+        self._session_factory = async_sessionmaker(
+            self._engine, expire_on_commit=False, autoflush=False
+        )
+        self._ready = False
+        self._ready_lock = asyncio.Lock()
+
+    async def _ensure_ready(self) -> None:
+        if self._ready:
+            return
+        async with self._ready_lock:
+            if self._ready:
+                return
+            async with self._engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            async with self._session_factory() as session, session.begin():
+                await session.run_sync(ensure_reference_data)
+            self._ready = True
+
+    @asynccontextmanager
+    async def _session(self) -> AsyncIterator[AsyncSession]:
+        await self._ensure_ready()
+        async with self._session_factory() as session:
+            yield session
+
+    async def _read(self, operation: Callable[..., T], *args: Any) -> T:
+        async with self._session() as session:
+            return await session.run_sync(operation, *args)
+
+    async def _write(self, operation: Callable[..., None], *args: Any) -> None:
+        async with self._session() as session, session.begin():
+            await session.run_sync(operation, *args)
+
+    async def upsert_profile(self, profile: UserProfile) -> None:
+        await self._write(operations.upsert_profile, profile)
+
+    async def get_profile(self, user: str) -> UserProfile | None:
+        return await self._read(operations.get_profile, user, self.cache)
+
+    async def save_plan(self, plan: NutritionPlan) -> None:
+        for attempt in range(operations.PLAN_VERSION_RETRIES):
+            try:
+                await self._write(operations.save_plan, plan)
+                return
+            except IntegrityError:
+                if attempt == operations.PLAN_VERSION_RETRIES - 1:
+                    raise
+
+    async def latest_plan(self, user: str) -> NutritionPlan | None:
+        return await self._read(operations.latest_plan, user, self.cache)
+
+    async def append_log(self, log: DailyLog) -> None:
+        await self._write(operations.append_log, log)
+
+    async def logs(self, user: str) -> list[DailyLog]:
+        return await self._read(operations.logs, user)
+
+    async def recent_logs(self, user: str, limit: int) -> list[DailyLog]:
+        return await self._read(operations.recent_logs, user, limit)
+
+    async def logs_since(self, user: str, since: datetime) -> list[DailyLog]:
+        return await self._read(operations.logs_since, user, since)
+
+    async def logs_page(
+        self, user: str, after: LogCursor | None = None, limit: int = 100
+    ) -> LogPage:
+        return await self._read(operations.logs_page, user, after, limit)
+
+    async def recent_summaries(self, user: str, limit: int) -> list[DailySummary]:
+        return await self._read(operations.recent_summaries, user, limit)
+
+    async def save_dashboard(self, dashboard: DashboardState) -> None:
+        await self._write(operations.save_dashboard, dashboard)
+
+    async def dashboard(self, user: str) -> DashboardState | None:
+        return await self._read(operations.dashboard, user)
+
+    async def reset(self) -> None:
+        await self._write(operations.reset)
+        if self.cache is not None:
+            self.cache.clear()
+
+    def unit_of_work(self) -> AsyncSqlUnitOfWork:
+        return AsyncSqlUnitOfWork(
+            self._engine, self._session_factory, self._ensure_ready, self.cache
+        )
+
+
+class _OffloadedUnitOfWork(AsyncUnitOfWork):
+    """Drive a blocking ``UnitOfWork`` from the event loop through ``SyncRepositoryAdapter``."""
+
+    def __init__(self, adapter: SyncRepositoryAdapter) -> None:
+        self._adapter = adapter
+        self._scope: AbstractContextManager[UnitOfWork] | None = None
+        self._work: UnitOfWork | None = None
+
+    async def __aenter__(self) -> _OffloadedUnitOfWork:
+        self._scope = self._adapter.repository.unit_of_work()
+        self._work = await self._adapter._call(self._scope.__enter__)
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        scope, self._scope, self._work = self._scope, None, None
+        if scope is not None:
+            await self._adapter._call(scope.__exit__, *exc_info)
+
+    def _active(self) -> UnitOfWork:
+        if self._work is None:
+            raise RuntimeError("Unidade de trabalho usada fora do bloco async with")
+        return self._work
+
+    async def snapshot(self, user: str, history: int) -> PipelineSnapshot:
+        return await self._adapter._call(self._active().snapshot, user, history)
+
+    async def snapshots(self, users: Sequence[str], history: int) -> dict[str, PipelineSnapshot]:
+        return await self._adapter._call(self._active().snapshots, users, history)
+
+    def save_dashboard(self, dashboard: DashboardState) -> None:
+        self._active().save_dashboard(dashboard)
+
+    def append_log(self, log: DailyLog) -> None:
+        self._active().append_log(log)
+
+    async def commit(self) -> None:
+        await self._adapter._call(self._active().commit)
+
+
+class SyncRepositoryAdapter(AsyncRepository):
+    """Expose a blocking ``Repository`` through the async protocol.
+
+    With ``offload`` each call runs in a worker thread so database I/O does not stall the
+    event loop; purely in-memory repositories can turn it off to skip the thread hop.
+    """
+
+    def __init__(self, repository: Repository, offload: bool = True) -> None:
+        self.repository = repository
+        self.offload = offload
+
+    async def _call(self, method: Callable[..., T], *args: Any) -> T:
+        if self.offload:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def upsert_profile(self, profile: UserProfile) -> None:
+        await self._call(self.repository.upsert_profile, profile)
+
+    async def get_profile(self, user: str) -> UserProfile | None:
+        return await self._call(self.repository.get_profile, user)
+
+    async def save_plan(self, plan: NutritionPlan) -> None:
+        await self._call(self.repository.save_plan, plan)
+
+    async def latest_plan(self, user: str) -> NutritionPlan | None:
+        return await self._call(self.repository.latest_plan, user)
+
+    async def append_log(self, log: DailyLog) -> None:
+        await self._call(self.repository.append_log, log)
+
+    async def logs(self, user: str) -> list[DailyLog]:
+        return await self._call(self.repository.logs, user)
+
+    async def recent_logs(self, user: str, limit: int) -> list[DailyLog]:
+        return await self._call(self.repository.recent_logs, user, limit)
+
+    async def logs_since(self, user: str, since: datetime) -> list[DailyLog]:
+        return await self._call(self.repository.logs_since, user, since)
+
+    async def logs_page(
+        self, user: str, after: LogCursor | None = None, limit: int = 100
+    ) -> LogPage:
+        return await self._call(self.repository.logs_page, user, after, limit)
+
+    async def recent_summaries(self, user: str, limit: int) -> list[DailySummary]:
+        return await self._call(self.repository.recent_summaries, user, limit)
+
+    async def save_dashboard(self, dashboard: DashboardState) -> None:
+        await self._call(self.repository.save_dashboard, dashboard)
+
+    async def dashboard(self, user: str) -> DashboardState | None:
+        return await self._call(self.repository.dashboard, user)
+
+    async def reset(self) -> None:
+        await self._call(self.repository.reset)
+
+    def unit_of_work(self) -> _OffloadedUnitOfWork:
+        return _OffloadedUnitOfWork(self)
+
+
+def as_async_repository(repository: Repository | AsyncRepository) -> AsyncRepository:
+    if inspect.iscoroutinefunction(getattr(repository, "latest_plan", None)):
+        return repository  # type: ignore[return-value]
+    return SyncRepositoryAdapter(repository)  # type: ignore[arg-type]
+
+
+_async_repository: AsyncRepository | None = None
+
+
+def get_async_repository() -> AsyncRepository:
+    global _async_repository
+    if not _async_repository:
+        url = _get_database_url()
+        use_native = os.getenv("DATABASE_ASYNC", "true").lower() not in {"0", "false", "no"}
+        if use_native and async_driver_available(url):
+            _async_repository = AsyncPostgresRepository(cache=init_repository_cache())
+        else:
+            _async_repository = SyncRepositoryAdapter(get_repository())
+    return _async_repository
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections import Counter, OrderedDict
+
+from core.telemetry import record_counter
+
+_RESOURCES = ("profile", "plan")
+
+
+class RepositoryCache:
+    """Decoded profiles and plans keyed by the database version of the row they came from.
+
+    The SQL repositories and their units of work read the cheap version column first
+    (``user_profiles.version``, ``MAX(nutrition_plans.version)``) and only fetch and decode
+    the payload when the cached entry was built from another version. Every write, from
+    this process or any other, bumps the version, so a cached object is never served after
+    it was replaced. Each resource keeps at most ``max_entries`` users (LRU). Cached objects
+    are shared between callers and must be treated as read-only.
+
+    The version query is the price of that coherence: a hit still costs one round trip, and
+    saves fetching the payload and decoding it (``plan_from_json`` of the week of meals).
+    ``benchmarks/bench_repository_cache.py`` measures both sides.
+    """
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self.evictions: Counter[str] = Counter()
+        self._entries: dict[str, OrderedDict[str, tuple[int, object]]] = {
+            resource: OrderedDict() for resource in _RESOURCES
+        }
+        self._lock = threading.Lock()
+
+    def get(self, resource: str, user: str, version: int) -> object | None:
+        entries = self._entries[resource]
+        with self._lock:
+            cached = entries.get(user)
+            if cached is not None and cached[0] == version:
+                entries.move_to_end(user)
+            else:
+                cached = None
+        if cached is None:
+            self._count(self.misses, "repository_cache.misses", resource)
+            return None
+        self._count(self.hits, "repository_cache.hits", resource)
+        return cached[1]
+
+    def put(self, resource: str, user: str, version: int, value: object) -> None:
+        if self.max_entries <= 0:
+            return
+        entries = self._entries[resource]
+        with self._lock:
+            current = entries.get(user)
+            if current is not None and current[0] > version:
+                # a slower reader must not replace a newer version
+                return
+            entries[user] = (version, value)
+            entries.move_to_end(user)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+                self._evict(resource)
+
+    def clear(self) -> None:
+        """Drop everything; needed when rows are deleted and versions start over."""
+
+        with self._lock:
+            for entries in self._entries.values():
+                entries.clear()
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        stats: dict[str, dict[str, float]] = {}
+        for resource in _RESOURCES:
+            hits, misses = self.hits[resource], self.misses[resource]
+            stats[resource] = {
+                "hits": hits,
+                "misses": misses,
+                "evictions": self.evictions[resource],
+                "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+            }
+        return stats
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._entries.values())
+
+    def _evict(self, resource: str) -> None:
+        self.evictions[resource] += 1
+        record_counter("repository_cache.evictions", attributes={"resource": resource})
+
+    @staticmethod
+    def _count(counter: Counter[str], metric: str, resource: str) -> None:
+        counter[resource] += 1
+        record_counter(metric, attributes={"resource": resource})
+
+
+_repository_cache: RepositoryCache | None = None
+
+
+def init_repository_cache() -> RepositoryCache | None:
+    """The process-wide cache when ``REPOSITORY_CACHE_MAX_ENTRIES`` > 0, shared by both backends."""
+
+    global _repository_cache
+    max_entries = int(os.getenv("REPOSITORY_CACHE_MAX_ENTRIES", "0"))
+    if max_entries <= 0:
+        return None
+    if _repository_cache is None:
+        _repository_cache = RepositoryCache(max_entries=max_entries)
+    return _repository_cache
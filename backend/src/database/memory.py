@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 from collections import defaultdict
-from datetime import datetime
+from datetime import date, datetime
 from typing import DefaultDict
 
-from core.models import DailyLog, DashboardState, NutritionPlan, UserProfile
+from agents.calc import merge_daily_summaries, summarize_log
+from core.models import DailyLog, DailySummary, DashboardState, NutritionPlan, UserProfile
+from domain.repositories import LogCursor, LogPage, RepositoryUnitOfWork
 
 
 class MemoryRepository:
@@ -13,6 +15,7 @@ class MemoryRepository:
         self._plans: dict[str, NutritionPlan] = {}
         self._logs: DefaultDict[str, list[DailyLog]] = defaultdict(list)
         self._dashboards: dict[str, DashboardState] = {}
+        self._summaries: DefaultDict[str, dict[date, DailySummary]] = defaultdict(dict)
 
     def upsert_profile(self, profile: UserProfile) -> None:
         self._profiles[profile.name] = profile
@@ -28,10 +31,37 @@ class MemoryRepository:
 
     def append_log(self, log: DailyLog) -> None:
         self._logs[log.user].append(log)
+        summary = summarize_log(log)
+        days = self._summaries[log.user]
+        current = days.get(summary.date)
+        days[summary.date] = merge_daily_summaries(current, summary) if current else summary
 
     def logs(self, user: str) -> list[DailyLog]:
         return self._logs[user]
 
+    def _ordered_logs(self, user: str) -> list[tuple[LogCursor, DailyLog]]:
+        # insertion index stands in for the row id used as keyset tie-breaker
+        return sorted(
+            (((log.date, f"{idx:012d}"), log) for idx, log in enumerate(self._logs[user])),
+            key=lambda item: item[0],
+        )
+
+    def recent_logs(self, user: str, limit: int) -> list[DailyLog]:
+        return [log for _, log in self._ordered_logs(user)[-limit:]] if limit > 0 else []
+
+    def logs_since(self, user: str, since: datetime) -> list[DailyLog]:
+        return [log for (log_date, _), log in self._ordered_logs(user) if log_date >= since]
+
+    def logs_page(self, user: str, after: LogCursor | None = None, limit: int = 100) -> LogPage:
+        rows = [row for row in self._ordered_logs(user) if after is None or row[0] > after]
+        page = rows[:limit]
+        next_cursor = page[-1][0] if len(rows) > limit else None
+        return LogPage(items=[log for _, log in page], next_cursor=next_cursor)
+
+    def recent_summaries(self, user: str, limit: int) -> list[DailySummary]:
+        days = self._summaries[user]
+        return [days[day] for day in sorted(days)[-limit:]] if limit > 0 else []
+
     def save_dashboard(self, dashboard: DashboardState) -> None:
         self._dashboards[dashboard.user] = dashboard
 
@@ -43,6 +73,10 @@ class MemoryRepository:
         self._plans.clear()
         self._logs.clear()
         self._dashboards.clear()
+        self._summaries.clear()
+
+    def unit_of_work(self) -> RepositoryUnitOfWork:
+        return RepositoryUnitOfWork(self)
 
 
 repository = MemoryRepository()
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import uuid
 
-from sqlalchemy import JSON, Column, DateTime, Integer, String, func
+from sqlalchemy import JSON, Column, Date, DateTime, Float, Index, Integer, String, func
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -25,22 +25,56 @@ class PlanRecord(Base):
     __tablename__ = "nutrition_plans"
 
     id = Column(String(64), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user = Column(String(120), nullable=False, index=True)
+    user = Column(String(120), nullable=False)
+    # per-user sequence; the unique index turns concurrent saves into a detectable conflict
+    version = Column(Integer, nullable=False, default=1)
     payload = Column(JSON, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
     )
+    # also the access path of latest_plan(): ORDER BY version DESC LIMIT 1 per user
+    __table_args__ = (Index("uq_nutrition_plans_user_version", "user", "version", unique=True),)
 
 
 class DailyLogRecord(Base):
     __tablename__ = "daily_logs"
 
     id = Column(String(64), primary_key=True, default=lambda: str(uuid.uuid4()))
-    user = Column(String(120), nullable=False, index=True)
+    user = Column(String(120), nullable=False)
     log_date = Column(DateTime(timezone=True), nullable=False)
     payload = Column(JSON, nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # serves logs(), recent_logs() and the (log_date, id) keyset of logs_page() in index order
+    __table_args__ = (Index("ix_daily_logs_user_log_date", "user", "log_date", "id"),)
+
+
+class DailySummaryRecord(Base):
+    """Per-day rollup kept in step with ``daily_logs`` by ``append_log``."""
+
+    __tablename__ = "daily_summaries"
+
+    id = Column(String(64), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user = Column(String(120), nullable=False)
+    summary_date = Column(Date, nullable=False)
+    calories_total = Column(Float, nullable=False, default=0)
+    protein_total = Column(Float, nullable=False, default=0)
+    carbs_total = Column(Float, nullable=False, default=0)
+    fat_total = Column(Float, nullable=False, default=0)
+    fiber_total = Column(Float, nullable=False, default=0)
+    omega3_total = Column(Float, nullable=False, default=0)
+    iron_total = Column(Float, nullable=False, default=0)
+    calcium_total = Column(Float, nullable=False, default=0)
+    sodium_total = Column(Float, nullable=False, default=0)
+    hydration_total = Column(Float, nullable=False, default=0)
+    log_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
+    __table_args__ = (
+        Index("uq_daily_summaries_user_date", "user", "summary_date", unique=True),
+    )
 
 
 class DashboardRecord(Base):
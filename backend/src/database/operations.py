@@ -0,0 +1,485 @@
+"""Session-level persistence operations shared by the sync and async repositories.
+
+Every function takes an open SQLAlchemy ``Session`` and leaves transaction control to
+the caller: ``PostgresRepository`` calls them directly, ``AsyncPostgresRepository``
+runs them through ``AsyncSession.run_sync``.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Callable, Sequence
+
+from sqlalchemy import Select, and_, func, or_, select, text
+from sqlalchemy.dialects.postgresql import Insert as PostgresInsert
+from sqlalchemy.dialects.postgresql import insert as postgres_insert
+from sqlalchemy.dialects.sqlite import Insert as SQLiteInsert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql.base import ReadOnlyColumnCollection
+from sqlalchemy.sql.elements import KeyedColumnElement
+
+from agents.calc import summarize_log
+from core.serialization import (
+    dashboard_from_json,
+    dashboard_to_json,
+    log_from_json,
+    log_to_json,
+    plan_from_json,
+    plan_to_json,
+    profile_from_json,
+    profile_to_json,
+)
+from domain.entities import (
+    DailyLog,
+    DailySummary,
+    DashboardState,
+    MacroBreakdown,
+    MicroBreakdown,
+    NutritionPlan,
+    UserProfile,
+)
+from domain.repositories import LogCursor, LogPage, PipelineSnapshot, StalePlanError
+
+from .caching import RepositoryCache
+from .models import (
+    DailyLogRecord,
+    DailySummaryRecord,
+    DashboardRecord,
+    PlanRecord,
+    ProfileRecord,
+)
+
+# a write queued by a unit of work: one of the functions below plus its arguments
+PendingWrite = tuple[Callable[..., None], tuple[Any, ...]]
+
+# attempts for save_plan when a concurrent save takes the same (user, version) slot
+PLAN_VERSION_RETRIES = 3
+
+
+def upsert_profile(session: Session, profile: UserProfile) -> None:
+    data = profile_to_json(profile)
+    stmt = select(ProfileRecord).where(ProfileRecord.name == profile.name).with_for_update()
+    result = session.execute(stmt).scalar_one_or_none()
+    if result:
+        result.payload = data
+        result.updated_at = datetime.utcnow()
+    else:
+        session.add(ProfileRecord(name=profile.name, payload=data))
+
+
+def _profile_query(user: str) -> Select[dict[str, Any], int]:
+    return select(ProfileRecord.payload, ProfileRecord.version).where(ProfileRecord.name == user)
+
+
+def get_profile(
+    session: Session, user: str, cache: RepositoryCache | None = None
+) -> UserProfile | None:
+    if cache is not None:
+        version = session.execute(
+            select(ProfileRecord.version).where(ProfileRecord.name == user)
+        ).scalar_one_or_none()
+        if version is None:
+            return None
+        cached = cache.get("profile", user, version)
+        if isinstance(cached, UserProfile):
+            return cached
+    row = session.execute(_profile_query(user)).one_or_none()
+    if row is None:
+        return None
+    payload, version = row
+    profile = profile_from_json(payload)
+    if cache is not None:
+        cache.put("profile", user, version, profile)
+    return profile
+
+
+def latest_plan_version(session: Session, user: str) -> int | None:
+    return session.execute(
+        select(func.max(PlanRecord.version)).where(PlanRecord.user == user)
+    ).scalar_one_or_none()
+
+
+def save_plan(session: Session, plan: NutritionPlan) -> None:
+    """Insert the plan as the user's next version.
+
+    No lock is taken: two concurrent saves pick the same version and the unique
+    ``(user, version)`` index fails one of them with ``IntegrityError``, which the
+    repositories retry up to ``PLAN_VERSION_RETRIES`` times.
+    """
+
+    version = (latest_plan_version(session, plan.user) or 0) + 1
+    session.add(PlanRecord(user=plan.user, version=version, payload=plan_to_json(plan)))
+
+
+def _latest_plan_query(user: str) -> Select[dict[str, Any], int]:
+    return (
+        select(PlanRecord.payload, PlanRecord.version)
+        .where(PlanRecord.user == user)
+        .order_by(PlanRecord.version.desc())
+        .limit(1)
+    )
+
+
+def latest_plan(
+    session: Session, user: str, cache: RepositoryCache | None = None
+) -> NutritionPlan | None:
+    return _versioned_latest_plan(session, user, cache)[0]
+
+
+def _versioned_latest_plan(
+    session: Session, user: str, cache: RepositoryCache | None
+) -> tuple[NutritionPlan | None, int | None]:
+    if cache is not None:
+        # plan rows never change once written, so a matching version means the same payload
+        version = latest_plan_version(session, user)
+        if version is None:
+            return None, None
+        cached = cache.get("plan", user, version)
+        if isinstance(cached, NutritionPlan):
+            return cached, version
+    row = session.execute(_latest_plan_query(user)).one_or_none()
+    if row is None:
+        return None, None
+    payload, version = row
+    plan = plan_from_json(payload)
+    if cache is not None:
+        cache.put("plan", user, version, plan)
+    return plan, version
+
+
+def append_log(session: Session, log: DailyLog) -> None:
+    """Insert the log and fold it into its day's rollup in the same transaction."""
+
+    session.add(DailyLogRecord(user=log.user, log_date=log.date, payload=log_to_json(log)))
+    add_to_daily_summary(session, summarize_log(log))
+
+
+def _summary_totals(summary: DailySummary) -> dict[str, float | int]:
+    return {
+        "calories_total": summary.macros.calories,
+        "protein_total": summary.macros.protein_g,
+        "carbs_total": summary.macros.carbs_g,
+        "fat_total": summary.macros.fats_g,
+        "fiber_total": summary.micros.fiber_g,
+        "omega3_total": summary.micros.omega3_mg,
+        "iron_total": summary.micros.iron_mg,
+        "calcium_total": summary.micros.calcium_mg,
+        "sodium_total": summary.micros.sodium_mg,
+        "hydration_total": summary.hydration_l,
+        "log_count": summary.log_count,
+    }
+
+
+def _summary_from_record(record: DailySummaryRecord) -> DailySummary:
+    return DailySummary(
+        user=record.user,
+        date=record.summary_date,
+        macros=MacroBreakdown(
+            calories=round(record.calories_total, 1),
+            protein_g=round(record.protein_total, 1),
+            carbs_g=round(record.carbs_total, 1),
+            fats_g=round(record.fat_total, 1),
+        ),
+        micros=MicroBreakdown(
+            fiber_g=round(record.fiber_total, 1),
+            omega3_mg=round(record.omega3_total, 1),
+            iron_mg=round(record.iron_total, 1),
+            calcium_mg=round(record.calcium_total, 1),
+            sodium_mg=round(record.sodium_total, 1),
+        ),
+        hydration_l=round(record.hydration_total, 3),
+        log_count=record.log_count,
+    )
+
+
+def add_to_daily_summary(session: Session, summary: DailySummary) -> None:
+    totals = _summary_totals(summary)
+    values = {"user": summary.user, "summary_date": summary.date, **totals}
+    conflict = [DailySummaryRecord.user, DailySummaryRecord.summary_date]
+    # PostgreSQL and SQLite bump the rollup in one INSERT ... ON CONFLICT DO UPDATE
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        postgres_stmt: PostgresInsert = postgres_insert(DailySummaryRecord).values(**values)
+        session.execute(
+            postgres_stmt.on_conflict_do_update(
+                index_elements=conflict, set_=_summary_increments(postgres_stmt.excluded, totals)
+            )
+        )
+        return
+    if dialect == "sqlite":
+        sqlite_stmt: SQLiteInsert = sqlite_insert(DailySummaryRecord).values(**values)
+        session.execute(
+            sqlite_stmt.on_conflict_do_update(
+                index_elements=conflict, set_=_summary_increments(sqlite_stmt.excluded, totals)
+            )
+        )
+        return
+    locked: Select[DailySummaryRecord] = (
+        select(DailySummaryRecord)
+        .where(
+            DailySummaryRecord.user == summary.user,
+            DailySummaryRecord.summary_date == summary.date,
+        )
+        .with_for_update()
+    )
+    record = session.execute(locked).scalar_one_or_none()
+    if record is None:
+        session.add(DailySummaryRecord(**values))
+        return
+    for name, value in totals.items():
+        setattr(record, name, getattr(record, name) + value)
+
+
+def _summary_increments(
+    excluded: ReadOnlyColumnCollection[str, KeyedColumnElement[Any]],
+    totals: dict[str, float | int],
+) -> dict[str, Any]:
+    increments: dict[str, Any] = {
+        name: getattr(DailySummaryRecord, name) + excluded[name] for name in totals
+    }
+    increments["updated_at"] = func.now()
+    return increments
+
+
+def recent_summaries(session: Session, user: str, limit: int) -> list[DailySummary]:
+    stmt = (
+        select(DailySummaryRecord)
+        .where(DailySummaryRecord.user == user)
+        .order_by(DailySummaryRecord.summary_date.desc())
+        .limit(limit)
+    )
+    records = session.execute(stmt).scalars().all()
+    return [_summary_from_record(record) for record in reversed(records)]
+
+
+def logs(session: Session, user: str) -> list[DailyLog]:
+    stmt = (
+        select(DailyLogRecord)
+        .where(DailyLogRecord.user == user)
+        .order_by(DailyLogRecord.log_date.asc())
+    )
+    records = session.execute(stmt).scalars().all()
+    return [log_from_json(record.payload) for record in records]
+
+
+def recent_logs(session: Session, user: str, limit: int) -> list[DailyLog]:
+    stmt = (
+        select(DailyLogRecord.payload)
+        .where(DailyLogRecord.user == user)
+        .order_by(DailyLogRecord.log_date.desc(), DailyLogRecord.id.desc())
+        .limit(limit)
+    )
+    payloads = session.execute(stmt).scalars().all()
+    return [log_from_json(payload) for payload in reversed(payloads)]
+
+
+def logs_since(session: Session, user: str, since: datetime) -> list[DailyLog]:
+    stmt = (
+        select(DailyLogRecord.payload)
+        .where(DailyLogRecord.user == user, DailyLogRecord.log_date >= since)
+        .order_by(DailyLogRecord.log_date.asc(), DailyLogRecord.id.asc())
+    )
+    return [log_from_json(payload) for payload in session.execute(stmt).scalars()]
+
+
+def logs_page(session: Session, user: str, after: LogCursor | None, limit: int) -> LogPage:
+    stmt = select(DailyLogRecord.log_date, DailyLogRecord.id, DailyLogRecord.payload).where(
+        DailyLogRecord.user == user
+    )
+    if after is not None:
+        after_date, after_id = after
+        stmt = stmt.where(
+            or_(
+                DailyLogRecord.log_date > after_date,
+                and_(DailyLogRecord.log_date == after_date, DailyLogRecord.id > after_id),
+            )
+        )
+    stmt = stmt.order_by(DailyLogRecord.log_date.asc(), DailyLogRecord.id.asc()).limit(limit + 1)
+    rows = session.execute(stmt).all()
+    page = rows[:limit]
+    next_cursor = (page[-1].log_date, page[-1].id) if len(rows) > limit else None
+    return LogPage(items=[log_from_json(row.payload) for row in page], next_cursor=next_cursor)
+
+
+def save_dashboard(
+    session: Session, dashboard: DashboardState, plan_version: int | None = None
+) -> None:
+    if plan_version is not None:
+        current = latest_plan_version(session, dashboard.user)
+        if current is not None and current != plan_version:
+            raise StalePlanError(
+                f"Plano {plan_version} de {dashboard.user} foi substituído pela versão {current}"
+            )
+    payload = dashboard_to_json(dashboard)
+    stmt = select(DashboardRecord).where(DashboardRecord.user == dashboard.user).with_for_update()
+    record = session.execute(stmt).scalar_one_or_none()
+    if record:
+        record.payload = payload
+        record.updated_at = datetime.utcnow()
+    else:
+        session.add(DashboardRecord(user=dashboard.user, payload=payload))
+
+
+def dashboard(session: Session, user: str) -> DashboardState | None:
+    record = session.get(DashboardRecord, user)
+    return dashboard_from_json(record.payload) if record else None
+
+
+def pipeline_snapshot(
+    session: Session, user: str, history: int, cache: RepositoryCache | None = None
+) -> PipelineSnapshot:
+    """Read every pipeline input inside the caller's transaction, without row locks.
+
+    Must be the first statement of the transaction: on Postgres it switches it to a
+    ``REPEATABLE READ READ ONLY`` snapshot so plan, profile and logs agree with each other.
+    With a ``cache``, plan and profile are decoded only when their version is not cached.
+    """
+
+    _use_snapshot_isolation(session)
+    plan, plan_version = _versioned_latest_plan(session, user, cache)
+    return PipelineSnapshot(
+        plan=plan,
+        profile=get_profile(session, user, cache),
+        logs=recent_logs(session, user, history),
+        days=recent_summaries(session, user, history),
+        plan_version=plan_version,
+    )
+
+
+def _use_snapshot_isolation(session: Session) -> None:
+    if session.get_bind().dialect.name == "postgresql":
+        session.execute(text("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY"))
+
+
+def pipeline_snapshots(
+    session: Session, users: Sequence[str], history: int, cache: RepositoryCache | None = None
+) -> dict[str, PipelineSnapshot]:
+    """``pipeline_snapshot`` for many users with one ``IN (...)`` query per table.
+
+    Latest plans come from a ``MAX(version)`` join and the per-user history windows from
+    ``ROW_NUMBER() OVER (PARTITION BY user ...)``, so the statement count does not grow
+    with the batch. Same transaction rules as ``pipeline_snapshot``. With a ``cache``, only
+    the plans and profiles whose version is not cached are fetched and decoded.
+    """
+
+    _use_snapshot_isolation(session)
+    users = list(dict.fromkeys(users))
+    latest = (
+        select(PlanRecord.user, func.max(PlanRecord.version).label("version"))
+        .where(PlanRecord.user.in_(users))
+        .group_by(PlanRecord.user)
+        .subquery()
+    )
+    plans: dict[str, tuple[NutritionPlan, int]] = {}
+    plan_users = users
+    if cache is not None:
+        plan_users = []
+        for user, version in session.execute(select(latest.c.user, latest.c.version)):
+            cached = cache.get("plan", user, version)
+            if isinstance(cached, NutritionPlan):
+                plans[user] = (cached, version)
+            else:
+                plan_users.append(user)
+    if plan_users:
+        for record in session.execute(
+            select(PlanRecord)
+            .join(
+                latest,
+                and_(PlanRecord.user == latest.c.user, PlanRecord.version == latest.c.version),
+            )
+            .where(PlanRecord.user.in_(plan_users))
+        ).scalars():
+            plan = plan_from_json(record.payload)
+            if cache is not None:
+                cache.put("plan", record.user, record.version, plan)
+            plans[record.user] = (plan, record.version)
+
+    profiles: dict[str, UserProfile] = {}
+    profile_users = users
+    if cache is not None:
+        profile_users = []
+        for user, version in session.execute(
+            select(ProfileRecord.name, ProfileRecord.version).where(ProfileRecord.name.in_(users))
+        ):
+            cached = cache.get("profile", user, version)
+            if isinstance(cached, UserProfile):
+                profiles[user] = cached
+            else:
+                profile_users.append(user)
+    if profile_users:
+        for record in session.execute(
+            select(ProfileRecord).where(ProfileRecord.name.in_(profile_users))
+        ).scalars():
+            profile = profile_from_json(record.payload)
+            if cache is not None:
+                cache.put("profile", record.name, record.version, profile)
+            profiles[record.name] = profile
+
+    log_rank = (
+        func.row_number()
+        .over(
+            partition_by=DailyLogRecord.user,
+            order_by=(DailyLogRecord.log_date.desc(), DailyLogRecord.id.desc()),
+        )
+        .label("rank")
+    )
+    ranked_logs = (
+        select(DailyLogRecord.user, DailyLogRecord.payload, log_rank)
+        .where(DailyLogRecord.user.in_(users))
+        .subquery()
+    )
+    logs_by_user: dict[str, list[DailyLog]] = {user: [] for user in users}
+    for user, payload in session.execute(
+        select(ranked_logs.c.user, ranked_logs.c.payload)
+        .where(ranked_logs.c.rank <= history)
+        .order_by(ranked_logs.c.user, ranked_logs.c.rank.desc())
+    ):
+        logs_by_user[user].append(log_from_json(payload))
+
+    summary_rank = (
+        func.row_number()
+        .over(
+            partition_by=DailySummaryRecord.user,
+            order_by=DailySummaryRecord.summary_date.desc(),
+        )
+        .label("rank")
+    )
+    ranked_summaries = (
+        select(DailySummaryRecord, summary_rank)
+        .where(DailySummaryRecord.user.in_(users))
+        .subquery()
+    )
+    summary = aliased(DailySummaryRecord, ranked_summaries)
+    days_by_user: dict[str, list[DailySummary]] = {user: [] for user in users}
+    for record in session.execute(
+        select(summary)
+        .where(ranked_summaries.c.rank <= history)
+        .order_by(ranked_summaries.c.user, ranked_summaries.c.rank.desc())
+    ).scalars():
+        days_by_user[record.user].append(_summary_from_record(record))
+
+    snapshots: dict[str, PipelineSnapshot] = {}
+    for user in users:
+        plan, plan_version = plans.get(user, (None, None))
+        snapshots[user] = PipelineSnapshot(
+            plan=plan,
+            profile=profiles.get(user),
+            logs=logs_by_user[user],
+            days=days_by_user[user],
+            plan_version=plan_version,
+        )
+    return snapshots
+
+
+def apply_writes(session: Session, writes: Sequence[PendingWrite]) -> None:
+    for operation, args in writes:
+        operation(session, *args)
+
+
+def reset(session: Session) -> None:
+    session.query(DashboardRecord).delete()
+    session.query(DailySummaryRecord).delete()
+    session.query(DailyLogRecord).delete()
+    session.query(PlanRecord).delete()
+    session.query(ProfileRecord).delete()
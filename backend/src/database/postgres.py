@@ -3,25 +3,18 @@ from __future__ import annotations
 import os
 from contextlib import contextmanager
 from datetime import datetime
-from typing import Generator
+from typing import Generator, Sequence
 
-from sqlalchemy import create_engine, select
-from sqlalchemy.engine import Engine
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, sessionmaker
 
-from core.serialization import (
-    dashboard_from_json,
-    dashboard_to_json,
-    log_from_json,
-    log_to_json,
-    plan_from_json,
-    plan_to_json,
-    profile_from_json,
-    profile_to_json,
-)
-from domain.entities import DailyLog, DashboardState, NutritionPlan, UserProfile
-from domain.repositories import Repository
-from .models import Base, DailyLogRecord, DashboardRecord, PlanRecord, ProfileRecord
+from domain.entities import DailyLog, DailySummary, DashboardState, NutritionPlan, UserProfile
+from domain.repositories import LogCursor, LogPage, PipelineSnapshot, Repository, UnitOfWork
+from . import operations
+from .caching import RepositoryCache, init_repository_cache
+from .models import Base
 from .seeds import ensure_reference_data
 
 
@@ -45,9 +38,82 @@ def _session_factory() -> sessionmaker[Session]:
     return sessionmaker(bind=engine, expire_on_commit=False, autoflush=False)
 
 
+class SqlUnitOfWork(UnitOfWork):
+    """Borrow one pooled connection for a pipeline run.
+
+    Reads go through a single read-only snapshot transaction; writes are queued and sent
+    together in one short transaction on ``commit`` (called on clean exit).
+    """
+
+    def __init__(
+        self, session_factory: sessionmaker[Session], cache: RepositoryCache | None = None
+    ) -> None:
+        self._session_factory = session_factory
+        self._cache = cache
+        self._connection: Connection | None = None
+        self._session: Session | None = None
+        self._pending: list[operations.PendingWrite] = []
+        self._plan_version: int | None = None
+
+    def __enter__(self) -> SqlUnitOfWork:
+        engine: Engine = self._session_factory.kw["bind"]
+        self._connection = engine.connect()
+        self._session = self._session_factory(bind=self._connection)
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *_: object) -> None:
+        try:
+            if exc_type is None:
+                self.commit()
+        finally:
+            self._pending.clear()
+            if self._session is not None:
+                self._session.close()
+            if self._connection is not None:
+                self._connection.close()
+            self._session = self._connection = None
+
+    def _active_session(self) -> Session:
+        if self._session is None:
+            raise RuntimeError("Unidade de trabalho usada fora do bloco with")
+        return self._session
+
+    def snapshot(self, user: str, history: int) -> PipelineSnapshot:
+        session = self._active_session()
+        with session.begin():
+            snapshot = operations.pipeline_snapshot(session, user, history, self._cache)
+        self._plan_version = snapshot.plan_version
+        return snapshot
+
+    def snapshots(self, users: Sequence[str], history: int) -> dict[str, PipelineSnapshot]:
+        session = self._active_session()
+        with session.begin():
+            return operations.pipeline_snapshots(session, users, history, self._cache)
+
+    def save_dashboard(self, dashboard: DashboardState) -> None:
+        self._pending.append((operations.save_dashboard, (dashboard, self._plan_version)))
+
+    def append_log(self, log: DailyLog) -> None:
+        self._pending.append((operations.append_log, (log,)))
+
+    def commit(self) -> None:
+        if not self._pending:
+            return
+        session = self._active_session()
+        pending, self._pending = self._pending, []
+        with session.begin():
+            operations.apply_writes(session, pending)
+
+
 class PostgresRepository(Repository):
-    def __init__(self, session_factory: sessionmaker[Session] | None = None) -> None:
+    def __init__(
+        self,
+        session_factory: sessionmaker[Session] | None = None,
+        cache: RepositoryCache | None = None,
+    ) -> None:
         self._session_factory = session_factory or _session_factory()
+        # decoded profiles and plans, reused while their database version is unchanged
+        self.cache = cache
         self._ensure_seeds()
 
     @contextmanager
@@ -63,89 +129,67 @@ class PostgresRepository(Repository):
             ensure_reference_data(session)
 
     def upsert_profile(self, profile: UserProfile) -> None:
-        data = profile_to_json(profile)
         with self._session() as session, session.begin():
-            stmt = select(ProfileRecord).where(ProfileRecord.name == profile.name).with_for_update()
-            result = session.execute(stmt).scalar_one_or_none()
-            if result:
-                result.payload = data
-                result.updated_at = datetime.utcnow()
-            else:
-                session.add(ProfileRecord(name=profile.name, payload=data))
+            operations.upsert_profile(session, profile)
 
     def get_profile(self, user: str) -> UserProfile | None:
         with self._session() as session:
-            record = session.get(ProfileRecord, user)
-            return profile_from_json(record.payload) if record else None
+            return operations.get_profile(session, user, self.cache)
 
     def save_plan(self, plan: NutritionPlan) -> None:
-        payload = plan_to_json(plan)
-        with self._session() as session, session.begin():
-            session.add(PlanRecord(user=plan.user, payload=payload))
+        for attempt in range(operations.PLAN_VERSION_RETRIES):
+            try:
+                with self._session() as session, session.begin():
+                    operations.save_plan(session, plan)
+                return
+            except IntegrityError:
+                if attempt == operations.PLAN_VERSION_RETRIES - 1:
+                    raise
 
     def latest_plan(self, user: str) -> NutritionPlan | None:
         with self._session() as session:
-            stmt = (
-                select(PlanRecord)
-                .where(PlanRecord.user == user)
-                .order_by(PlanRecord.created_at.desc())
-                .limit(1)
-                .with_for_update(nowait=False, of=PlanRecord)
-            )
-            record = session.execute(stmt).scalar_one_or_none()
-            return plan_from_json(record.payload) if record else None
+            return operations.latest_plan(session, user, self.cache)
 
     def append_log(self, log: DailyLog) -> None:
-        payload = log_to_json(log)
         with self._session() as session, session.begin():
-            stmt = (
-                select(PlanRecord.id)
-                .where(PlanRecord.user == log.user)
-                .order_by(PlanRecord.created_at.desc())
-                .limit(1)
-                .with_for_update()
-            )
-            session.execute(stmt)
-            session.add(
-                DailyLogRecord(user=log.user, log_date=log.date, payload=payload)
-            )
+            operations.append_log(session, log)
 
     def logs(self, user: str) -> list[DailyLog]:
         with self._session() as session:
-            stmt = (
-                select(DailyLogRecord)
-                .where(DailyLogRecord.user == user)
-                .order_by(DailyLogRecord.log_date.asc())
-            )
-            records = session.execute(stmt).scalars().all()
-            return [log_from_json(record.payload) for record in records]
+            return operations.logs(session, user)
+
+    def recent_logs(self, user: str, limit: int) -> list[DailyLog]:
+        with self._session() as session:
+            return operations.recent_logs(session, user, limit)
+
+    def logs_since(self, user: str, since: datetime) -> list[DailyLog]:
+        with self._session() as session:
+            return operations.logs_since(session, user, since)
+
+    def logs_page(self, user: str, after: LogCursor | None = None, limit: int = 100) -> LogPage:
+        with self._session() as session:
+            return operations.logs_page(session, user, after, limit)
+
+    def recent_summaries(self, user: str, limit: int) -> list[DailySummary]:
+        with self._session() as session:
+            return operations.recent_summaries(session, user, limit)
 
     def save_dashboard(self, dashboard: DashboardState) -> None:
-        payload = dashboard_to_json(dashboard)
         with self._session() as session, session.begin():
-            stmt = (
-                select(DashboardRecord)
-                .where(DashboardRecord.user == dashboard.user)
-                .with_for_update()
-            )
-            record = session.execute(stmt).scalar_one_or_none()
-            if record:
-                record.payload = payload
-                record.updated_at = datetime.utcnow()
-            else:
-                session.add(DashboardRecord(user=dashboard.user, payload=payload))
+            operations.save_dashboard(session, dashboard)
 
     def dashboard(self, user: str) -> DashboardState | None:
         with self._session() as session:
-            record = session.get(DashboardRecord, user)
-            return dashboard_from_json(record.payload) if record else None
+            return operations.dashboard(session, user)
 
     def reset(self) -> None:
         with self._session() as session, session.begin():
-            session.query(DashboardRecord).delete()
-            session.query(DailyLogRecord).delete()
-            session.query(PlanRecord).delete()
-            session.query(ProfileRecord).delete()
+            operations.reset(session)
+        if self.cache is not None:
+            self.cache.clear()
+
+    def unit_of_work(self) -> SqlUnitOfWork:
+        return SqlUnitOfWork(self._session_factory, self.cache)
 
 
 _repository: PostgresRepository | None = None
@@ -154,5 +198,5 @@ _repository: PostgresRepository | None = None
 def get_repository() -> PostgresRepository:
     global _repository
     if not _repository:
-        _repository = PostgresRepository()
+        _repository = PostgresRepository(cache=init_repository_cache())
     return _repository
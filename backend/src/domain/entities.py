@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import date, datetime
 from typing import Any, Literal
 
 Sex = Literal["male", "female", "other"]
@@ -64,6 +64,18 @@ class MicroBreakdown:
     sodium_mg: float
 
 
+@dataclass(slots=True)
+class DailySummary:
+    """Per-user, per-day totals across every diary log of that day."""
+
+    user: str
+    date: date
+    macros: MacroBreakdown
+    micros: MicroBreakdown
+    hydration_l: float
+    log_count: int = 1
+
+
 @dataclass(slots=True)
 class HydrationPlan:
     total_liters: float
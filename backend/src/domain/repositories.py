@@ -1,8 +1,74 @@
 from __future__ import annotations
 
-from typing import Protocol
+from contextlib import AbstractAsyncContextManager, AbstractContextManager
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from typing import Awaitable, Callable, Protocol, Sequence
 
-from .entities import DailyLog, DashboardState, NutritionPlan, UserProfile
+from .entities import DailyLog, DailySummary, DashboardState, NutritionPlan, UserProfile
+
+LogCursor = tuple[datetime, str]
+
+
+@dataclass(slots=True)
+class LogPage:
+    items: list[DailyLog] = field(default_factory=list)
+    next_cursor: LogCursor | None = None
+
+
+class StalePlanError(RuntimeError):
+    """A write derived from one plan version found a newer plan already stored."""
+
+
+@dataclass(slots=True)
+class PipelineSnapshot:
+    """Inputs of one pipeline run, read together so they describe the same moment."""
+
+    plan: NutritionPlan | None
+    profile: UserProfile | None
+    logs: list[DailyLog] = field(default_factory=list)
+    days: list[DailySummary] = field(default_factory=list)
+    # None when the backend does not version plans; disables the optimistic check
+    plan_version: int | None = None
+
+
+class UnitOfWork(Protocol):
+    def snapshot(self, user: str, history: int) -> PipelineSnapshot:
+        """Read plan, profile, the latest ``history`` logs and day rollups in one snapshot."""
+
+    def snapshots(self, users: Sequence[str], history: int) -> dict[str, PipelineSnapshot]:
+        """``snapshot`` for a batch of users, read together in one snapshot."""
+
+    def save_dashboard(self, dashboard: DashboardState) -> None:
+        """Queue a dashboard write; nothing is sent until ``commit``.
+
+        Backends that version plans reject it with ``StalePlanError`` at commit time when
+        the plan read by ``snapshot`` is no longer the latest one.
+        """
+
+    def append_log(self, log: DailyLog) -> None:
+        """Queue a log append; nothing is sent until ``commit``."""
+
+    def commit(self) -> None:
+        """Apply the queued writes in a single short transaction."""
+
+
+class AsyncUnitOfWork(Protocol):
+    async def snapshot(self, user: str, history: int) -> PipelineSnapshot:
+        ...
+
+    async def snapshots(self, users: Sequence[str], history: int) -> dict[str, PipelineSnapshot]:
+        ...
+
+    def save_dashboard(self, dashboard: DashboardState) -> None:
+        ...
+
+    def append_log(self, log: DailyLog) -> None:
+        ...
+
+    async def commit(self) -> None:
+        ...
 
 
 class Repository(Protocol):
@@ -16,14 +82,26 @@ class Repository(Protocol):
         """Persist the latest nutrition plan for the user."""
 
     def latest_plan(self, user: str) -> NutritionPlan | None:
-        """Return the most recent plan for the user."""
+        """Return the most recent plan for the user without taking row locks."""
 
     def append_log(self, log: DailyLog) -> None:
-        """Append a daily log entry using optimistic/pessimistic locking as needed."""
+        """Append a daily log entry; it does not depend on (or lock) the current plan."""
 
     def logs(self, user: str) -> list[DailyLog]:
         """Return ordered logs for the user (oldest → newest)."""
 
+    def recent_logs(self, user: str, limit: int) -> list[DailyLog]:
+        """Return the latest ``limit`` logs for the user, ordered oldest → newest."""
+
+    def logs_since(self, user: str, since: datetime) -> list[DailyLog]:
+        """Return logs dated on or after ``since``, ordered oldest → newest."""
+
+    def logs_page(self, user: str, after: LogCursor | None = None, limit: int = 100) -> LogPage:
+        """Return one keyset page of logs (oldest → newest) starting after ``after``."""
+
+    def recent_summaries(self, user: str, limit: int) -> list[DailySummary]:
+        """Return the latest ``limit`` per-day rollups, ordered oldest → newest."""
+
     def save_dashboard(self, dashboard: DashboardState) -> None:
         """Persist the latest dashboard snapshot."""
 
@@ -33,6 +111,133 @@ class Repository(Protocol):
     def reset(self) -> None:
         """Clear in-memory state; optional no-op for durable backends."""
 
+    def unit_of_work(self) -> AbstractContextManager[UnitOfWork]:
+        """Scope reads and writes of one pipeline run; queued writes commit on clean exit."""
+
+        return RepositoryUnitOfWork(self)
+
+
+class AsyncRepository(Protocol):
+    """Awaitable counterpart of ``Repository`` for callers running on the event loop."""
+
+    async def upsert_profile(self, profile: UserProfile) -> None:
+        ...
+
+    async def get_profile(self, user: str) -> UserProfile | None:
+        ...
+
+    async def save_plan(self, plan: NutritionPlan) -> None:
+        ...
+
+    async def latest_plan(self, user: str) -> NutritionPlan | None:
+        ...
+
+    async def append_log(self, log: DailyLog) -> None:
+        ...
+
+    async def logs(self, user: str) -> list[DailyLog]:
+        ...
+
+    async def recent_logs(self, user: str, limit: int) -> list[DailyLog]:
+        ...
+
+    async def logs_since(self, user: str, since: datetime) -> list[DailyLog]:
+        ...
+
+    async def logs_page(
+        self, user: str, after: LogCursor | None = None, limit: int = 100
+    ) -> LogPage:
+        ...
+
+    async def recent_summaries(self, user: str, limit: int) -> list[DailySummary]:
+        ...
+
+    async def save_dashboard(self, dashboard: DashboardState) -> None:
+        ...
+
+    async def dashboard(self, user: str) -> DashboardState | None:
+        ...
+
+    async def reset(self) -> None:
+        ...
+
+    def unit_of_work(self) -> AbstractAsyncContextManager[AsyncUnitOfWork]:
+        return AsyncRepositoryUnitOfWork(self)
+
+
+class RepositoryUnitOfWork:
+    """Unit of work over plain repository calls, for backends without shared sessions."""
+
+    def __init__(self, repository: Repository) -> None:
+        self.repository = repository
+        self._pending: list[Callable[[], None]] = []
+
+    def __enter__(self) -> RepositoryUnitOfWork:
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, *_: object) -> None:
+        if exc_type is None:
+            self.commit()
+        self._pending.clear()
+
+    def snapshot(self, user: str, history: int) -> PipelineSnapshot:
+        return PipelineSnapshot(
+            plan=self.repository.latest_plan(user),
+            profile=self.repository.get_profile(user),
+            logs=self.repository.recent_logs(user, history),
+            days=self.repository.recent_summaries(user, history),
+        )
+
+    def snapshots(self, users: Sequence[str], history: int) -> dict[str, PipelineSnapshot]:
+        return {user: self.snapshot(user, history) for user in dict.fromkeys(users)}
+
+    def save_dashboard(self, dashboard: DashboardState) -> None:
+        self._pending.append(partial(self.repository.save_dashboard, dashboard))
+
+    def append_log(self, log: DailyLog) -> None:
+        self._pending.append(partial(self.repository.append_log, log))
+
+    def commit(self) -> None:
+        pending, self._pending = self._pending, []
+        for write in pending:
+            write()
+
+
+class AsyncRepositoryUnitOfWork:
+    def __init__(self, repository: AsyncRepository) -> None:
+        self.repository = repository
+        self._pending: list[Callable[[], Awaitable[None]]] = []
+
+    async def __aenter__(self) -> AsyncRepositoryUnitOfWork:
+        return self
+
+    async def __aexit__(self, exc_type: type[BaseException] | None, *_: object) -> None:
+        if exc_type is None:
+            await self.commit()
+        self._pending.clear()
+
+    async def snapshot(self, user: str, history: int) -> PipelineSnapshot:
+        return PipelineSnapshot(
+            plan=await self.repository.latest_plan(user),
+            profile=await self.repository.get_profile(user),
+            logs=await self.repository.recent_logs(user, history),
+            days=await self.repository.recent_summaries(user, history),
+        )
+
+    async def snapshots(self, users: Sequence[str], history: int) -> dict[str, PipelineSnapshot]:
+        return {user: await self.snapshot(user, history) for user in dict.fromkeys(users)}
+
+    def save_dashboard(self, dashboard: DashboardState) -> None:
+        self._pending.append(partial(self.repository.save_dashboard, dashboard))
+
+    def append_log(self, log: DailyLog) -> None:
+        self._pending.append(partial(self.repository.append_log, log))
+
+    async def commit(self) -> None:
+        pending, self._pending = self._pending, []
+        for write in pending:
+            await write()
+
 
 class RepositoryProvider(Protocol):
     def __call__(self) -> Repository:  # pragma: no cover - runtime DI
@@ -10,10 +10,26 @@ class _Counter:
         return None
 
 
+class _Histogram:
+    def record(self, amount: float, attributes: dict[str, object] | None = None) -> None:  # pragma: no cover - no-op
+        return None
+
+
+class _Gauge:
+    def set(self, amount: float, attributes: dict[str, object] | None = None) -> None:  # pragma: no cover - no-op
+        return None
+
+
 class _Meter:
     def create_counter(self, name: str) -> _Counter:  # pragma: no cover - trivial
         return _Counter()
 
+    def create_histogram(self, name: str) -> _Histogram:  # pragma: no cover - trivial
+        return _Histogram()
+
+    def create_gauge(self, name: str) -> _Gauge:  # pragma: no cover - trivial
+        return _Gauge()
+
 
 def get_meter(name: str) -> _Meter:  # pragma: no cover - trivial
     return _Meter()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+
+from core.logging import configure_logging
+
+from .event_bus import AsyncEventBus
+from .event_log import DeadLetter, EventJournal
+from .pipeline_queue import PipelineQueue
+
+
+def _journal(path: str | None) -> EventJournal:
+    path = path or os.getenv("EVENT_LOG_PATH")
+    if not path:
+        raise ValueError("Informe --path ou EVENT_LOG_PATH com o journal de eventos")
+    return EventJournal(path)
+
+
+def _pipeline_queue(path: str | None) -> PipelineQueue:
+    path = path or os.getenv("PIPELINE_QUEUE_PATH")
+    if not path:
+        raise ValueError("Informe --path ou PIPELINE_QUEUE_PATH com a fila do pipeline")
+    return PipelineQueue(path)
+
+
+def _describe(letter: DeadLetter) -> dict[str, object]:
+    return {
+        "offset": letter.offset,
+        "event": letter.event.name,
+        "failed_event": letter.failed_event,
+        "error": letter.error,
+        "failed_at": datetime.fromtimestamp(letter.failed_at, tz=timezone.utc).isoformat(),
+        "trace_id": letter.event.trace_id,
+        "payload": letter.event.payload,
+    }
+
+
+def list_dead_letters(
+    journal: EventJournal | PipelineQueue, event: str | None = None, limit: int | None = None
+) -> list[dict[str, object]]:
+    return [_describe(letter) for letter in journal.dead_letters(event=event, limit=limit)]
+
+
+async def replay_dead_letters(
+    journal: EventJournal,
+    bus: AsyncEventBus,
+    event: str | None = None,
+    limit: int | None = None,
+) -> tuple[int, int]:
+    """Re-run parked events inline on ``bus``; successes leave the DLQ, failures stay."""
+    replayed: list[int] = []
+    failed = 0
+    for letter in journal.dead_letters(event=event, limit=limit):
+        letter.event.idempotency_key = None  # the failed attempt never marked it processed
+        before = len(bus.dlq)
+        await bus.publish(letter.event)
+        if len(bus.dlq) > before:
+            failed += 1
+        else:
+            replayed.append(letter.offset)
+    journal.remove_dead_letters(replayed)
+    return len(replayed), failed
+
+
+def requeue_dead_letters(
+    queue: PipelineQueue, event: str | None = None, limit: int | None = None
+) -> int:
+    """Give parked pipeline jobs back to the workers instead of running them here."""
+    letters = queue.dead_letters(event=event, limit=limit)
+    return queue.requeue_dead_letters([letter.offset for letter in letters])
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Event journal and DLQ helper")
+    parser.add_argument(
+        "action",
+        choices=[
+            "stats",
+            "dlq-list",
+            "dlq-replay",
+            "queue-stats",
+            "queue-dlq-list",
+            "queue-dlq-requeue",
+        ],
+        help="Action to execute",
+    )
+    parser.add_argument(
+        "--path",
+        default=None,
+        help="Journal file (EVENT_LOG_PATH) or, for queue-*, pipeline queue (PIPELINE_QUEUE_PATH)",
+    )
+    parser.add_argument("--event", default=None, help="Only dead letters of this event name")
+    parser.add_argument("--limit", type=int, default=None, help="Maximum entries to handle")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    if args.action.startswith("queue-"):
+        queue = _pipeline_queue(args.path)
+        if args.action == "queue-stats":
+            print(json.dumps(queue.stats()))
+        elif args.action == "queue-dlq-list":
+            for entry in list_dead_letters(queue, event=args.event, limit=args.limit):
+                print(json.dumps(entry, ensure_ascii=False))
+        else:
+            print(json.dumps({"requeued": requeue_dead_letters(queue, args.event, args.limit)}))
+        return
+    journal = _journal(args.path)
+    if args.action == "stats":
+        print(json.dumps(journal.stats()))
+    elif args.action == "dlq-list":
+        for entry in list_dead_letters(journal, event=args.event, limit=args.limit):
+            print(json.dumps(entry, ensure_ascii=False))
+    elif args.action == "dlq-replay":
+        from core.cache import init_dashboard_cache
+        from core.orchestrator import Orchestrator
+
+        logger = configure_logging()
+        # the orchestrator's own handlers, dispatched inline in this process; replays must
+        # invalidate the shared dashboard cache like the API process does
+        orchestrator = Orchestrator(
+            logger, event_bus=AsyncEventBus(logger), cache=init_dashboard_cache(logger)
+        )
+        replayed, failed = asyncio.run(
+            replay_dead_letters(journal, orchestrator.event_bus, args.event, args.limit)
+        )
+        print(json.dumps({"replayed": replayed, "failed": failed}))
+
+
+if __name__ == "__main__":
+    main()
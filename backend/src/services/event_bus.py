@@ -1,13 +1,35 @@
 from __future__ import annotations
 
 import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import random
+import time
+import zlib
 from collections import deque
-from dataclasses import dataclass, field
-from typing import Any, Awaitable, Callable
+from dataclasses import dataclass, field, fields
+from functools import partial
+from typing import Any, Awaitable, Callable, Literal, Mapping, cast
 
 from agents.base import JSONDict
 from core.logging import configure_logging
-from core.telemetry import record_counter, set_current_trace_id
+from core.telemetry import record_counter, record_gauge, record_histogram, set_current_trace_id
+from services.event_log import Journal, init_event_journal
+from services.idempotency import IdempotencyStore, MemoryIdempotencyStore
+from services.pipeline_queue import PipelineQueue
+
+OverflowPolicy = Literal["block", "drop", "reject"]
+OVERFLOW_POLICIES: tuple[str, ...] = ("block", "drop", "reject")
+
+# the backlog of the handler chain running in the current task: follow-up events run right
+# after the handler that published them, on the same consumer, instead of waiting for
+# queue capacity that only the (busy) consumers themselves can free
+_chain_backlog: contextvars.ContextVar[deque[Event] | None] = contextvars.ContextVar(
+    "event_bus_chain_backlog", default=None
+)
 
 
 @dataclass
@@ -20,77 +42,652 @@ class Event:
     version: str = "1.0"
     idempotency_key: str | None = None
     metadata: dict[str, Any] = field(default_factory=dict)
+    partition_key: str | None = None
+
+    def ordering_key(self) -> str:
+        """Events sharing this key are handled in publish order; defaults to the payload user."""
+        if self.partition_key:
+            return self.partition_key
+        user = self.payload.get("user") if isinstance(self.payload, dict) else None
+        return str(user) if user else self.name
 
 
 Handler = Callable[[Event], Awaitable[None]]
+# a batch handler may return one outcome per event (``None`` for success) so that only the
+# events that failed are retried; returning ``None`` means the whole batch succeeded
+BatchResult = list[Exception | None] | None
+BatchHandler = Callable[[list[Event]], Awaitable[BatchResult]]
+
+
+@dataclass(slots=True, frozen=True)
+class RetryPolicy:
+    """Exponential backoff for failed handlers.
+
+    The n-th retry waits ``min(max_delay_ms, base_delay_ms * multiplier ** (n - 1))`` with the
+    top ``jitter`` fraction of it randomized, so retries of a burst do not land together.
+    ``max_attempts`` overrides ``Event.max_attempts`` when set.
+    """
+
+    base_delay_ms: float = 100.0
+    max_delay_ms: float = 30_000.0
+    multiplier: float = 2.0
+    jitter: float = 0.5
+    max_attempts: int | None = None
+
+    def delay(self, attempt: int, rng: random.Random | None = None) -> float:
+        """Seconds to wait before retry number ``attempt`` (1-based)."""
+        ceiling = min(self.max_delay_ms, self.base_delay_ms * self.multiplier ** (attempt - 1))
+        spread = (rng or random).random() * self.jitter
+        return ceiling * (1 - spread) / 1000
+
+
+class EventBusFullError(RuntimeError):
+    """Raised by ``publish`` when the queue is full and the overflow policy is ``reject``."""
+
+
+@dataclass(slots=True)
+class _Work:
+    """A root event waiting in its partition lane, or its parked chain coming back from retry."""
+
+    root: Event
+    enqueued_at: float
+    chain: deque[Event] | None = None
+
+
+@dataclass(slots=True)
+class _BatchRoute:
+    """A batch handler and the root events collected for its next delivery."""
+
+    handler: BatchHandler
+    max_batch: int
+    max_wait_ms: float
+    pending: list[tuple[int, _Work]] = field(default_factory=list)
+    timer: asyncio.TimerHandle | None = None
 
 
 class AsyncEventBus:
-    def __init__(self, logger=None) -> None:
+    """Dispatches events to handlers, inline (``workers=0``) or through background consumers.
+
+    With ``workers > 0``, ``publish`` only enqueues and returns. Events are hashed by
+    ``Event.ordering_key()`` into ``partitions`` FIFO lanes; a partition is handled by at most
+    one consumer at a time, so each user's events keep publish order while different users
+    run concurrently. ``max_queue`` bounds the events waiting across all partitions and
+    ``overflow`` decides what happens when it is reached. Events published by a handler run
+    on the consumer that is processing the parent event, right after it returns.
+
+    A failed handler is retried after its ``RetryPolicy`` backoff. In worker mode the chain is
+    parked on a timer heap and its partition stays claimed, so later events of the same key
+    wait behind it without holding a consumer; inline, the publisher sleeps out the delay.
+
+    With a ``journal``, accepted events are durably appended before ``publish`` returns and
+    acked once their whole handler chain finished; ``recover`` re-queues what a previous
+    process left unfinished and failed chains are parked in the journal's dead letters.
+
+    ``register_batch`` hands a handler up to ``batch_max`` root events at once, or whatever
+    arrived within ``batch_wait_ms`` of the first one, so it can share reads across users.
+    Each event's partition stays claimed until its own chain finished. A batch handler that
+    returns per-event outcomes has only its failed events retried, each with its own error;
+    when it raises, every event in it is retried alone. Inline, deliveries are batches of one.
+
+    With an ``outbox``, events published outside a handler chain are only written to that
+    shared ``PipelineQueue``; a separate worker process (``python -m app.worker``) runs them.
+    """
+
+    def __init__(
+        self,
+        logger=None,
+        idempotency: IdempotencyStore | None = None,
+        *,
+        workers: int = 0,
+        partitions: int = 64,
+        max_queue: int = 1000,
+        overflow: OverflowPolicy = "block",
+        journal: Journal | None = None,
+        outbox: PipelineQueue | None = None,
+        retry: RetryPolicy | None = None,
+        retry_policies: Mapping[str, RetryPolicy] | None = None,
+        batch_max: int = 64,
+        batch_wait_ms: float = 5.0,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Política de overflow inválida: {overflow}")
+        if partitions < 1:
+            raise ValueError("O número de partições deve ser positivo")
         self.handlers: dict[str, Handler] = {}
-        self.queue: deque[Event] = deque()
+        self.batch_handlers: dict[str, _BatchRoute] = {}
         self.dlq: list[tuple[Event, str]] = []
         self._logger = logger or configure_logging()
-        self._processed: set[str] = set()
+        self.idempotency: IdempotencyStore = (
+            idempotency if idempotency is not None else MemoryIdempotencyStore()
+        )
         self._lock = asyncio.Lock()
+        self.workers = workers
+        self.partitions = partitions
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.journal = journal
+        self.outbox = outbox
+        self.retry = retry or RetryPolicy()
+        self.retry_policies: dict[str, RetryPolicy] = dict(retry_policies or {})
+        self.batch_max = batch_max
+        self.batch_wait_ms = batch_wait_ms
+        self._lanes: list[deque[_Work]] = [deque() for _ in range(partitions)]
+        # partitions with queued events that no consumer is handling right now, and batches
+        # whose wait window closed
+        self._ready: asyncio.Queue[int | list[tuple[int, _Work]]] | None = None
+        self._claimed: set[int] = set()
+        self._slots: asyncio.Semaphore | None = None
+        self._depth = 0
+        self._in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._consumers: list[asyncio.Task[None]] = []
+        self._closing = False
+        self._retries: list[tuple[float, int, int, _Work]] = []
+        self._retry_seq = itertools.count()
+        self._retry_wakeup = asyncio.Event()
+        self._retry_timer: asyncio.Task[None] | None = None
 
     def register(self, event_name: str, handler: Handler) -> None:
         self.handlers[event_name] = handler
 
+    def register_batch(
+        self,
+        event_name: str,
+        handler: BatchHandler,
+        *,
+        max_batch: int | None = None,
+        max_wait_ms: float | None = None,
+    ) -> None:
+        """Deliver ``event_name`` to ``handler`` in lists of up to ``max_batch`` events."""
+        max_batch = max_batch or self.batch_max
+        if max_batch < 1:
+            raise ValueError("O tamanho máximo do lote deve ser positivo")
+        self.batch_handlers[event_name] = _BatchRoute(
+            handler,
+            max_batch=max_batch,
+            max_wait_ms=self.batch_wait_ms if max_wait_ms is None else max_wait_ms,
+        )
+
+    async def _seen(self, key: str) -> bool:
+        if self.idempotency.blocking:
+            return await asyncio.to_thread(self.idempotency.seen, key)
+        return self.idempotency.seen(key)
+
+    async def _mark(self, *keys: str) -> None:
+        if not keys:
+            return
+        if self.idempotency.blocking:
+            # one thread hop for the whole batch
+            await asyncio.to_thread(_mark_all, self.idempotency, keys)
+        else:
+            _mark_all(self.idempotency, keys)
+
+    def policy_for(self, event: Event) -> RetryPolicy:
+        return self.retry_policies.get(event.name, self.retry)
+
     async def publish(self, event: Event) -> None:
         set_current_trace_id(event.trace_id)
-        async with self._lock:
-            if event.idempotency_key and event.idempotency_key in self._processed:
-                self._logger.debug(
-                    "event.skipped", extra={"event": event.name, "trace_id": event.trace_id}
-                )
-                return
-            self.queue.append(event)
+        # a cheap early skip, checked without the bus lock so publishers on other partitions
+        # do not queue behind a store round trip; ``mark`` stays the record of what ran
+        if event.idempotency_key and await self._seen(event.idempotency_key):
+            self._logger.debug(
+                "event.skipped", extra={"event": event.name, "trace_id": event.trace_id}
+            )
+            return
+        backlog = _chain_backlog.get()
+        if backlog is None and self.outbox is not None:
+            await self.outbox.put(event)
+            record_counter("event_bus.enqueued", attributes={"event": event.name})
+            return
+        if backlog is None and self.workers > 0:
+            await self._enqueue(event)
+            return
+        record_counter("event_bus.enqueued", attributes={"event": event.name})
+        if backlog is not None:
+            backlog.append(event)
+            return
+        chain: deque[Event] = deque([event])
+        token = _chain_backlog.set(chain)
+        try:
+            while (delay := await self._drain(chain)) is not None:
+                await asyncio.sleep(delay)
+        finally:
+            _chain_backlog.reset(token)
+
+    def partition_of(self, event: Event) -> int:
+        return zlib.crc32(event.ordering_key().encode("utf-8")) % self.partitions
+
+    async def _enqueue(self, event: Event) -> None:
+        if self._closing:
+            raise EventBusFullError("Event bus encerrando; evento não aceito")
+        ready, slots = self.start()
+        if self._depth >= self.max_queue and self.overflow != "block":
+            record_counter(
+                "event_bus.overflow", attributes={"event": event.name, "policy": self.overflow}
+            )
+            self._logger.warning(
+                "event.overflow",
+                extra={"event": event.name, "trace_id": event.trace_id, "policy": self.overflow},
+            )
+            if self.overflow == "reject":
+                raise EventBusFullError(f"Fila de eventos cheia ({self.max_queue})")
+            return
+        await slots.acquire()
+        if self.journal is not None:
+            try:
+                event.metadata["offset"] = await self.journal.append(event)
+            except Exception:
+                slots.release()
+                raise
+        self._admit(event, ready)
         record_counter("event_bus.enqueued", attributes={"event": event.name})
-        await self._drain()
 
-    async def _drain(self) -> None:
+    def _admit(self, event: Event, ready: asyncio.Queue[int | list[tuple[int, _Work]]]) -> None:
+        partition = self.partition_of(event)
+        self._lanes[partition].append(_Work(event, time.perf_counter()))
+        self._depth += 1
+        self._idle.clear()
+        if partition not in self._claimed:
+            self._claimed.add(partition)
+            ready.put_nowait(partition)
+        record_gauge("event_bus.queue_depth", self._depth)
+
+    async def submit(self, events: list[Event]) -> None:
+        """Queue root events that are already durable elsewhere (their ``offset`` is set),
+        waiting for capacity whatever the overflow policy."""
+        ready, slots = self.start()
+        for event in events:
+            await slots.acquire()
+            self._admit(event, ready)
+
+    async def recover(self) -> int:
+        """Start the consumers and re-queue journaled events a previous process left behind."""
+        self.start()
+        if self.journal is None:
+            return 0
+        pending = self.journal.pending()
+        await self.submit(pending)
+        if pending:
+            record_counter("event_bus.recovered", len(pending))
+            self._logger.warning("event_bus.recovered", extra={"events": len(pending)})
+        return len(pending)
+
+    def start(self) -> tuple[asyncio.Queue[int | list[tuple[int, _Work]]], asyncio.Semaphore]:
+        """Create the partition queue and consumer tasks on the running loop (idempotent)."""
+        if self._ready is None or self._slots is None:
+            self._ready = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_queue)
+        if self.workers > 0 and not self._consumers:
+            self._closing = False
+            self._consumers = [
+                asyncio.create_task(self._consume(), name=f"event-bus-consumer-{idx}")
+                for idx in range(self.workers)
+            ]
+            self._retry_timer = asyncio.create_task(
+                self._release_retries(), name="event-bus-retry"
+            )
+            self._logger.info(
+                "event_bus.started",
+                extra={
+                    "workers": self.workers,
+                    "partitions": self.partitions,
+                    "max_queue": self.max_queue,
+                    "overflow": self.overflow,
+                },
+            )
+        return self._ready, self._slots
+
+    async def stop(self, timeout: float | None = None) -> None:
+        """Stop accepting events, wait for queued, in-flight and retrying events, then stop."""
+        self._closing = True
+        if self._consumers:
+            try:
+                await asyncio.wait_for(self._idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                self._logger.warning(
+                    "event_bus.drain_timeout", extra={"remaining": self._depth + self._in_flight}
+                )
+        tasks = [*self._consumers, *([self._retry_timer] if self._retry_timer else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for route in self.batch_handlers.values():
+            if route.timer is not None:
+                route.timer.cancel()
+                route.timer = None
+            route.pending.clear()
+        if self.journal is not None:
+            await self.journal.flush()
+        self._consumers = []
+        self._retry_timer = None
+        self._retries.clear()
+        self._ready = None
+        self._slots = None
+        self._claimed.clear()
+
+    async def _consume(self) -> None:
+        assert self._ready is not None and self._slots is not None
+        ready, slots = self._ready, self._slots
+        while True:
+            item = await ready.get()
+            if isinstance(item, list):
+                await self._run_batch(item)
+                continue
+            partition = item
+            work = self._lanes[partition].popleft()
+            event = work.root
+            if work.chain is not None:
+                await self._run_chain(partition, work, work.chain)
+                continue
+            self._depth -= 1
+            self._in_flight += 1
+            slots.release()
+            record_gauge("event_bus.queue_depth", self._depth)
+            record_histogram(
+                "event_bus.queue_wait_ms",
+                (time.perf_counter() - work.enqueued_at) * 1000,
+                attributes={"event": event.name},
+            )
+            route = self.batch_handlers.get(event.name)
+            if route is None:
+                await self._run_chain(partition, work, deque([event]))
+            elif batch := self._collect(route, partition, work):
+                await self._run_batch(batch)
+
+    async def _run_chain(self, partition: int, work: _Work, chain: deque[Event]) -> None:
+        event = work.root
+        token = _chain_backlog.set(chain)
+        delay: float | None = None
+        try:
+            set_current_trace_id(event.trace_id)
+            delay = await self._drain(chain, root=event)
+            if delay is None and self.journal is not None and "offset" in event.metadata:
+                self.journal.ack(event.metadata["offset"])
+        except Exception as exc:  # pragma: no cover - consumers must outlive bad events
+            self._logger.error(
+                "event.consumer_error",
+                extra={"event": event.name, "trace_id": event.trace_id, "error": str(exc)},
+            )
+        finally:
+            _chain_backlog.reset(token)
+        if delay is not None:
+            # keep the partition claimed: later events of this key wait behind the retry
+            self._park(partition, _Work(event, work.enqueued_at, chain), delay)
+            return
+        self._release(partition)
+
+    def _release(self, partition: int) -> None:
+        # hand the partition back only after its chain finished, keeping FIFO per key
+        if self._lanes[partition] and self._ready is not None:
+            self._ready.put_nowait(partition)
+        else:
+            self._claimed.discard(partition)
+        self._in_flight -= 1
+        if self._depth == 0 and self._in_flight == 0:
+            self._idle.set()
+
+    def _collect(
+        self, route: _BatchRoute, partition: int, work: _Work
+    ) -> list[tuple[int, _Work]] | None:
+        """Add ``work`` to the route's next batch; return the batch once it is full."""
+        route.pending.append((partition, work))
+        if len(route.pending) >= route.max_batch:
+            return self._take_batch(route)
+        if route.timer is None:
+            route.timer = asyncio.get_running_loop().call_later(
+                route.max_wait_ms / 1000, self._batch_due, route
+            )
+        return None
+
+    def _take_batch(self, route: _BatchRoute) -> list[tuple[int, _Work]]:
+        if route.timer is not None:
+            route.timer.cancel()
+            route.timer = None
+        batch, route.pending = route.pending, []
+        return batch
+
+    def _batch_due(self, route: _BatchRoute) -> None:
+        route.timer = None
+        if route.pending and self._ready is not None:
+            self._ready.put_nowait(self._take_batch(route))
+
+    async def _run_batch(self, batch: list[tuple[int, _Work]]) -> None:
+        events = [work.root for _, work in batch]
+        name = events[0].name
+        route = self.batch_handlers[name]
+        # follow-ups of the whole batch land here and are split per root below
+        followups: deque[Event] = deque()
+        token = _chain_backlog.set(followups)
+        outcomes: list[Exception | None]
+        try:
+            outcomes = await route.handler(events) or [None] * len(events)
+        except Exception as exc:  # pragma: no cover - resiliency path
+            outcomes = [exc] * len(events)
+        finally:
+            _chain_backlog.reset(token)
+        record_histogram("event_bus.batch_size", len(events), attributes={"event": name})
+        done: list[tuple[int, _Work]] = []
+        failed_keys: set[str] = set()
+        for (partition, work), error in zip(batch, outcomes, strict=True):
+            if error is None:
+                done.append((partition, work))
+                continue
+            # one bad event must not hold back the rest: each one is retried on its own
+            failed_keys.add(work.root.ordering_key())
+            delay = self._handle_failure(work.root, error, root=work.root)
+            if delay is None:
+                self._release(partition)
+            else:
+                self._park(partition, _Work(work.root, work.enqueued_at, deque([work.root])), delay)
+        if not done:
+            return
+        await self._mark(
+            *(work.root.idempotency_key for _, work in done if work.root.idempotency_key)
+        )
+        record_counter("event_bus.processed", len(done), attributes={"event": name})
+        chains: dict[str, deque[Event]] = {work.root.ordering_key(): deque() for _, work in done}
+        fallback = chains[done[0][1].root.ordering_key()]
+        for followup in followups:
+            key = followup.ordering_key()
+            if key in chains:
+                chains[key].append(followup)
+            elif key not in failed_keys:
+                fallback.append(followup)
+        await asyncio.gather(
+            *(
+                self._run_chain(partition, work, chains[work.root.ordering_key()])
+                for partition, work in done
+            )
+        )
+
+    def _park(self, partition: int, work: _Work, delay: float) -> None:
+        due = asyncio.get_running_loop().time() + delay
+        heapq.heappush(self._retries, (due, next(self._retry_seq), partition, work))
+        record_gauge("event_bus.retries_scheduled", len(self._retries))
+        self._retry_wakeup.set()
+
+    async def _release_retries(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._retry_wakeup.clear()
+            if not self._retries:
+                await self._retry_wakeup.wait()
+                continue
+            wait = self._retries[0][0] - loop.time()
+            if wait > 0:
+                try:
+                    await asyncio.wait_for(self._retry_wakeup.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            _, _, partition, work = heapq.heappop(self._retries)
+            record_gauge("event_bus.retries_scheduled", len(self._retries))
+            self._lanes[partition].appendleft(work)
+            if self._ready is not None:
+                self._ready.put_nowait(partition)
+
+    async def _drain(self, queue: deque[Event], root: Event | None = None) -> float | None:
+        """Run ``queue`` in order; on a retryable failure, leave it at the front and return
+        the backoff delay in seconds. ``None`` means the chain finished."""
         while True:
             async with self._lock:
-                if not self.queue:
-                    break
-                event = self.queue.popleft()
+                if not queue:
+                    return None
+                event = queue.popleft()
             handler = self.handlers.get(event.name)
+            if not handler and event.name in self.batch_handlers:
+                handler = partial(_deliver_one, self.batch_handlers[event.name].handler)
             if not handler:
                 self._logger.error(
                     "event.unhandled", extra={"event": event.name, "trace_id": event.trace_id}
                 )
                 continue
+            published_before = len(queue)
             try:
                 await handler(event)
                 if event.idempotency_key:
-                    self._processed.add(event.idempotency_key)
+                    await self._mark(event.idempotency_key)
                 record_counter("event_bus.processed", attributes={"event": event.name})
             except Exception as exc:  # pragma: no cover - resiliency path
-                event.attempt += 1
-                if event.attempt < event.max_attempts:
-                    self._logger.warning(
-                        "event.retry",
-                        extra={
-                            "event": event.name,
-                            "trace_id": event.trace_id,
-                            "attempt": event.attempt,
-                        },
-                    )
+                # follow-ups of the failed attempt are published again by the retry
+                while len(queue) > published_before:
+                    queue.pop()
+                delay = self._handle_failure(event, exc, root)
+                if delay is not None:
                     async with self._lock:
-                        self.queue.append(event)
-                else:
-                    self.dlq.append((event, str(exc)))
-                    self._logger.error(
-                        "event.dlq",
-                        extra={
-                            "event": event.name,
-                            "trace_id": event.trace_id,
-                            "error": str(exc),
-                        },
-                    )
-                    record_counter("event_bus.dlq", attributes={"event": event.name})
+                        queue.appendleft(event)
+                    return delay
+
+    def _handle_failure(self, event: Event, exc: Exception, root: Event | None) -> float | None:
+        """Count a failed attempt; return the retry delay, or ``None`` once dead-lettered."""
+        event.attempt += 1
+        policy = self.policy_for(event)
+        max_attempts = policy.max_attempts or event.max_attempts
+        if event.attempt < max_attempts:
+            delay = policy.delay(event.attempt)
+            self._logger.warning(
+                "event.retry",
+                extra={
+                    "event": event.name,
+                    "trace_id": event.trace_id,
+                    "attempt": event.attempt,
+                    "delay_ms": round(delay * 1000, 1),
+                },
+            )
+            record_histogram(
+                "event_bus.retry_delay_ms", delay * 1000, attributes={"event": event.name}
+            )
+            return delay
+        self.dlq.append((event, str(exc)))
+        if self.journal is not None and root and "offset" in root.metadata:
+            self.journal.dead_letter(root.metadata["offset"], root, event.name, str(exc))
+        self._logger.error(
+            "event.dlq",
+            extra={
+                "event": event.name,
+                "trace_id": event.trace_id,
+                "error": str(exc),
+            },
+        )
+        record_counter("event_bus.dlq", attributes={"event": event.name})
+        return None
 
     def drain_and_get_dlq(self) -> list[tuple[Event, str]]:
         """Expose DLQ for inspection in tests."""
         return list(self.dlq)
+
+
+async def _deliver_one(handler: BatchHandler, event: Event) -> None:
+    outcomes = await handler([event])
+    if outcomes and outcomes[0] is not None:
+        raise outcomes[0]
+
+
+def _mark_all(store: IdempotencyStore, keys: tuple[str, ...]) -> None:
+    for key in keys:
+        store.mark(key)
+
+
+def _overflow_policy(raw: str) -> OverflowPolicy:
+    policy = raw.strip().lower()
+    if policy not in OVERFLOW_POLICIES:
+        raise ValueError(
+            f"EVENT_BUS_OVERFLOW inválido: {raw!r} (use {', '.join(OVERFLOW_POLICIES)})"
+        )
+    return cast(OverflowPolicy, policy)
+
+
+def _retry_policies(raw: str) -> dict[str, RetryPolicy]:
+    try:
+        overrides = json.loads(raw) if raw else {}
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"EVENT_RETRY_POLICIES inválido: {exc}") from exc
+    known = {item.name for item in fields(RetryPolicy)}
+    policies: dict[str, RetryPolicy] = {}
+    for event_name, options in overrides.items():
+        unknown = set(options) - known
+        if unknown:
+            raise ValueError(f"Campos de retry desconhecidos para {event_name}: {sorted(unknown)}")
+        policies[event_name] = RetryPolicy(**options)
+    return policies
+
+
+def init_event_bus(
+    logger,
+    idempotency: IdempotencyStore | None = None,
+    *,
+    outbox: PipelineQueue | None = None,
+    journal: Journal | None = None,
+    workers: int | None = None,
+) -> AsyncEventBus:
+    if workers is None:
+        workers = int(os.getenv("EVENT_BUS_WORKERS", "0"))
+    partitions = int(os.getenv("EVENT_BUS_PARTITIONS", "64"))
+    max_queue = int(os.getenv("EVENT_BUS_MAX_QUEUE", "1000"))
+    overflow = _overflow_policy(os.getenv("EVENT_BUS_OVERFLOW", "block"))
+    retry = RetryPolicy(
+        base_delay_ms=float(os.getenv("EVENT_RETRY_BASE_MS", "100")),
+        max_delay_ms=float(os.getenv("EVENT_RETRY_MAX_MS", "30000")),
+    )
+    retry_policies = _retry_policies(os.getenv("EVENT_RETRY_POLICIES", ""))
+    batch_max = int(os.getenv("EVENT_BATCH_MAX", "64"))
+    batch_wait_ms = float(os.getenv("EVENT_BATCH_WAIT_MS", "5"))
+    if outbox is not None:
+        logger.info("event_bus.outbox", extra={"path": outbox.path})
+    elif workers <= 0:
+        logger.info("event_bus.inline")
+    else:
+        logger.info(
+            "event_bus.workers",
+            extra={
+                "workers": workers,
+                "partitions": partitions,
+                "max_queue": max_queue,
+                "overflow": overflow,
+                "batch_max": batch_max,
+                "batch_wait_ms": batch_wait_ms,
+            },
+        )
+    logger.info(
+        "event_bus.retry",
+        extra={
+            "base_delay_ms": retry.base_delay_ms,
+            "max_delay_ms": retry.max_delay_ms,
+            "overrides": sorted(retry_policies),
+        },
+    )
+    return AsyncEventBus(
+        logger,
+        idempotency=idempotency,
+        journal=journal or (init_event_journal(logger) if workers > 0 else None),
+        outbox=outbox,
+        workers=workers,
+        partitions=partitions,
+        max_queue=max_queue,
+        overflow=overflow,
+        retry=retry,
+        retry_policies=retry_policies,
+        batch_max=batch_max,
+        batch_wait_ms=batch_wait_ms,
+    )
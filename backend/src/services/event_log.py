@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Protocol
+
+from core.logging import configure_logging
+from core.telemetry import record_counter, record_gauge, record_histogram
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle guard
+    from services.event_bus import Event
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS events (
+        "offset" INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        body TEXT NOT NULL,
+        appended_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dead_letters (
+        "offset" INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        body TEXT NOT NULL,
+        failed_event TEXT NOT NULL,
+        error TEXT NOT NULL,
+        failed_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS checkpoints (
+        consumer TEXT PRIMARY KEY,
+        "offset" INTEGER NOT NULL
+    )
+    """,
+)
+
+
+def event_to_body(event: Event) -> str:
+    metadata = {key: value for key, value in event.metadata.items() if key != "offset"}
+    return json.dumps(
+        {
+            "name": event.name,
+            "payload": event.payload,
+            "trace_id": event.trace_id,
+            "max_attempts": event.max_attempts,
+            "version": event.version,
+            "idempotency_key": event.idempotency_key,
+            "partition_key": event.partition_key,
+            "metadata": metadata,
+        },
+        ensure_ascii=False,
+    )
+
+
+def event_from_body(body: str, offset: int | None = None) -> Event:
+    from services.event_bus import Event
+
+    data = json.loads(body)
+    event = Event(
+        name=data["name"],
+        payload=data["payload"],
+        trace_id=data["trace_id"],
+        max_attempts=data.get("max_attempts", 3),
+        version=data.get("version", "1.0"),
+        idempotency_key=data.get("idempotency_key"),
+        partition_key=data.get("partition_key"),
+        metadata=data.get("metadata") or {},
+    )
+    if offset is not None:
+        event.metadata["offset"] = offset
+    return event
+
+
+class Journal(Protocol):
+    """What ``AsyncEventBus`` needs from a durable log of the root events it accepted."""
+
+    async def append(self, event: Event) -> int:
+        ...
+
+    def ack(self, offset: int) -> None:
+        ...
+
+    def dead_letter(self, offset: int, event: Event, failed_event: str, error: str) -> None:
+        ...
+
+    def pending(self) -> list[Event]:
+        ...
+
+    async def flush(self) -> None:
+        ...
+
+
+@dataclass(slots=True)
+class DeadLetter:
+    offset: int
+    event: Event
+    failed_event: str
+    error: str
+    failed_at: float
+
+
+class EventJournal:
+    """Append-only SQLite (WAL) journal of events accepted by the bus.
+
+    Appends, dead letters and the consumer checkpoint are group-committed: callers of
+    ``append`` wait for the batch that holds their event, and each batch costs one
+    transaction (one fsync with ``synchronous=FULL``) however many events it carries.
+    Offsets are assigned in memory, so one journal file belongs to one worker process.
+    The checkpoint is the highest offset below which every event was acked or dead-lettered;
+    events above it are replayed by ``pending`` after a restart (at-least-once delivery).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 256,
+        flush_interval_ms: float = 2.0,
+        consumer: str = "event_bus",
+        logger=None,
+    ) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval_ms = flush_interval_ms
+        self.consumer = consumer
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        row = self._conn.execute(
+            'SELECT "offset" FROM checkpoints WHERE consumer = ?', (consumer,)
+        ).fetchone()
+        self.checkpoint: int = row[0] if row else 0
+        last = self._conn.execute('SELECT MAX("offset") FROM events').fetchone()[0]
+        last_dead = self._conn.execute('SELECT MAX("offset") FROM dead_letters').fetchone()[0]
+        self._next_offset = max(last or 0, last_dead or 0, self.checkpoint) + 1
+        # unfinished events of a previous run hold the checkpoint back until they are handled
+        self._outstanding: list[int] = [offset for offset, _ in self._pending_rows()]
+        self._resolved: set[int] = set()
+        self._persisted_checkpoint = self.checkpoint
+        self._appends: list[tuple[int, str, str, asyncio.Future[int]]] = []
+        self._dead: list[tuple[int, str, str, str, str]] = []
+        self._flush_lock = asyncio.Lock()
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_task: asyncio.Task[None] | None = None
+        self._logger = logger or configure_logging()
+
+    async def append(self, event: Event) -> int:
+        """Durably record ``event`` and return its offset once its batch is committed."""
+        offset = self._next_offset
+        self._next_offset += 1
+        future: asyncio.Future[int] = asyncio.get_running_loop().create_future()
+        self._appends.append((offset, event.name, event_to_body(event), future))
+        heapq.heappush(self._outstanding, offset)
+        if len(self._appends) >= self.batch_size:
+            await self.flush()
+        else:
+            self._schedule_flush()
+        return await future
+
+    def ack(self, offset: int) -> None:
+        """Mark ``offset`` handled; the checkpoint moves with the next flush."""
+        self._resolved.add(offset)
+        self._schedule_flush()
+
+    def dead_letter(self, offset: int, event: Event, failed_event: str, error: str) -> None:
+        """Park the root event at ``offset`` (the chain failed at ``failed_event``)."""
+        self._dead.append((offset, event.name, event_to_body(event), failed_event, error))
+        self.ack(offset)
+
+    def pending(self) -> list[Event]:
+        """Events a previous run journaled but neither acked nor dead-lettered."""
+        return [event_from_body(body, offset) for offset, body in self._pending_rows()]
+
+    def _pending_rows(self) -> list[tuple[int, str]]:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT "offset", body FROM events WHERE "offset" > ? '
+                'AND "offset" NOT IN (SELECT "offset" FROM dead_letters) ORDER BY "offset"',
+                (self.checkpoint,),
+            ).fetchall()
+
+    def dead_letters(self, event: str | None = None, limit: int | None = None) -> list[DeadLetter]:
+        query = 'SELECT "offset", body, failed_event, error, failed_at FROM dead_letters'
+        params: list[Any] = []
+        if event:
+            query += " WHERE name = ?"
+            params.append(event)
+        query += ' ORDER BY "offset"'
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            DeadLetter(offset, event_from_body(body), failed_event, error, failed_at)
+            for offset, body, failed_event, error, failed_at in rows
+        ]
+
+    def remove_dead_letters(self, offsets: list[int]) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            removed = self._conn.executemany(
+                'DELETE FROM dead_letters WHERE "offset" = ?', [(offset,) for offset in offsets]
+            ).rowcount
+            self._conn.execute(
+                'DELETE FROM events WHERE "offset" <= ? '
+                'AND "offset" NOT IN (SELECT "offset" FROM dead_letters)',
+                (self.checkpoint,),
+            )
+            self._conn.execute("COMMIT")
+        return removed
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            events = self._conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+            dead = self._conn.execute("SELECT COUNT(*) FROM dead_letters").fetchone()[0]
+        return {
+            "checkpoint": self.checkpoint,
+            "next_offset": self._next_offset,
+            "retained_events": events,
+            "dead_letters": dead,
+        }
+
+    def _schedule_flush(self) -> None:
+        if self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.flush_interval_ms / 1000, self._start_flush)
+
+    def _start_flush(self) -> None:
+        # keep a reference: the loop only holds tasks weakly
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        self._flush_task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task[None]) -> None:
+        if task is self._flush_task:
+            self._flush_task = None
+        if task.cancelled() or task.exception() is None:
+            return
+        # appenders already got the error; dead letters and acks wait for the next flush
+        record_counter("event_log.flush_failures")
+        self._logger.error(
+            "event_log.flush_failed", extra={"path": self.path, "error": repr(task.exception())}
+        )
+
+    def _advance_checkpoint(self) -> int:
+        while self._outstanding and self._outstanding[0] in self._resolved:
+            self._resolved.discard(heapq.heappop(self._outstanding))
+        if self._outstanding:
+            return self._outstanding[0] - 1
+        return self._next_offset - 1
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            appends, self._appends = self._appends, []
+            dead, self._dead = self._dead, []
+            checkpoint = self._advance_checkpoint()
+            if not appends and not dead and checkpoint == self._persisted_checkpoint:
+                return
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._write, appends, dead, checkpoint)
+            except Exception as exc:
+                for *_, future in appends:
+                    if not future.done():
+                        future.set_exception(exc)
+                # the failed events were never journaled and their callers saw the error;
+                # they must not hold the checkpoint back
+                self._resolved.update(offset for offset, *_ in appends)
+                self._dead[:0] = dead
+                raise
+            self._persisted_checkpoint = self.checkpoint = checkpoint
+            for offset, *_, future in appends:
+                if not future.done():
+                    future.set_result(offset)
+            record_histogram("event_log.flush_ms", (time.perf_counter() - started) * 1000)
+            record_histogram("event_log.batch_size", len(appends))
+            record_gauge("event_log.checkpoint", checkpoint)
+            if appends:
+                record_counter("event_log.appended", len(appends))
+
+    def _write(
+        self,
+        appends: list[tuple[int, str, str, asyncio.Future[int]]],
+        dead: list[tuple[int, str, str, str, str]],
+        checkpoint: int,
+    ) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    'INSERT INTO events ("offset", name, body, appended_at) VALUES (?, ?, ?, ?)',
+                    [(offset, name, body, now) for offset, name, body, _ in appends],
+                )
+                self._conn.executemany(
+                    'INSERT OR REPLACE INTO dead_letters ("offset", name, body, failed_event, '
+                    "error, failed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(*row, now) for row in dead],
+                )
+                self._conn.execute(
+                    'INSERT INTO checkpoints (consumer, "offset") VALUES (?, ?) '
+                    'ON CONFLICT(consumer) DO UPDATE SET "offset" = excluded."offset"',
+                    (self.consumer, checkpoint),
+                )
+                # segments below the checkpoint are no longer needed for recovery
+                self._conn.execute(
+                    'DELETE FROM events WHERE "offset" <= ? '
+                    'AND "offset" NOT IN (SELECT "offset" FROM dead_letters)',
+                    (checkpoint,),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    async def close(self) -> None:
+        await self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+def init_event_journal(logger) -> EventJournal | None:
+    path = os.getenv("EVENT_LOG_PATH")
+    if not path:
+        logger.info("event_log.disabled")
+        return None
+    batch_size = int(os.getenv("EVENT_LOG_BATCH_SIZE", "256"))
+    flush_ms = float(os.getenv("EVENT_LOG_FLUSH_MS", "2"))
+    logger.info(
+        "event_log.enabled",
+        extra={"path": path, "batch_size": batch_size, "flush_interval_ms": flush_ms},
+    )
+    return EventJournal(path, batch_size=batch_size, flush_interval_ms=flush_ms, logger=logger)
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, ClassVar, Protocol
+
+try:  # pragma: no cover - exercised in environments without redis installed
+    from redis import Redis
+    _redis_import_error: Exception | None = None
+except Exception as exc:  # pragma: no cover - optional dependency
+    Redis = None  # type: ignore
+    _redis_import_error = exc
+
+from core.cache import connect_redis
+from core.telemetry import record_counter, record_gauge
+
+
+class IdempotencyStore(Protocol):
+    """Remembers processed event keys for a bounded time and size.
+
+    Stores that do I/O set ``blocking``; the event bus then calls them from a worker thread
+    instead of the event loop.
+    """
+
+    blocking: ClassVar[bool]
+
+    def seen(self, key: str) -> bool:
+        """Return True (and count a duplicate hit) when ``key`` was processed and is live."""
+
+    def mark(self, key: str) -> None:
+        """Record ``key`` as processed, evicting expired or excess keys as needed."""
+
+    def __len__(self) -> int:
+        ...
+
+    def stats(self) -> dict[str, int]:
+        ...
+
+
+def _record_evictions(backend: str, reason: str, amount: int) -> None:
+    if amount:
+        record_counter(
+            "idempotency.evictions", amount, attributes={"backend": backend, "reason": reason}
+        )
+
+
+@dataclass(slots=True)
+class MemoryIdempotencyStore(IdempotencyStore):
+    """Per-process store; with a single TTL, insertion order is also expiry order."""
+
+    blocking: ClassVar[bool] = False
+    max_entries: int = 100_000
+    ttl_seconds: float = 86_400.0
+    clock: Callable[[], float] = time.monotonic
+    _expiry: OrderedDict[str, float] = field(default_factory=OrderedDict)
+    evictions: Counter[str] = field(default_factory=Counter)
+    duplicates: int = 0
+
+    def seen(self, key: str) -> bool:
+        self._expire()
+        if key not in self._expiry:
+            return False
+        self.duplicates += 1
+        record_counter("idempotency.duplicates", attributes={"backend": "memory"})
+        return True
+
+    def mark(self, key: str) -> None:
+        self._expiry[key] = self.clock() + self.ttl_seconds
+        self._expiry.move_to_end(key)
+        self._expire()
+        evicted = 0
+        while len(self._expiry) > self.max_entries:
+            self._expiry.popitem(last=False)
+            evicted += 1
+        self.evictions["size"] += evicted
+        _record_evictions("memory", "size", evicted)
+        record_gauge("idempotency.size", len(self._expiry), attributes={"backend": "memory"})
+
+    def _expire(self) -> None:
+        now = self.clock()
+        expired = 0
+        while self._expiry:
+            key, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            del self._expiry[key]
+            expired += 1
+        self.evictions["ttl"] += expired
+        _record_evictions("memory", "ttl", expired)
+
+    def __len__(self) -> int:
+        self._expire()
+        return len(self._expiry)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self),
+            "duplicates": self.duplicates,
+            "evictions_ttl": self.evictions["ttl"],
+            "evictions_size": self.evictions["size"],
+        }
+
+
+class SQLiteIdempotencyStore(IdempotencyStore):
+    """Store shared by every worker on the same host through one SQLite file (WAL mode).
+
+    Expiry uses wall-clock time so processes agree on it. Pruning runs every
+    ``prune_every`` marks rather than on each write to keep the hot path to one statement.
+    """
+
+    blocking: ClassVar[bool] = True
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 100_000,
+        ttl_seconds: float = 86_400.0,
+        prune_every: int = 256,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.prune_every = prune_every
+        self.clock = clock
+        self.evictions: Counter[str] = Counter()
+        self.duplicates = 0
+        self._marks = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS idempotency_keys "
+            "(key TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_idempotency_keys_expires_at "
+            "ON idempotency_keys (expires_at)"
+        )
+
+    def seen(self, key: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM idempotency_keys WHERE key = ? AND expires_at > ?",
+                (key, self.clock()),
+            ).fetchone()
+        if row is None:
+            return False
+        self.duplicates += 1
+        record_counter("idempotency.duplicates", attributes={"backend": "sqlite"})
+        return True
+
+    def mark(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO idempotency_keys (key, expires_at) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET expires_at = excluded.expires_at",
+                (key, self.clock() + self.ttl_seconds),
+            )
+            self._marks += 1
+            if self._marks % self.prune_every == 0:
+                self._prune()
+
+    def prune(self) -> None:
+        with self._lock:
+            self._prune()
+
+    def _prune(self) -> None:
+        expired = self._conn.execute(
+            "DELETE FROM idempotency_keys WHERE expires_at <= ?", (self.clock(),)
+        ).rowcount
+        size = self._conn.execute("SELECT COUNT(*) FROM idempotency_keys").fetchone()[0]
+        excess = max(0, size - self.max_entries)
+        if excess:
+            self._conn.execute(
+                "DELETE FROM idempotency_keys WHERE key IN "
+                "(SELECT key FROM idempotency_keys ORDER BY expires_at ASC LIMIT ?)",
+                (excess,),
+            )
+        self.evictions["ttl"] += expired
+        self.evictions["size"] += excess
+        _record_evictions("sqlite", "ttl", expired)
+        _record_evictions("sqlite", "size", excess)
+        record_gauge("idempotency.size", size - excess, attributes={"backend": "sqlite"})
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM idempotency_keys WHERE expires_at > ?", (self.clock(),)
+            ).fetchone()[0]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "size": len(self),
+            "duplicates": self.duplicates,
+            "evictions_ttl": self.evictions["ttl"],
+            "evictions_size": self.evictions["size"],
+        }
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class RedisIdempotencyStore(IdempotencyStore):
+    """Cluster-wide store: one Redis key per processed event, expired by Redis itself.
+
+    ``seen`` is one ``EXISTS`` and ``mark`` one ``SET NX PX``, so neither needs a
+    read-modify-write round trip. Redis drops keys at their TTL; the total is bounded by the
+    server's ``maxmemory`` and an evicting policy (``volatile-ttl``) rather than
+    ``max_entries``, which ``check_bound`` verifies.
+    """
+
+    blocking: ClassVar[bool] = True
+
+    def __init__(
+        self,
+        client: Any,
+        ttl_seconds: float = 86_400.0,
+        key_prefix: str = "event_bus:processed",
+    ) -> None:
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self.duplicates = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}:{key}"
+
+    def seen(self, key: str) -> bool:
+        if not self.client.exists(self._key(key)):
+            return False
+        self._count_duplicate()
+        return True
+
+    def mark(self, key: str) -> None:
+        ttl_ms = max(1, int(self.ttl_seconds * 1000))
+        if not self.client.set(self._key(key), b"1", nx=True, px=ttl_ms):
+            # another worker processed the same event between its check and this mark
+            self._count_duplicate()
+
+    def _count_duplicate(self) -> None:
+        self.duplicates += 1
+        record_counter("idempotency.duplicates", attributes={"backend": "redis"})
+
+    def check_bound(self, logger) -> bool:
+        """Whether the server bounds the keys (``maxmemory`` set, a policy that evicts);
+        logs a warning when it does not or when ``CONFIG GET`` is not allowed."""
+        try:
+            config = {
+                _text(name): _text(value)
+                for name, value in self.client.config_get("maxmemory*").items()
+            }
+        except Exception as exc:  # managed Redis often disables CONFIG
+            logger.warning("idempotency.redis_bound_unknown", extra={"reason": str(exc)})
+            return False
+        maxmemory = int(config.get("maxmemory") or 0)
+        policy = config.get("maxmemory-policy", "noeviction")
+        if maxmemory and policy != "noeviction":
+            return True
+        logger.warning(
+            "idempotency.redis_unbounded",
+            extra={"maxmemory": maxmemory, "maxmemory_policy": policy},
+        )
+        return False
+
+    def __len__(self) -> int:
+        # a full keyspace scan: for stats and tests, never the event path
+        return sum(1 for _ in self.client.scan_iter(match=f"{self.key_prefix}:*", count=1000))
+
+    def stats(self) -> dict[str, int]:
+        # expiry happens inside Redis and is not observed here
+        return {
+            "size": len(self),
+            "duplicates": self.duplicates,
+            "evictions_ttl": 0,
+            "evictions_size": 0,
+        }
+
+
+def _text(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def init_idempotency_store(logger) -> IdempotencyStore:
+    backend = os.getenv("EVENT_IDEMPOTENCY_BACKEND", "memory").lower()
+    max_entries = int(os.getenv("EVENT_IDEMPOTENCY_MAX_KEYS", "100000"))
+    ttl = float(os.getenv("EVENT_IDEMPOTENCY_TTL_SECONDS", "86400"))
+    sqlite_path = os.getenv("EVENT_IDEMPOTENCY_SQLITE_PATH", "./nica-idempotency.db")
+
+    if backend == "redis":
+        redis_url = os.getenv("REDIS_URL")
+        if redis_url and Redis is not None:
+            logger.info(
+                "idempotency.enabled",
+                extra={"backend": "redis", "ttl_seconds": ttl},
+            )
+            # pooled, with socket timeouts, so a hung Redis cannot hold bus threads forever
+            store = RedisIdempotencyStore(connect_redis(redis_url, logger), ttl_seconds=ttl)
+            store.check_bound(logger)
+            return store
+        # keep the store shared between local workers when Redis is not reachable
+        reason = (
+            f"redis import failed: {_redis_import_error}" if redis_url else "REDIS_URL missing"
+        )
+        logger.warning("idempotency.fallback", extra={"backend": "sqlite", "reason": reason})
+        backend = "sqlite"
+
+    if backend == "sqlite":
+        logger.info(
+            "idempotency.enabled",
+            extra={"backend": "sqlite", "path": sqlite_path, "max_entries": max_entries},
+        )
+        return SQLiteIdempotencyStore(sqlite_path, max_entries=max_entries, ttl_seconds=ttl)
+
+    logger.info(
+        "idempotency.enabled",
+        extra={"backend": "memory", "max_entries": max_entries, "ttl_seconds": ttl},
+    )
+    return MemoryIdempotencyStore(max_entries=max_entries, ttl_seconds=ttl)
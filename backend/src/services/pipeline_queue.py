@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from core.logging import configure_logging
+from core.telemetry import record_counter, record_gauge, record_histogram
+
+from .event_log import DeadLetter, event_from_body, event_to_body
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle guard
+    from services.event_bus import Event
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS pipeline_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ordering_key TEXT NOT NULL,
+        name TEXT NOT NULL,
+        body TEXT NOT NULL,
+        enqueued_at REAL NOT NULL,
+        claimed_by TEXT,
+        lease_until REAL,
+        deliveries INTEGER NOT NULL DEFAULT 0,
+        failed_event TEXT,
+        error TEXT,
+        failed_at REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_pipeline_jobs_key ON pipeline_jobs (ordering_key, id)",
+)
+
+# pause before a failed timer flush retries, so a broken disk is not hammered every few ms
+FLUSH_RETRY_SECONDS = 1.0
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class PipelineQueue:
+    """Durable pipeline queue shared by API and worker processes through one SQLite file.
+
+    The API only ``put``s root events. Workers ``claim`` the oldest job of each ordering key
+    (the user) under a lease, so one user's jobs run one at a time and in order across every
+    worker process, while different users spread over them. A worker renews its leases with
+    ``heartbeat``; when it dies, its jobs become claimable again once the lease runs out
+    (at-least-once delivery). Finished jobs are deleted and failed ones stay in the table as
+    dead letters until ``requeue_dead_letters`` puts them back in line. ``ack``,
+    ``dead_letter`` and ``flush`` match ``EventJournal``, so a worker's ``AsyncEventBus``
+    reports completion here through its ``journal`` argument.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 30.0,
+        flush_interval_ms: float = 2.0,
+        worker_id: str | None = None,
+        logger=None,
+    ) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.flush_interval_ms = flush_interval_ms
+        self.worker_id = worker_id or default_worker_id()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False, timeout=30
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        for statement in _SCHEMA:
+            self._conn.execute(statement)
+        self._acks: list[int] = []
+        self._dead: list[tuple[str, str, int]] = []
+        self._flush_lock: asyncio.Lock | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._flush_task: asyncio.Task[None] | None = None
+        self._logger = logger or configure_logging()
+
+    async def put(self, event: Event) -> int:
+        """Durably enqueue a root event and return its job id."""
+        return await asyncio.to_thread(self._insert, event)
+
+    async def append(self, event: Event) -> int:
+        return await self.put(event)
+
+    def _insert(self, event: Event) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO pipeline_jobs (ordering_key, name, body, enqueued_at) "
+                "VALUES (?, ?, ?, ?)",
+                (event.ordering_key(), event.name, event_to_body(event), time.time()),
+            )
+        record_counter("pipeline_queue.enqueued", attributes={"event": event.name})
+        return int(cursor.lastrowid)
+
+    async def claim(self, limit: int) -> list[Event]:
+        """Lease up to ``limit`` jobs, each the oldest unfinished job of its ordering key."""
+        return await asyncio.to_thread(self._claim, limit)
+
+    def _claim(self, limit: int) -> list[Event]:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, body, enqueued_at FROM pipeline_jobs WHERE id IN ("
+                    "  SELECT MIN(id) FROM pipeline_jobs WHERE error IS NULL"
+                    "  GROUP BY ordering_key"
+                    ") AND (lease_until IS NULL OR lease_until <= ?) ORDER BY id LIMIT ?",
+                    (now, limit),
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE pipeline_jobs SET claimed_by = ?, lease_until = ?, "
+                    "deliveries = deliveries + 1 WHERE id = ?",
+                    [(self.worker_id, now + self.lease_seconds, job_id) for job_id, *_ in rows],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        for _, _, enqueued_at in rows:
+            record_histogram("pipeline_queue.wait_ms", (now - enqueued_at) * 1000)
+        if rows:
+            record_counter("pipeline_queue.claimed", len(rows))
+        return [event_from_body(body, job_id) for job_id, body, _ in rows]
+
+    async def heartbeat(self) -> int:
+        """Extend the leases this worker holds; returns how many jobs it still holds."""
+        return await asyncio.to_thread(self._heartbeat)
+
+    def _heartbeat(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE pipeline_jobs SET lease_until = ? WHERE claimed_by = ? AND error IS NULL",
+                (time.time() + self.lease_seconds, self.worker_id),
+            ).rowcount
+
+    def release(self) -> int:
+        """Give this worker's unfinished jobs back to the queue right away (clean shutdown)."""
+        with self._lock:
+            return self._conn.execute(
+                "UPDATE pipeline_jobs SET claimed_by = NULL, lease_until = NULL "
+                "WHERE claimed_by = ? AND error IS NULL",
+                (self.worker_id,),
+            ).rowcount
+
+    def ack(self, offset: int) -> None:
+        """Mark job ``offset`` done; it is deleted with the next flush."""
+        self._acks.append(offset)
+        self._schedule_flush()
+
+    def dead_letter(self, offset: int, event: Event, failed_event: str, error: str) -> None:
+        """Keep job ``offset`` as a dead letter; the user's next job becomes claimable."""
+        self._dead.append((failed_event, error, offset))
+        self._schedule_flush()
+
+    def pending(self) -> list[Event]:
+        # a shared queue has no per-process backlog: abandoned jobs come back via lease expiry
+        return []
+
+    def dead_letters(self, event: str | None = None, limit: int | None = None) -> list[DeadLetter]:
+        query = (
+            "SELECT id, body, failed_event, error, failed_at FROM pipeline_jobs "
+            "WHERE error IS NOT NULL"
+        )
+        params: list[object] = []
+        if event:
+            query += " AND name = ?"
+            params.append(event)
+        query += " ORDER BY id"
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [
+            DeadLetter(job_id, event_from_body(body), failed_event, error, failed_at)
+            for job_id, body, failed_event, error, failed_at in rows
+        ]
+
+    def requeue_dead_letters(self, offsets: list[int]) -> int:
+        """Move dead letters to the back of their user's line as new jobs; returns how many."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                requeued = 0
+                for job_id in offsets:
+                    requeued += self._conn.execute(
+                        "INSERT INTO pipeline_jobs (ordering_key, name, body, enqueued_at) "
+                        "SELECT ordering_key, name, body, ? FROM pipeline_jobs "
+                        "WHERE id = ? AND error IS NOT NULL",
+                        (now, job_id),
+                    ).rowcount
+                    self._conn.execute(
+                        "DELETE FROM pipeline_jobs WHERE id = ? AND error IS NOT NULL", (job_id,)
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if requeued:
+            record_counter("pipeline_queue.requeued", requeued)
+        return requeued
+
+    def stats(self) -> dict[str, int]:
+        now = time.time()
+        with self._lock:
+            queued, leased, dead = self._conn.execute(
+                "SELECT "
+                "  COALESCE(SUM(error IS NULL AND (lease_until IS NULL OR lease_until <= ?)), 0),"
+                "  COALESCE(SUM(error IS NULL AND lease_until > ?), 0),"
+                "  COALESCE(SUM(error IS NOT NULL), 0) "
+                "FROM pipeline_jobs",
+                (now, now),
+            ).fetchone()
+        record_gauge("pipeline_queue.depth", queued)
+        return {"queued": queued, "leased": leased, "dead_letters": dead}
+
+    def _schedule_flush(self, delay: float | None = None) -> None:
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(
+                self.flush_interval_ms / 1000 if delay is None else delay, self._start_flush
+            )
+
+    def _start_flush(self) -> None:
+        # keep a reference: the loop only holds tasks weakly
+        self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+        self._flush_task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task[None]) -> None:
+        if task is self._flush_task:
+            self._flush_task = None
+        if task.cancelled() or task.exception() is None:
+            return
+        # flush put the acks and dead letters back; no new ack may come to write them
+        record_counter("pipeline_queue.flush_failures")
+        self._logger.error(
+            "pipeline_queue.flush_failed",
+            extra={"path": self.path, "error": repr(task.exception())},
+        )
+        self._schedule_flush(FLUSH_RETRY_SECONDS)
+
+    async def flush(self) -> None:
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            acks, self._acks = self._acks, []
+            dead, self._dead = self._dead, []
+            if not acks and not dead:
+                return
+            try:
+                await asyncio.to_thread(self._write, acks, dead)
+            except Exception:
+                self._acks[:0] = acks
+                self._dead[:0] = dead
+                raise
+            if acks:
+                record_counter("pipeline_queue.acked", len(acks))
+            if dead:
+                record_counter("pipeline_queue.dead_letters", len(dead))
+
+    def _write(self, acks: list[int], dead: list[tuple[str, str, int]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "DELETE FROM pipeline_jobs WHERE id = ?", [(job_id,) for job_id in acks]
+                )
+                self._conn.executemany(
+                    "UPDATE pipeline_jobs SET failed_event = ?, error = ?, failed_at = ?, "
+                    "claimed_by = NULL, lease_until = NULL WHERE id = ?",
+                    [(failed_event, error, now, job_id) for failed_event, error, job_id in dead],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    async def close(self) -> None:
+        await self.flush()
+        with self._lock:
+            self._conn.close()
+
+
+def init_pipeline_queue(logger) -> PipelineQueue | None:
+    path = os.getenv("PIPELINE_QUEUE_PATH")
+    if not path:
+        logger.info("pipeline_queue.disabled")
+        return None
+    lease_seconds = float(os.getenv("PIPELINE_QUEUE_LEASE_SECONDS", "30"))
+    logger.info("pipeline_queue.enabled", extra={"path": path, "lease_seconds": lease_seconds})
+    return PipelineQueue(path, lease_seconds=lease_seconds, logger=logger)
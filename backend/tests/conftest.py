@@ -18,11 +18,14 @@ def anyio_backend():
 @pytest.fixture()
 def reset_state(monkeypatch, tmp_path):
     monkeypatch.setenv("DATABASE_URL", f"sqlite+pysqlite:///{tmp_path/'test.db'}")
+    import src.database.async_repository as async_repo
     import src.database.postgres as pg
     import src.core.orchestrator as orchestrator
 
     pg._ENGINE = None
     pg._repository = None
+    async_repo._ASYNC_ENGINE = None
+    async_repo._async_repository = None
     orchestrator._orchestrator = None
     yield
     repo = pg.get_repository()
@@ -1,14 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+import time
 from datetime import datetime
+from functools import partial
 from typing import Any
 
 import pytest
 
-from src.agents.calc import CalcAgent
+from src.agents.calc import CalcAgent, summarize_logs
 from src.agents.coach import CoachAgent
 from src.agents.dashboard_agent import DashboardAgent
 from src.agents.planner import PlannerAgent
+from src.agents.trend import TrendAgent
+from src.core.cache import RedisDashboardCache
 from src.core.logging import configure_logging
 from src.core.models import (
     DailyLog,
@@ -151,6 +157,9 @@ class _MemoryRepo(Repository):
     def logs(self, user: str) -> list[DailyLog]:
         return list(self._logs)
 
+    def recent_logs(self, user: str, limit: int) -> list[DailyLog]:
+        return sorted(self._logs, key=lambda log: log.date)[-limit:]
+
     def save_dashboard(self, dashboard) -> None:
         self.dashboard_state = dashboard
 
@@ -186,3 +195,362 @@ async def test_orchestrator_refreshes_dashboard(base_profile: UserProfile, basel
     assert dashboard.user == base_profile.name
     assert realtime.events[-1]["event"] == "dashboard.updated"
     assert repo.dashboard_state is not None
+
+
+class _CountingRepo(_MemoryRepo):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.plan_reads = 0
+        self.dashboard_writes = 0
+
+    def latest_plan(self, user: str) -> NutritionPlan | None:
+        self.plan_reads += 1
+        return super().latest_plan(user)
+
+    def save_dashboard(self, dashboard) -> None:
+        self.dashboard_writes += 1
+        super().save_dashboard(dashboard)
+
+
+@pytest.mark.anyio
+async def test_concurrent_refreshes_share_one_pipeline_run(
+    base_profile: UserProfile, baseline_log: DailyLog
+) -> None:
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(base_profile)}))["plan"])
+    repo = _CountingRepo(plan, base_profile, [baseline_log])
+    orchestrator = Orchestrator(
+        configure_logging(), repository=repo, realtime=_StubRealtime(), event_bus=AsyncEventBus()
+    )
+
+    boards = await asyncio.gather(
+        *[orchestrator.refresh_dashboard(base_profile.name) for _ in range(5)]
+    )
+
+    assert all(board is boards[0] for board in boards)
+    assert repo.plan_reads == 1
+    assert repo.dashboard_writes == 1
+    assert orchestrator.dashboard_flights.coalesced == 4
+    assert orchestrator.dashboard_flights.in_flight((base_profile.name, 0)) == 0
+
+
+@pytest.mark.anyio
+async def test_coalesced_refreshes_all_receive_pipeline_error(base_profile: UserProfile) -> None:
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(base_profile)}))["plan"])
+    repo = _CountingRepo(plan, base_profile, [])
+    orchestrator = Orchestrator(
+        configure_logging(), repository=repo, realtime=_StubRealtime(), event_bus=AsyncEventBus()
+    )
+
+    results = await asyncio.gather(
+        *[orchestrator.refresh_dashboard("unknown-user") for _ in range(3)],
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert repo.plan_reads == 1
+
+
+class _GatedRepo(_CountingRepo):
+    """Holds the first plan read until ``gate`` is set."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.gate = threading.Event()
+
+    def latest_plan(self, user: str) -> NutritionPlan | None:
+        if self.plan_reads == 0:
+            self.plan_reads += 1
+            self.gate.wait(5)
+            return _MemoryRepo.latest_plan(self, user)
+        return super().latest_plan(user)
+
+
+@pytest.mark.anyio
+async def test_read_after_a_write_does_not_join_or_cache_an_older_rebuild(
+    base_profile: UserProfile, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(base_profile)}))["plan"])
+    repo = _GatedRepo(plan, base_profile, [])
+    orchestrator = Orchestrator(
+        configure_logging(),
+        repository=repo,
+        realtime=_StubRealtime(),
+        event_bus=AsyncEventBus(),
+        cache=RedisDashboardCache(client=_KeyValueRedis()),
+        lease_wait_seconds=0.05,
+    )
+
+    async def no_pipeline(user: str, trace_id: str) -> None:
+        return None
+
+    monkeypatch.setattr(orchestrator, "_trigger_pipeline", no_pipeline)
+    name = base_profile.name
+    before_write = asyncio.create_task(orchestrator.refresh_dashboard(name))
+    while repo.plan_reads == 0:
+        await asyncio.sleep(0.01)
+
+    await orchestrator.ingest_diary(name, ["jantar: 200g arroz integral"])
+    after_write = await orchestrator.refresh_dashboard(name)
+    repo.gate.set()
+    stale = await before_write
+
+    assert orchestrator.dashboard_version(name) == 1
+    assert orchestrator.dashboard_flights.coalesced == 0
+    assert stale != after_write
+    # the rebuild that started before the write finished last but did not replace the cache
+    assert orchestrator.cache.get_cached(name).dashboard == after_write
+
+
+class _KeyValueRedis:
+    def __init__(self) -> None:
+        self.store: dict[str, bytes] = {}
+
+    def get(self, key: str):
+        return self.store.get(key)
+
+    def set(self, key: str, value, ex=None, px=None, nx: bool = False, keepttl: bool = False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    def delete(self, key: str):
+        self.store.pop(key, None)
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def pipeline(self, transaction: bool = True):
+        return _KeyValuePipeline(self)
+
+
+class _KeyValuePipeline:
+    """WATCH/MULTI over ``_KeyValueRedis``; nothing else writes, so it never conflicts."""
+
+    def __init__(self, redis: _KeyValueRedis) -> None:
+        self.redis = redis
+        self.queued: list = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        self.queued = []
+
+    def watch(self, *keys: str) -> None:
+        return None
+
+    def mget(self, keys):
+        return self.redis.mget(keys)
+
+    def multi(self) -> None:
+        return None
+
+    def set(self, *args, **kwargs) -> None:
+        self.queued.append(partial(self.redis.set, *args, **kwargs))
+
+    def delete(self, key: str) -> None:
+        self.queued.append(partial(self.redis.delete, key))
+
+    def execute(self):
+        return [command() for command in self.queued]
+
+
+@pytest.mark.anyio
+async def test_stale_dashboard_is_served_while_one_background_rebuild_runs(
+    base_profile: UserProfile, baseline_log: DailyLog
+) -> None:
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(base_profile)}))["plan"])
+    repo = _CountingRepo(plan, base_profile, [baseline_log])
+    orchestrator = Orchestrator(
+        configure_logging(),
+        repository=repo,
+        realtime=_StubRealtime(),
+        event_bus=AsyncEventBus(),
+        cache=RedisDashboardCache(client=_KeyValueRedis(), soft_ttl_seconds=60),
+    )
+    board = await orchestrator.refresh_dashboard(base_profile.name)
+    orchestrator.cache.invalidate(base_profile.name)
+
+    reads = await asyncio.gather(
+        *[orchestrator.read_dashboard(base_profile.name) for _ in range(5)]
+    )
+
+    assert all(read.stale and read.dashboard == board for read in reads)
+    assert repo.dashboard_writes == 1
+    for _ in range(100):
+        if not orchestrator.dashboard_flights.in_flight((base_profile.name, 0)) and (
+            repo.dashboard_writes == 2
+        ):
+            break
+        await asyncio.sleep(0.01)
+    assert repo.dashboard_writes == 2
+    assert repo.plan_reads == 2
+    fresh = await orchestrator.read_dashboard(base_profile.name)
+    assert not fresh.stale
+    assert fresh.stored_at > reads[0].stored_at
+
+
+@pytest.mark.anyio
+async def test_refresh_lease_lets_one_process_rebuild_an_expired_dashboard(
+    base_profile: UserProfile, baseline_log: DailyLog
+) -> None:
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(base_profile)}))["plan"])
+    repo = _CountingRepo(plan, base_profile, [baseline_log])
+    redis = _KeyValueRedis()
+    # two API processes: separate single-flights, one shared Redis
+    processes = [
+        Orchestrator(
+            configure_logging(),
+            repository=repo,
+            realtime=_StubRealtime(),
+            event_bus=AsyncEventBus(),
+            cache=RedisDashboardCache(client=redis),
+        )
+        for _ in range(2)
+    ]
+
+    boards = await asyncio.gather(
+        *[process.refresh_dashboard(base_profile.name) for process in processes for _ in range(3)]
+    )
+
+    assert repo.dashboard_writes == 1
+    assert all(board == boards[0] for board in boards)
+    assert not [key for key in redis.store if key.startswith("lease:")]
+
+    # a holder that never releases: the others give up waiting and rebuild themselves
+    processes[0].cache.invalidate(base_profile.name)
+    assert processes[0].cache.acquire_refresh(base_profile.name) is not None
+    processes[1].lease_wait_seconds = 0.05
+    await processes[1].refresh_dashboard(base_profile.name)
+    assert repo.dashboard_writes == 2
+
+
+class _PollRecordingCache(RedisDashboardCache):
+    def __init__(self, client: Any) -> None:
+        super().__init__(client=client)
+        self.polls: list[tuple[float, int]] = []
+
+    def get_cached(self, user: str) -> Any:
+        self.polls.append((time.monotonic(), threading.get_ident()))
+        return super().get_cached(user)
+
+
+@pytest.mark.anyio
+async def test_lease_waiters_poll_off_the_loop_and_back_off(
+    base_profile: UserProfile, baseline_log: DailyLog
+) -> None:
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(base_profile)}))["plan"])
+    cache = _PollRecordingCache(_KeyValueRedis())
+    orchestrator = Orchestrator(
+        configure_logging(),
+        repository=_MemoryRepo(plan, base_profile, [baseline_log]),
+        realtime=_StubRealtime(),
+        event_bus=AsyncEventBus(),
+        cache=cache,
+        lease_wait_seconds=0.6,
+    )
+    # another process holds the lease and never writes
+    assert cache.acquire_refresh(base_profile.name) is not None
+
+    assert await orchestrator._await_refresh(base_profile.name) is None
+
+    assert cache.polls
+    assert threading.get_ident() not in {thread for _, thread in cache.polls}
+    gaps = [later - earlier for (earlier, _), (later, _) in zip(cache.polls, cache.polls[1:])]
+    # 50 ms doubling up to 250 ms, each jittered by +/-50%; a fixed 50 ms poll would take ~12
+    assert len(cache.polls) <= 7
+    assert max(gaps) > 0.09
+
+
+@pytest.mark.anyio
+async def test_unchanged_stage_inputs_are_served_from_stage_cache(
+    base_profile: UserProfile, baseline_log: DailyLog
+) -> None:
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(base_profile)}))["plan"])
+    repo = _MemoryRepo(plan, base_profile, [baseline_log])
+    orchestrator = Orchestrator(
+        configure_logging(), repository=repo, realtime=_StubRealtime(), event_bus=AsyncEventBus()
+    )
+
+    await orchestrator.refresh_dashboard(base_profile.name)
+    await orchestrator.refresh_dashboard(base_profile.name)
+    assert {stage: stats["hits"] for stage, stats in orchestrator.stage_cache.stats().items()} == {
+        "calc": 1,
+        "trends": 1,
+        "coach": 1,
+    }
+
+    repo.append_log(
+        DailyLog(
+            user=base_profile.name,
+            date=datetime(2024, 6, 2),
+            meals=[
+                MealEntry(
+                    timestamp=datetime(2024, 6, 2, 8, 0),
+                    description="Café",
+                    items=[FoodPortion(label="oat", quantity=60, unit="g")],
+                )
+            ],
+        )
+    )
+    await orchestrator.refresh_dashboard(base_profile.name)
+    stats = orchestrator.stage_cache.stats()
+    assert stats["calc"]["misses"] == 2
+    assert stats["trends"]["misses"] == 2
+
+
+@pytest.mark.anyio
+async def test_typed_agent_contracts_match_json_payloads(
+    base_profile: UserProfile, baseline_log: DailyLog
+) -> None:
+    planned = await PlannerAgent()({"profile": profile_to_json(base_profile)})
+    plan = plan_from_json(planned["plan"])
+    calc = CalcAgent()
+
+    typed = calc.calculate(plan, baseline_log, base_profile)
+    payload = await calc(
+        {"plan": plan_to_json(plan), "log": log_to_json(baseline_log), "profile": profile_to_json(base_profile)}
+    )
+
+    assert macro_to_json(typed.macros) == payload["macros"]
+    assert micro_to_json(typed.micros) == payload["micros"]
+    assert typed.alerts == payload["alerts"]
+    assert typed.hydration_l == payload["hydration_l"]
+
+
+@pytest.mark.anyio
+async def test_trends_and_calc_read_whole_day_rollups(base_profile: UserProfile) -> None:
+    def log(day: int, hour: int, label: str, grams: float) -> DailyLog:
+        when = datetime(2024, 6, day, hour)
+        return DailyLog(
+            user=base_profile.name,
+            date=when,
+            meals=[
+                MealEntry(timestamp=when, description="m", items=[FoodPortion(label, grams, "g")])
+            ],
+        )
+
+    logs = [
+        log(1, 8, "oat", 80),
+        log(1, 13, "grilled chicken breast", 150),
+        log(2, 13, "brown rice", 180),
+    ]
+    days = summarize_logs(logs)
+
+    # trends are estimated kcal per day, no longer the per-log quantity × 2 proxy
+    assert [(t.pattern, t.signal) for t in TrendAgent().analyze(logs)] == [
+        ("Calorias médias", "273 kcal"),
+        ("Variação", "+87 kcal"),
+    ]
+    assert [(t.pattern, t.signal) for t in TrendAgent().analyze_days(days)] == [
+        ("Calorias médias", "814 kcal"),
+        ("Variação", "-112 kcal"),
+    ]
+
+    # calc reports everything eaten that day, not only the latest log
+    planned = await PlannerAgent()({"profile": profile_to_json(base_profile)})
+    plan = plan_from_json(planned["plan"])
+    calc = CalcAgent()
+    assert calc.calculate(plan, logs[1], base_profile).macros.calories == 615.0
+    assert calc.calculate(plan, logs[1], base_profile, day=days[0]).macros.calories == 927.0
@@ -153,3 +153,396 @@ async def test_repository_handles_concurrent_appends(reset_state) -> None:
     logs = repo.logs(profile.name)
     assert len(logs) == 3
     assert sorted(log.date for log in logs)[0].day == 1
+
+
+def _diary(user: str, day: int) -> DailyLog:
+    return DailyLog(
+        user=user,
+        date=datetime(2024, 6, day),
+        meals=[
+            MealEntry(
+                timestamp=datetime(2024, 6, day, 12, 0),
+                description=f"meal-{day}",
+                items=[FoodPortion(label="rice", quantity=100 + day, unit="g")],
+            )
+        ],
+    )
+
+
+@pytest.mark.parametrize("backend", ["postgres", "memory"])
+def test_repository_windowed_and_paginated_log_reads(backend: str, reset_state) -> None:
+    from src.database.memory import MemoryRepository
+
+    repo = postgres.get_repository() if backend == "postgres" else MemoryRepository()
+    repo.reset()
+    for day in (3, 1, 5, 2, 4):
+        repo.append_log(_diary("window-user", day))
+    repo.append_log(_diary("other-user", 6))
+
+    assert [log.date.day for log in repo.recent_logs("window-user", 2)] == [4, 5]
+    assert [log.date.day for log in repo.logs_since("window-user", datetime(2024, 6, 4))] == [4, 5]
+
+    first = repo.logs_page("window-user", limit=3)
+    assert [log.date.day for log in first.items] == [1, 2, 3]
+    second = repo.logs_page("window-user", after=first.next_cursor, limit=3)
+    assert [log.date.day for log in second.items] == [4, 5]
+    assert second.next_cursor is None
+
+
+@pytest.mark.anyio
+async def test_async_repository_round_trip_and_concurrent_appends(reset_state) -> None:
+    from src.database.async_repository import AsyncPostgresRepository, as_async_repository
+
+    profile = UserProfile(
+        name="async-user",
+        age=41,
+        weight_kg=80,
+        height_cm=182,
+        sex="male",
+        activity_level="moderate",
+        goal="cut",
+        systolic_bp=121,
+        diastolic_bp=79,
+        sodium_mg=1700,
+    )
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(profile)}))["plan"])
+    repo = AsyncPostgresRepository()
+
+    await repo.upsert_profile(profile)
+    await repo.save_plan(plan)
+    await asyncio.gather(*[repo.append_log(_diary(profile.name, day)) for day in range(1, 6)])
+
+    assert await repo.get_profile(profile.name) == profile
+    assert (await repo.latest_plan(profile.name)).user == profile.name
+    assert [log.date.day for log in await repo.recent_logs(profile.name, 3)] == [3, 4, 5]
+    assert as_async_repository(repo) is repo
+
+    # the sync repository reads what the async one wrote
+    assert len(postgres.get_repository().logs(profile.name)) == 5
+    await repo.reset()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("backend", ["sync", "async"])
+async def test_dashboard_refresh_uses_one_connection_and_two_transactions(
+    backend: str, reset_state
+) -> None:
+    import logging
+
+    from sqlalchemy import event
+
+    from src.core.orchestrator import Orchestrator
+    from src.database.async_repository import AsyncPostgresRepository
+
+    if backend == "sync":
+        repo = postgres.get_repository()
+        engine = postgres._get_engine()
+    else:
+        repo = AsyncPostgresRepository()
+        engine = repo._engine.sync_engine
+    orchestrator = Orchestrator(logging.getLogger("uow-test"), repository=repo)
+    profile = UserProfile(
+        name="uow-user",
+        age=30,
+        weight_kg=65,
+        height_cm=170,
+        sex="female",
+        activity_level="light",
+        goal="maintain",
+        systolic_bp=115,
+        diastolic_bp=75,
+        sodium_mg=1500,
+    )
+    await orchestrator.build_plan(profile)
+    await orchestrator.repository.append_log(_diary(profile.name, 1))
+
+    checkouts: list[object] = []
+    transactions: list[object] = []
+    event.listen(engine, "checkout", lambda *args: checkouts.append(args))
+    event.listen(engine, "begin", lambda conn: transactions.append(conn))
+    board = await orchestrator.refresh_dashboard(profile.name, trace_id="trace-uow")
+
+    assert len(checkouts) == 1
+    assert len(transactions) == 2
+    stored = await orchestrator.repository.dashboard(profile.name)
+    assert stored is not None and stored.user == board.user
+
+
+def test_unit_of_work_discards_queued_writes_on_error(reset_state) -> None:
+    repo = postgres.get_repository()
+    with pytest.raises(RuntimeError), repo.unit_of_work() as work:
+        work.append_log(_diary("uow-rollback", 1))
+        raise RuntimeError("boom")
+    assert repo.logs("uow-rollback") == []
+
+    with repo.unit_of_work() as work:
+        work.append_log(_diary("uow-rollback", 2))
+        assert work.snapshot("uow-rollback", 5).logs == []
+    assert [log.date.day for log in repo.logs("uow-rollback")] == [2]
+
+
+@pytest.mark.anyio
+async def test_plan_versions_guard_dashboard_writes(reset_state) -> None:
+    import logging
+
+    from src.core.orchestrator import Orchestrator
+    from src.database.operations import StalePlanError
+
+    repo = postgres.get_repository()
+    orchestrator = Orchestrator(logging.getLogger("plan-version-test"), repository=repo)
+    profile = UserProfile(
+        name="versioned-user",
+        age=52,
+        weight_kg=90,
+        height_cm=178,
+        sex="male",
+        activity_level="sedentary",
+        goal="cut",
+        systolic_bp=128,
+        diastolic_bp=82,
+        sodium_mg=2000,
+    )
+    plan, _ = await orchestrator.build_plan(profile)
+
+    # a newer plan saved while the first pipeline run is in progress forces one rebuild
+    original_run = orchestrator.pipeline.run
+    runs: list[str] = []
+
+    async def run_with_concurrent_plan(state, trace_id, stages=None):
+        runs.append(trace_id)
+        if len(runs) == 1:
+            repo.save_plan(plan)
+        return await original_run(state, trace_id, stages)
+
+    orchestrator.pipeline.run = run_with_concurrent_plan
+    board = await orchestrator.refresh_dashboard(profile.name, trace_id="trace-version")
+    assert len(runs) == 2
+    assert repo.dashboard(profile.name) is not None
+
+    with repo.unit_of_work() as work:
+        assert work.snapshot(profile.name, 5).plan_version == 2
+        repo.save_plan(plan)
+        work.save_dashboard(board)
+        with pytest.raises(StalePlanError):
+            work.commit()
+    with repo.unit_of_work() as work:
+        assert work.snapshot(profile.name, 5).plan_version == 3
+
+
+@pytest.mark.anyio
+async def test_repository_cache_reuses_decoded_rows_until_their_version_changes(
+    reset_state,
+) -> None:
+    from dataclasses import replace
+
+    from src.database.async_repository import AsyncPostgresRepository
+    from src.database.caching import RepositoryCache
+
+    # writer and readers stand for separate processes: they share only the database
+    writer = postgres.get_repository()
+    writer.reset()
+    reader = postgres.PostgresRepository(cache=RepositoryCache(max_entries=1))
+    async_reader = AsyncPostgresRepository(cache=RepositoryCache(max_entries=8))
+    profile = UserProfile(
+        name="cached-user",
+        age=41,
+        weight_kg=70,
+        height_cm=170,
+        sex="female",
+        activity_level="moderate",
+        goal="maintain",
+        systolic_bp=118,
+        diastolic_bp=76,
+        sodium_mg=1800,
+    )
+    writer.upsert_profile(profile)
+    planned = await PlannerAgent()({"profile": profile_to_json(profile)})
+    writer.save_plan(plan_from_json(planned["plan"]))
+
+    plan = reader.latest_plan(profile.name)
+    assert reader.latest_plan(profile.name) is plan
+    assert reader.get_profile(profile.name) is reader.get_profile(profile.name)
+    with reader.unit_of_work() as work:
+        snapshot = work.snapshot(profile.name, 5)
+    # the SQL unit of work still reports the plan version for the StalePlanError guard
+    assert snapshot.plan is plan and snapshot.plan_version == 1
+    assert reader.cache.stats()["plan"]["hits"] == 2
+    assert reader.cache.stats()["plan"]["hit_ratio"] == 2 / 3
+
+    # writes from another process bump the row versions; the next read decodes them again
+    writer.save_plan(replace(plan, hydration=replace(plan.hydration, total_liters=3.5)))
+    assert reader.latest_plan(profile.name).hydration.total_liters == 3.5
+    writer.upsert_profile(replace(profile, weight_kg=68))
+    assert reader.get_profile(profile.name).weight_kg == 68
+
+    # batched snapshots on the native async backend use the same cache
+    users = [profile.name, "missing-user"]
+    async with async_reader.unit_of_work() as work:
+        first = await work.snapshots(users, 5)
+    async with async_reader.unit_of_work() as work:
+        second = await work.snapshots(users, 5)
+    assert second[profile.name].plan is first[profile.name].plan
+    assert second[profile.name].plan_version == 2
+    assert second["missing-user"].plan is None and second["missing-user"].profile is None
+    assert async_reader.cache.stats()["plan"]["hits"] == 1
+    assert async_reader.cache.stats()["profile"]["hits"] == 1
+
+    # bounded: a second user pushes the first one out
+    writer.upsert_profile(replace(profile, name="other-user"))
+    reader.get_profile("other-user")
+    assert len(reader.cache) == 2 and reader.cache.stats()["profile"]["evictions"] == 1
+
+
+@pytest.mark.parametrize("backend", ["postgres", "memory"])
+def test_append_log_maintains_daily_rollups(backend: str, reset_state) -> None:
+    from src.agents.calc import summarize_logs
+    from src.database.memory import MemoryRepository
+
+    repo = postgres.get_repository() if backend == "postgres" else MemoryRepository()
+    repo.reset()
+    morning = _diary("rollup-user", 3)
+    evening = DailyLog(
+        user="rollup-user",
+        date=datetime(2024, 6, 3, 20, 0),
+        meals=[
+            MealEntry(
+                timestamp=datetime(2024, 6, 3, 20, 0),
+                description="dinner",
+                items=[
+                    FoodPortion(label="grilled chicken", quantity=150, unit="g"),
+                    FoodPortion(label="water", quantity=400, unit="ml"),
+                ],
+            )
+        ],
+    )
+    logs = [_diary("rollup-user", 1), morning, evening, _diary("rollup-user", 4)]
+    for log in logs:
+        repo.append_log(log)
+
+    days = repo.recent_summaries("rollup-user", 2)
+    assert [(day.date.day, day.log_count) for day in days] == [(3, 2), (4, 1)]
+    assert days == summarize_logs(logs)[-2:]
+    assert repo.recent_summaries("other-user", 5) == []
+
+    with repo.unit_of_work() as work:
+        assert [day.date.day for day in work.snapshot("rollup-user", 10).days] == [1, 3, 4]
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("backend", ["postgres", "memory"])
+async def test_batched_snapshots_match_per_user_snapshots(backend: str, reset_state) -> None:
+    from dataclasses import replace
+
+    from src.database.memory import MemoryRepository
+
+    repo = postgres.get_repository() if backend == "postgres" else MemoryRepository()
+    repo.reset()
+    profile = UserProfile(
+        name="batch-template",
+        age=35,
+        weight_kg=72,
+        height_cm=175,
+        sex="female",
+        activity_level="moderate",
+        goal="maintain",
+        systolic_bp=118,
+        diastolic_bp=76,
+        sodium_mg=1600,
+    )
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(profile)}))["plan"])
+    users = ["batch-a", "batch-b", "batch-c"]
+    for idx, user in enumerate(users[:2]):
+        repo.upsert_profile(replace(profile, name=user))
+        for _ in range(idx + 1):
+            repo.save_plan(replace(plan, user=user))
+        for day in range(1, 6):
+            repo.append_log(_diary(user, day))
+
+    with repo.unit_of_work() as work:
+        batched = work.snapshots([*users, "batch-a"], 3)
+        single = {user: work.snapshot(user, 3) for user in users}
+
+    assert list(batched) == users
+    assert batched == single
+    if backend == "postgres":
+        assert [batched[user].plan_version for user in users] == [1, 2, None]
+    assert [log.date.day for log in batched["batch-b"].logs] == [3, 4, 5]
+    assert batched["batch-c"].profile is None and batched["batch-c"].logs == []
+
+
+@pytest.mark.anyio
+async def test_dashboard_route_serves_cached_bytes_without_reencoding(
+    monkeypatch: pytest.MonkeyPatch, reset_state
+) -> None:
+    import logging
+
+    from src.api import router as router_module
+    from src.api.schemas import DashboardResponse, Envelope, ResponseMeta
+    from src.core.cache import RedisDashboardCache
+    from src.core.orchestrator import Orchestrator
+    from src.core.serialization import dashboard_from_json, dashboard_to_json
+
+    store: dict[str, bytes] = {}
+
+    class FakeRedis:
+        def get(self, key: str):
+            return store.get(key)
+
+        def set(self, key: str, value, ex=None, px=None, nx: bool = False):
+            if nx and key in store:
+                return None
+            store[key] = value
+            return True
+
+        def delete(self, key: str):
+            store.pop(key, None)
+
+    orchestrator = Orchestrator(
+        logging.getLogger("bytes-test"), cache=RedisDashboardCache(client=FakeRedis())
+    )
+    monkeypatch.setattr(router_module, "orchestrator", orchestrator)
+    profile = UserProfile(
+        name="bytes-user",
+        age=41,
+        weight_kg=64,
+        height_cm=166,
+        sex="female",
+        activity_level="light",
+        goal="maintain",
+        systolic_bp=118,
+        diastolic_bp=78,
+        sodium_mg=1500,
+    )
+    await orchestrator.build_plan(profile)
+    board = await orchestrator.refresh_dashboard(profile.name)
+    request = Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/api/v1/dashboard/bytes-user",
+            "headers": [(b"x-trace-id", b"trace-bytes")],
+            "query_string": b"",
+            "client": ("test", 1234),
+            "server": ("testserver", 80),
+            "scheme": "http",
+        }
+    )
+    auth = AuthContext(
+        subject=profile.name, scopes=["dashboard:read"], issued_at=datetime.now(timezone.utc)
+    )
+
+    response = await dashboard(profile.name, request, auth)
+
+    assert response.media_type == "application/json"
+    document = json.loads(response.body)
+    assert 0 <= document["data"]["age_seconds"] < 60
+    expected = Envelope[DashboardResponse](
+        data=DashboardResponse(
+            dashboard=dashboard_to_json(board),
+            stale=False,
+            age_seconds=document["data"]["age_seconds"],
+        ),
+        meta=ResponseMeta(trace_id="trace-bytes", actor=profile.name),
+    )
+    assert document == expected.model_dump(mode="json")
+    assert dashboard_from_json(json.loads(response.body)["data"]["dashboard"]) == board
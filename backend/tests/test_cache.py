@@ -1,11 +1,23 @@
 from datetime import datetime
+import json
 import logging
+import queue
+import time
 
+import pytest
+from redis import WatchError
+
+from core.breaker import CircuitBreaker
 from core.cache import (
+    GuardedDashboardCache,
+    LocalDashboardCache,
     NoopDashboardCache,
     RedisDashboardCache,
+    TieredDashboardCache,
     init_dashboard_cache,
 )
+from core.codecs import CacheCodec, CodecUnavailableError
+from core.constants import PAYLOAD_VERSION
 from core.serialization import dashboard_from_json, dashboard_to_json
 from domain.entities import (
     CoachingMessage,
@@ -73,13 +85,11 @@ def test_redis_cache_round_trip(monkeypatch):
 
     monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
     monkeypatch.setenv("CACHE_TTL_SECONDS", "120")
-    monkeypatch.setattr(
-        "core.cache.Redis",
-        type("RedisWrapper", (object,), {"from_url": staticmethod(lambda *_args, **_kwargs: FakeRedis())}),
-    )
+    monkeypatch.setattr("core.cache.Redis", lambda connection_pool: FakeRedis())
 
     cache = init_dashboard_cache(logging.getLogger("test"))
-    assert isinstance(cache, RedisDashboardCache)
+    assert isinstance(cache, GuardedDashboardCache)
+    assert isinstance(cache.remote, RedisDashboardCache) and cache.remote.ttl_seconds == 120
 
     dashboard = _sample_dashboard("cache-user")
     cache.set_dashboard("cache-user", dashboard)
@@ -93,3 +103,420 @@ def test_redis_cache_round_trip(monkeypatch):
     # ensure JSON helpers round-trip complex payloads
     encoded = dashboard_to_json(dashboard)
     assert dashboard_from_json(encoded) == dashboard
+
+
+class LocalRedis:
+    """In-process stand-in for the Redis commands and pub/sub the dashboard cache uses."""
+
+    def __init__(self) -> None:
+        self.store: dict[str, bytes] = {}
+        self.expires: dict[str, float] = {}
+        self.gets = 0
+        self.pipelines = 0
+        self.subscribers: list[tuple[str, queue.Queue]] = []
+
+    def get(self, key: str):
+        self.gets += 1
+        self._expire(key)
+        return self.store.get(key)
+
+    def set(self, key: str, value, ex=None, px=None, nx: bool = False, keepttl: bool = False):
+        self._expire(key)
+        if nx and key in self.store:
+            return None
+        self.store[key] = value if isinstance(value, bytes) else value.encode()
+        if px is not None:
+            self.expires[key] = time.monotonic() + px / 1000
+        elif not keepttl:
+            self.expires.pop(key, None)
+        return True
+
+    def mget(self, keys):
+        return [self.get(key) for key in keys]
+
+    def delete(self, *keys: str):
+        for key in keys:
+            self.store.pop(key, None)
+            self.expires.pop(key, None)
+
+    def pipeline(self, transaction: bool = True):
+        redis = self
+
+        class Pipeline:
+            def __init__(self) -> None:
+                self.queued: list = []
+                self.watched: dict[str, bytes | None] | None = None
+                self.immediate = False
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *_exc) -> None:
+                self.queued, self.watched, self.immediate = [], None, False
+
+            def watch(self, *keys: str) -> None:
+                self.watched = {key: redis.store.get(key) for key in keys}
+                self.immediate = True
+
+            def multi(self) -> None:
+                self.immediate = False
+
+            def __getattr__(self, name: str):
+                if self.immediate:
+                    return getattr(redis, name)
+                return lambda *args, **kwargs: self.queued.append((name, args, kwargs))
+
+            def execute(self):
+                redis.pipelines += 1
+                queued, self.queued = self.queued, []
+                if self.watched is not None and any(
+                    redis.store.get(key) is not value for key, value in self.watched.items()
+                ):
+                    raise WatchError("Watched variable changed.")
+                return [getattr(redis, name)(*args, **kwargs) for name, args, kwargs in queued]
+
+        return Pipeline()
+
+    def _expire(self, key: str) -> None:
+        if self.expires.get(key, float("inf")) <= time.monotonic():
+            self.delete(key)
+
+    def publish(self, channel: str, message: str) -> int:
+        targets = [inbox for subscribed, inbox in self.subscribers if subscribed == channel]
+        for inbox in targets:
+            inbox.put({"type": "message", "channel": channel, "data": message.encode()})
+        return len(targets)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False):
+        redis = self
+
+        class PubSub:
+            def __init__(self) -> None:
+                self.inbox: queue.Queue = queue.Queue()
+
+            def subscribe(self, channel: str) -> None:
+                redis.subscribers.append((channel, self.inbox))
+
+            def get_message(self, timeout: float = 0.0):
+                try:
+                    return self.inbox.get(timeout=timeout)
+                except queue.Empty:
+                    return None
+
+            def close(self) -> None:
+                redis.subscribers = [entry for entry in redis.subscribers if entry[1] is not self.inbox]
+
+        return PubSub()
+
+
+def _wait_until(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+
+def test_tiered_cache_serves_hot_users_from_memory_and_invalidates_across_workers(monkeypatch):
+    redis = LocalRedis()
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("CACHE_LOCAL_MAX_ENTRIES", "2")
+    monkeypatch.setattr("core.cache.Redis", lambda connection_pool: redis)
+    api = init_dashboard_cache(logging.getLogger("test"))
+    worker = init_dashboard_cache(logging.getLogger("test"))
+    assert isinstance(api, TieredDashboardCache) and isinstance(worker, TieredDashboardCache)
+    try:
+        dashboard = _sample_dashboard("hot-user")
+        worker.set_dashboard("hot-user", dashboard)
+        assert api.get_dashboard("hot-user") == dashboard
+        gets = redis.gets
+        assert api.get_dashboard("hot-user") is api.get_dashboard("hot-user")
+        assert redis.gets == gets
+        assert api.stats()["local"]["hits"] == 2
+        assert api.stats()["redis"]["hits"] == 1
+
+        # a write in one process drops the other processes' local copies
+        worker.invalidate("hot-user")
+        _wait_until(lambda: len(api) == 0)
+        assert api.get_dashboard("hot-user") is None
+        assert api.stats()["redis"]["misses"] == 1
+
+        for user in ("a", "b", "c"):
+            api.set_dashboard(user, _sample_dashboard(user))
+        assert len(api) == 2
+        assert api.stats()["local"]["evictions"] >= 2
+    finally:
+        api.close()
+        worker.close()
+
+
+def test_soft_ttl_keeps_invalidated_dashboards_as_stale_copies(monkeypatch):
+    redis = LocalRedis()
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("CACHE_SOFT_TTL_SECONDS", "30")
+    monkeypatch.setenv("CACHE_HARD_TTL_SECONDS", "600")
+    monkeypatch.setattr("core.cache.Redis", lambda connection_pool: redis)
+    monkeypatch.setenv("CACHE_BREAKER_FAILURES", "0")
+    cache = init_dashboard_cache(logging.getLogger("test"))
+    assert isinstance(cache, RedisDashboardCache)
+    assert (cache.ttl_seconds, cache.soft_ttl_seconds) == (600, 30.0)
+
+    dashboard = _sample_dashboard("swr-user")
+    cache.set_dashboard("swr-user", dashboard)
+    fresh = cache.get_cached("swr-user")
+    assert fresh is not None and not fresh.stale and fresh.dashboard == dashboard
+
+    cache.invalidate("swr-user")
+    assert cache.get_dashboard("swr-user") is None
+    stale = cache.get_cached("swr-user", body=True)
+    assert stale is not None and stale.stale and stale.stored_at == fresh.stored_at
+    assert dashboard_from_json(json.loads(stale.body)) == dashboard
+
+    # past the soft TTL an entry reads as stale even without an invalidation
+    cache.set_dashboard("swr-user", dashboard)
+    rewritten = cache.get_cached("swr-user")
+    assert not rewritten.stale
+    monkeypatch.setattr("core.cache.time.time", lambda: rewritten.stored_at + 31)
+    assert cache.get_cached("swr-user").stale
+
+    monkeypatch.setenv("CACHE_SOFT_TTL_SECONDS", "900")
+    with pytest.raises(ValueError):
+        init_dashboard_cache(logging.getLogger("test"))
+
+
+def test_invalidate_leaves_a_dashboard_written_concurrently_alone():
+    class RacingRedis(LocalRedis):
+        """Runs ``race`` right after the invalidation read its entries."""
+
+        race = None
+
+        def mget(self, keys):
+            blobs = super().mget(keys)
+            race, self.race = self.race, None
+            if race is not None:
+                race()
+            return blobs
+
+    redis = RacingRedis()
+    cache = RedisDashboardCache(client=redis, soft_ttl_seconds=30)
+    peer = RedisDashboardCache(client=redis, soft_ttl_seconds=30)
+    old = _sample_dashboard("race-user")
+    fresh = _sample_dashboard("race-user")
+    fresh.today.insights = ["Beba mais água"]
+    for user in ("race-user", "other-user"):
+        cache.set_dashboard(user, old)
+
+    # another process stores a rebuilt dashboard between the read and the rewrite
+    redis.race = lambda: peer.set_dashboard("race-user", fresh)
+    cache.invalidate("race-user")
+    cached = cache.get_cached("race-user")
+    assert not cached.stale and cached.dashboard == fresh
+
+    # in a batch only the rewritten user is skipped; the others are still flagged
+    redis.race = lambda: peer.set_dashboard("race-user", fresh)
+    cache.invalidate_many(["race-user", "other-user"])
+    found = cache.get_many(["race-user", "other-user"])
+    assert not found["race-user"].stale and found["other-user"].stale
+
+
+def test_batch_api_reads_writes_and_invalidates_many_users_in_one_round_trip(monkeypatch):
+    redis = LocalRedis()
+    remote = RedisDashboardCache(client=redis, soft_ttl_seconds=30)
+    cache = TieredDashboardCache(remote=remote, client=redis, max_entries=8)
+    try:
+        users = ["u1", "u2", "u3"]
+        dashboards = {user: _sample_dashboard(user) for user in users}
+        cache.set_many(dashboards)
+        assert redis.pipelines == 2  # SETs and invalidation publishes
+        assert sorted(redis.store) == ["dashboard:u1", "dashboard:u2", "dashboard:u3"]
+
+        reader = RedisDashboardCache(client=redis)
+        found = reader.get_many(users + ["absent"])
+        assert {user: cached.dashboard for user, cached in found.items()} == dashboards
+
+        # local hits are served in memory; only the unknown user reaches Redis
+        gets = redis.gets
+        found = cache.get_many(["u1", "absent"], body=True)
+        assert list(found) == ["u1"] and redis.gets == gets + 1
+        assert dashboard_from_json(json.loads(found["u1"].body)) == dashboards["u1"]
+
+        cache.invalidate_many(["u1", "u2", "absent"])
+        flagged = reader.get_many(users)
+        assert [flagged[user].stale for user in users] == [True, True, False]
+        assert cache.get_many([]) == {} and reader.get_many([]) == {}
+    finally:
+        cache.close()
+
+
+def test_breaker_bypasses_a_failing_or_slow_redis_and_replays_invalidations(monkeypatch):
+    redis = LocalRedis()
+    calls = {"count": 0, "down": False, "delay": 0.0}
+
+    class FlakyRedis:
+        def __getattr__(self, name: str):
+            command = getattr(redis, name)
+
+            def call(*args, **kwargs):
+                calls["count"] += 1
+                if calls["down"]:
+                    raise ConnectionError("redis unavailable")
+                time.sleep(calls["delay"])
+                return command(*args, **kwargs)
+
+            return call
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+    cache = GuardedDashboardCache(
+        remote=RedisDashboardCache(client=FlakyRedis()),
+        fallback=LocalDashboardCache(max_entries=8),
+        breaker=breaker,
+        budget_seconds=0.2,
+    )
+    dashboard = _sample_dashboard("guarded-user")
+    cache.set_dashboard("guarded-user", dashboard)
+
+    calls["down"] = True
+    assert cache.get_dashboard("guarded-user") == dashboard
+    cache.invalidate("guarded-user")
+    assert breaker.state == "open"
+    # while open Redis is not touched at all: reads, leases and writes stay in process
+    before = calls["count"]
+    assert cache.get_dashboard("guarded-user") is None
+    assert cache.acquire_refresh("guarded-user") == "local"
+    cache.release_refresh("guarded-user", "local")
+    assert calls["count"] == before
+    assert cache.stats()["bypassed"] == {"error": 2, "open": 2}
+    assert cache.stats()["pending_invalidations"] == 1
+
+    # the half-open probe replays the skipped invalidation before reading
+    calls["down"] = False
+    assert redis.store.get("dashboard:guarded-user") is not None
+    _wait_until(lambda: cache.get_cached("guarded-user") is None and breaker.state == "closed")
+    assert "dashboard:guarded-user" not in redis.store
+    assert cache.stats()["pending_invalidations"] == 0
+
+    # answers slower than the budget are still served but open the circuit
+    cache.set_dashboard("guarded-user", dashboard)
+    calls["delay"] = 0.25
+    assert cache.get_dashboard("guarded-user") == dashboard
+    assert cache.get_dashboard("guarded-user") == dashboard
+    assert breaker.state == "open"
+    assert breaker.allow() is False
+
+
+def test_latency_budget_bounds_a_write_that_hangs(monkeypatch):
+    import socket
+
+    # the kernel accepts connections to a listening socket that never answers a command
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+    monkeypatch.setenv("REDIS_URL", f"redis://127.0.0.1:{server.getsockname()[1]}/0")
+    monkeypatch.setenv("CACHE_BUDGET_MS", "50")
+    monkeypatch.setenv("CACHE_BREAKER_FAILURES", "2")
+    for name in (
+        "REDIS_POOL_TIMEOUT_SECONDS",
+        "REDIS_SOCKET_TIMEOUT_SECONDS",
+        "REDIS_CONNECT_TIMEOUT_SECONDS",
+        "CACHE_LOCAL_MAX_ENTRIES",
+    ):
+        monkeypatch.delenv(name, raising=False)
+    cache = init_dashboard_cache(logging.getLogger("test"))
+    dashboard = _sample_dashboard("hung-user")
+    try:
+        started = time.perf_counter()
+        cache.set_dashboard("hung-user", dashboard)
+        cache.invalidate("hung-user")
+        elapsed = time.perf_counter() - started
+    finally:
+        server.close()
+
+    # both calls gave up at the budget instead of the 1 s default and opened the circuit
+    assert elapsed < 0.5
+    assert cache.breaker.state == "open"
+    assert cache.stats()["bypassed"] == {"error": 2}
+    assert cache.stats()["pending_invalidations"] == 1
+    # the in-process fallback took the write, then the invalidation
+    assert cache.fallback.get_cached("hung-user") is None
+
+
+def test_peer_writes_drop_local_copies_instead_of_flagging_them_stale(monkeypatch):
+    redis = LocalRedis()
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("CACHE_LOCAL_MAX_ENTRIES", "8")
+    monkeypatch.setenv("CACHE_SOFT_TTL_SECONDS", "30")
+    monkeypatch.setenv("CACHE_HARD_TTL_SECONDS", "600")
+    monkeypatch.setattr("core.cache.Redis", lambda connection_pool: redis)
+    api = init_dashboard_cache(logging.getLogger("test"))
+    worker = init_dashboard_cache(logging.getLogger("test"))
+    try:
+        worker.set_dashboard("peer-user", _sample_dashboard("peer-user"))
+        assert not api.get_cached("peer-user").stale
+        assert len(api) == 1
+
+        # a fresh write elsewhere must not make this process rebuild the dashboard
+        rewritten = _sample_dashboard("peer-user")
+        rewritten.today.insights = ["Beba mais água"]
+        worker.set_dashboard("peer-user", rewritten)
+        _wait_until(lambda: len(api) == 0)
+        cached = api.get_cached("peer-user")
+        assert not cached.stale and cached.dashboard == rewritten
+
+        # an invalidation elsewhere keeps the copy, flagged for a refresh
+        worker.invalidate("peer-user")
+        _wait_until(lambda: api.get_cached("peer-user").stale)
+        assert len(api) == 1
+    finally:
+        api.close()
+        worker.close()
+
+
+def test_refresh_lease_is_exclusive_and_expires_with_a_dead_holder():
+    redis = LocalRedis()
+    api = RedisDashboardCache(client=redis, lease_seconds=0.05)
+    worker = RedisDashboardCache(client=redis, lease_seconds=0.05)
+
+    token = api.acquire_refresh("lease-user")
+    assert token is not None
+    assert worker.acquire_refresh("lease-user") is None
+    # only the holder's token releases the lease
+    worker.release_refresh("lease-user", "not-the-holder")
+    assert worker.acquire_refresh("lease-user") is None
+    api.release_refresh("lease-user", token)
+    assert worker.acquire_refresh("lease-user") is not None
+
+    # the holder dies without releasing: the lease runs out on its own
+    _wait_until(lambda: api.acquire_refresh("lease-user") is not None)
+
+
+def test_codec_header_lets_mixed_fleets_decode_or_skip_entries_safely(monkeypatch):
+    redis = LocalRedis()
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setenv("CACHE_CODEC", "orjson")
+    monkeypatch.setenv("CACHE_COMPRESSION", "zlib")
+    monkeypatch.setenv("CACHE_COMPRESS_MIN_BYTES", "256")
+    monkeypatch.setattr("core.cache.Redis", lambda connection_pool: redis)
+    writer = init_dashboard_cache(logging.getLogger("test")).remote
+    assert writer.codec == CacheCodec("orjson", "zlib", 256)
+    reader = RedisDashboardCache(client=redis)
+
+    dashboard = _sample_dashboard("codec-user")
+    writer.set_dashboard("codec-user", dashboard)
+    plain = len(json.dumps(dashboard_to_json(dashboard)).encode())
+    assert len(redis.store["dashboard:codec-user"]) < plain
+    # the reader writes plain JSON but decodes whatever the header names
+    assert reader.get_dashboard("codec-user") == dashboard
+    body = reader.get_cached("codec-user", body=True).body
+    assert dashboard_from_json(json.loads(body)) == dashboard
+
+    # entries from another payload version are misses, not misreads
+    monkeypatch.setattr("core.cache.PAYLOAD_VERSION", "2099-01-01")
+    assert reader.get_cached("codec-user") is None
+    monkeypatch.setattr("core.cache.PAYLOAD_VERSION", PAYLOAD_VERSION)
+
+    # blobs without the entry header are misses as well
+    redis.store["dashboard:bare"] = json.dumps(dashboard_to_json(dashboard)).encode()
+    assert reader.get_cached("bare") is None
+
+    monkeypatch.setenv("CACHE_CODEC", "cbor")
+    with pytest.raises(CodecUnavailableError):
+        init_dashboard_cache(logging.getLogger("test"))
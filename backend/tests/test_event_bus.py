@@ -1,3 +1,5 @@
+import asyncio
+import logging
 import sys
 from pathlib import Path
 
@@ -7,7 +9,7 @@ ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT))
 sys.path.insert(0, str(ROOT / "src"))
 
-from src.services.event_bus import AsyncEventBus, Event
+from src.services.event_bus import AsyncEventBus, Event, EventBusFullError
 
 
 @pytest.fixture
@@ -58,3 +60,687 @@ async def test_event_bus_idempotency():
 
     assert calls == 1
     assert bus.drain_and_get_dlq() == []
+
+
+def test_memory_idempotency_store_bounds_keys_by_ttl_and_size():
+    from src.services.idempotency import MemoryIdempotencyStore
+
+    now = [0.0]
+    store = MemoryIdempotencyStore(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+
+    store.mark("a")
+    store.mark("b")
+    store.mark("c")
+    assert not store.seen("a")
+    assert store.seen("b") and store.seen("c")
+
+    now[0] = 10.0
+    assert not store.seen("b")
+    assert store.stats() == {"size": 0, "duplicates": 2, "evictions_ttl": 2, "evictions_size": 1}
+
+
+@pytest.mark.anyio
+async def test_sqlite_idempotency_store_is_shared_between_buses(tmp_path):
+    from src.services.idempotency import SQLiteIdempotencyStore
+
+    path = str(tmp_path / "keys.db")
+    calls = 0
+
+    async def handler(event: Event) -> None:
+        nonlocal calls
+        calls += 1
+
+    buses = [
+        AsyncEventBus(idempotency=SQLiteIdempotencyStore(path, max_entries=1, prune_every=1))
+        for _ in range(2)
+    ]
+    for bus in buses:
+        bus.register("once", handler)
+
+    await buses[0].publish(Event(name="once", payload={}, trace_id="t1", idempotency_key="k1"))
+    await buses[1].publish(Event(name="once", payload={}, trace_id="t1", idempotency_key="k1"))
+    assert calls == 1
+
+    await buses[1].publish(Event(name="once", payload={}, trace_id="t2", idempotency_key="k2"))
+    assert len(buses[0].idempotency) == 1
+    assert not buses[0].idempotency.seen("k1")
+
+
+@pytest.mark.anyio
+async def test_redis_idempotency_store_marks_with_one_set_nx_off_the_loop():
+    import threading
+
+    from src.services.idempotency import RedisIdempotencyStore
+
+    class KeyRedis:
+        def __init__(self) -> None:
+            self.store: dict[str, tuple[bytes, int]] = {}
+            self.commands: list[tuple[str, bool]] = []
+
+        def _log(self, name: str) -> None:
+            self.commands.append((name, threading.current_thread() is threading.main_thread()))
+
+        def exists(self, key: str) -> int:
+            self._log("exists")
+            return int(key in self.store)
+
+        def set(self, key: str, value: bytes, nx: bool = False, px: int | None = None):
+            self._log("set")
+            if nx and key in self.store:
+                return None
+            self.store[key] = (value, px)
+            return True
+
+        def scan_iter(self, match: str, count: int = 10):
+            return (key for key in self.store if key.startswith(match.rstrip("*")))
+
+    redis = KeyRedis()
+    calls = 0
+
+    async def handler(event: Event) -> None:
+        nonlocal calls
+        calls += 1
+
+    buses = [
+        AsyncEventBus(idempotency=RedisIdempotencyStore(redis, ttl_seconds=60)) for _ in range(2)
+    ]
+    for bus in buses:
+        bus.register("once", handler)
+    for bus in buses:
+        await bus.publish(Event(name="once", payload={}, trace_id="t1", idempotency_key="k1"))
+
+    assert calls == 1
+    assert redis.store == {"event_bus:processed:k1": (b"1", 60_000)}
+    # one round trip per check and per mark, none of them on the event loop thread
+    assert redis.commands == [("exists", False), ("set", False), ("exists", False)]
+    assert buses[1].idempotency.stats()["duplicates"] == 1
+    assert len(buses[0].idempotency) == 1
+
+    # a mark that loses a race with another worker counts as a duplicate
+    buses[0].idempotency.mark("k1")
+    assert buses[0].idempotency.stats()["duplicates"] == 1
+
+
+def test_redis_idempotency_store_uses_the_pooled_client_and_checks_the_bound(
+    monkeypatch, caplog
+):
+    from src.services import idempotency
+
+    class ConfigRedis:
+        def __init__(self, config) -> None:
+            self.config = config
+
+        def config_get(self, pattern: str):
+            if self.config is None:
+                raise PermissionError("unknown command 'CONFIG'")
+            return self.config
+
+    clients: list[ConfigRedis] = []
+
+    def connect_redis(redis_url: str, logger) -> ConfigRedis:
+        return clients.pop(0)
+
+    monkeypatch.setenv("EVENT_IDEMPOTENCY_BACKEND", "redis")
+    monkeypatch.setenv("REDIS_URL", "redis://localhost:6379/0")
+    monkeypatch.setattr(idempotency, "connect_redis", connect_redis)
+    logger = logging.getLogger("idempotency-test")
+    clients.extend(
+        [
+            ConfigRedis({b"maxmemory": b"104857600", b"maxmemory-policy": b"volatile-ttl"}),
+            ConfigRedis({b"maxmemory": b"0", b"maxmemory-policy": b"noeviction"}),
+            ConfigRedis(None),
+        ]
+    )
+    with caplog.at_level(logging.WARNING, logger="idempotency-test"):
+        stores = [idempotency.init_idempotency_store(logger) for _ in range(3)]
+
+    assert all(isinstance(store, idempotency.RedisIdempotencyStore) for store in stores)
+    # only the unbounded server and the one hiding its config are reported
+    assert [record.getMessage() for record in caplog.records] == [
+        "idempotency.redis_unbounded",
+        "idempotency.redis_bound_unknown",
+    ]
+
+
+@pytest.mark.anyio
+async def test_idempotency_checks_of_concurrent_publishers_overlap():
+    import time
+
+    from src.services.idempotency import MemoryIdempotencyStore
+
+    class SlowStore(MemoryIdempotencyStore):
+        blocking = True
+
+        def seen(self, key: str) -> bool:
+            time.sleep(0.1)
+            return MemoryIdempotencyStore.seen(self, key)
+
+    async def handler(event: Event) -> None:
+        return None
+
+    bus = AsyncEventBus(idempotency=SlowStore(), workers=2)
+    bus.register("diary", handler)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.gather(
+        *(
+            bus.publish(
+                Event(
+                    name="diary",
+                    payload={"user": f"u{idx}"},
+                    trace_id="t",
+                    idempotency_key=f"k{idx}",
+                )
+            )
+            for idx in range(4)
+        )
+    )
+    elapsed = loop.time() - started
+    await bus.stop(timeout=1)
+
+    # four 100 ms checks run side by side instead of one after the other
+    assert elapsed < 0.3
+    assert len(bus.idempotency) == 4
+
+
+@pytest.mark.anyio
+async def test_worker_mode_publish_returns_before_handlers_and_stop_drains():
+    bus = AsyncEventBus(workers=2, max_queue=4)
+    gate = asyncio.Event()
+    handled: list[str] = []
+
+    async def first(event: Event) -> None:
+        await gate.wait()
+        handled.append(event.trace_id)
+        await bus.publish(Event(name="second", payload={}, trace_id=event.trace_id))
+
+    async def second(event: Event) -> None:
+        handled.append(f"{event.trace_id}:second")
+
+    bus.register("first", first)
+    bus.register("second", second)
+
+    for idx in range(3):
+        await bus.publish(Event(name="first", payload={}, trace_id=f"t{idx}"))
+    assert handled == []
+
+    gate.set()
+    await bus.stop(timeout=1)
+
+    assert sorted(handled) == ["t0", "t0:second", "t1", "t1:second", "t2", "t2:second"]
+    with pytest.raises(EventBusFullError):
+        await bus.publish(Event(name="first", payload={}, trace_id="late"))
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("overflow", ["drop", "reject"])
+async def test_worker_mode_overflow_policies(overflow):
+    bus = AsyncEventBus(workers=1, max_queue=1, overflow=overflow)
+    gate = asyncio.Event()
+    handled: list[str] = []
+
+    async def slow(event: Event) -> None:
+        await gate.wait()
+        handled.append(event.trace_id)
+
+    bus.register("slow", slow)
+    await bus.publish(Event(name="slow", payload={}, trace_id="in-flight"))
+    await asyncio.sleep(0)  # let the consumer take the first event
+    await bus.publish(Event(name="slow", payload={}, trace_id="queued"))
+
+    if overflow == "reject":
+        with pytest.raises(EventBusFullError):
+            await bus.publish(Event(name="slow", payload={}, trace_id="overflow"))
+    else:
+        await bus.publish(Event(name="slow", payload={}, trace_id="overflow"))
+
+    gate.set()
+    await bus.stop(timeout=1)
+    assert handled == ["in-flight", "queued"]
+
+
+@pytest.mark.anyio
+async def test_worker_mode_keeps_order_per_user_and_runs_users_concurrently():
+    bus = AsyncEventBus(workers=4, partitions=16)
+    seen: dict[str, list[int]] = {}
+    active = 0
+    peak = 0
+
+    async def handler(event: Event) -> None:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.001 * (event.payload["seq"] % 3))
+        seen.setdefault(event.payload["user"], []).append(event.payload["seq"])
+        active -= 1
+
+    bus.register("diary", handler)
+    for seq in range(5):
+        for user in ("ana", "bia", "caio", "duda"):
+            payload = {"user": user, "seq": seq}
+            await bus.publish(Event(name="diary", payload=payload, trace_id=f"{user}-{seq}"))
+    await bus.stop(timeout=1)
+
+    assert seen == {user: [0, 1, 2, 3, 4] for user in ("ana", "bia", "caio", "duda")}
+    assert peak > 1
+
+
+@pytest.mark.anyio
+async def test_journal_recovers_unfinished_events_after_restart(tmp_path):
+    from src.services.event_log import EventJournal
+
+    path = str(tmp_path / "events.db")
+    never = asyncio.Event()
+    handled: list[int] = []
+
+    async def stuck_after_first(event: Event) -> None:
+        if event.payload["seq"] > 0:
+            await never.wait()
+        handled.append(event.payload["seq"])
+
+    bus = AsyncEventBus(workers=1, journal=EventJournal(path, flush_interval_ms=1))
+    bus.register("diary", stuck_after_first)
+    for seq in range(3):
+        await bus.publish(Event(name="diary", payload={"user": "ana", "seq": seq}, trace_id="t"))
+    await bus.stop(timeout=0.05)  # the worker dies with seq 1 in flight and seq 2 queued
+    assert handled == [0]
+
+    async def record(event: Event) -> None:
+        handled.append(event.payload["seq"])
+
+    journal = EventJournal(path, flush_interval_ms=1)
+    restarted = AsyncEventBus(workers=1, journal=journal)
+    restarted.register("diary", record)
+    assert await restarted.recover() == 2
+    await restarted.stop(timeout=1)
+
+    assert handled == [0, 1, 2]
+    assert journal.stats()["checkpoint"] == 3
+    assert EventJournal(path).pending() == []
+
+
+@pytest.mark.anyio
+async def test_journal_dead_letters_can_be_listed_and_replayed(tmp_path):
+    from src.services.cli import list_dead_letters, replay_dead_letters
+    from src.services.event_log import EventJournal
+
+    path = str(tmp_path / "events.db")
+    healthy = False
+
+    async def flaky(event: Event) -> None:
+        if not healthy:
+            raise RuntimeError("banco indisponível")
+
+    bus = AsyncEventBus(workers=1, journal=EventJournal(path, flush_interval_ms=1))
+    bus.register("calc.requested", flaky)
+    for user in ("ana", "bia"):
+        payload = {"user": user}
+        await bus.publish(
+            Event(name="calc.requested", payload=payload, trace_id=user, max_attempts=2)
+        )
+    await bus.stop(timeout=1)
+
+    journal = EventJournal(path)
+    entries = list_dead_letters(journal)
+    assert [(entry["payload"], entry["error"]) for entry in entries] == [
+        ({"user": "ana"}, "banco indisponível"),
+        ({"user": "bia"}, "banco indisponível"),
+    ]
+
+    healthy = True
+    replay_bus = AsyncEventBus()
+    replay_bus.register("calc.requested", flaky)
+    assert await replay_dead_letters(journal, replay_bus) == (2, 0)
+    assert list_dead_letters(journal) == []
+
+
+@pytest.mark.anyio
+async def test_failed_journal_write_does_not_hold_the_checkpoint_back(tmp_path, caplog):
+    from src.services.event_log import EventJournal
+
+    logger = logging.getLogger("test.event_log")
+    journal = EventJournal(str(tmp_path / "events.db"), flush_interval_ms=1, logger=logger)
+    write = journal._write
+
+    def broken(*args):
+        raise OSError("disco cheio")
+
+    journal._write = broken
+    caplog.set_level(logging.ERROR, logger="test.event_log")
+    with pytest.raises(OSError):
+        await journal.append(Event(name="diary", payload={"user": "ana"}, trace_id="t"))
+
+    # background flushes that fail are logged instead of vanishing with their task
+    await asyncio.sleep(0.01)
+    assert [record.msg for record in caplog.records] == ["event_log.flush_failed"]
+
+    journal._write = write
+    offset = await journal.append(Event(name="diary", payload={"user": "bia"}, trace_id="t"))
+    journal.ack(offset)
+    await journal.flush()
+    assert journal.stats()["checkpoint"] == offset
+    await journal.close()
+
+
+def test_retry_policy_backs_off_exponentially_with_bounded_jitter():
+    import random
+
+    from src.services.event_bus import RetryPolicy
+
+    policy = RetryPolicy(base_delay_ms=100, max_delay_ms=1000, multiplier=2, jitter=0.5)
+    rng = random.Random(7)
+    delays = [policy.delay(attempt, rng) for attempt in range(1, 7)]
+
+    for attempt, delay in enumerate(delays, start=1):
+        ceiling = min(1.0, 0.1 * 2 ** (attempt - 1))
+        assert ceiling / 2 <= delay <= ceiling
+    assert RetryPolicy(base_delay_ms=100, jitter=0).delay(3) == pytest.approx(0.4)
+
+
+def test_init_event_bus_validates_the_overflow_policy(monkeypatch):
+    from src.services.event_bus import init_event_bus
+
+    logger = logging.getLogger("event-bus-test")
+    monkeypatch.setenv("EVENT_BUS_OVERFLOW", " Drop ")
+    assert init_event_bus(logger, workers=0).overflow == "drop"
+
+    monkeypatch.setenv("EVENT_BUS_OVERFLOW", "spill")
+    with pytest.raises(ValueError, match="EVENT_BUS_OVERFLOW"):
+        init_event_bus(logger, workers=0)
+
+
+@pytest.mark.anyio
+async def test_worker_mode_delays_retries_without_blocking_other_users():
+    from src.services.event_bus import RetryPolicy
+
+    bus = AsyncEventBus(
+        workers=1,
+        retry_policies={"diary": RetryPolicy(base_delay_ms=50, jitter=0, max_attempts=3)},
+    )
+    timeline: list[tuple[str, int, float]] = []
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    async def handler(event: Event) -> None:
+        timeline.append((event.payload["user"], event.payload["seq"], loop.time() - started))
+        if event.payload["user"] == "ana" and event.payload["seq"] == 0 and event.attempt < 2:
+            raise RuntimeError("banco indisponível")
+
+    bus.register("diary", handler)
+    for user, seq in (("ana", 0), ("ana", 1), ("bia", 0)):
+        await bus.publish(Event(name="diary", payload={"user": user, "seq": seq}, trace_id="t"))
+    await bus.stop(timeout=1)
+
+    ana = [(seq, at) for user, seq, at in timeline if user == "ana"]
+    assert [seq for seq, _ in ana] == [0, 0, 0, 1]
+    # 50 ms then 100 ms of backoff; the single worker served bia in between
+    assert ana[1][1] - ana[0][1] >= 0.045 and ana[2][1] - ana[1][1] >= 0.095
+    bia_at = next(at for user, _, at in timeline if user == "bia")
+    assert bia_at < ana[1][1]
+    assert bus.drain_and_get_dlq() == []
+
+
+@pytest.mark.anyio
+async def test_worker_mode_delivers_batches_and_keeps_follow_ups_per_user():
+    from src.services.event_bus import RetryPolicy
+
+    bus = AsyncEventBus(workers=2, batch_wait_ms=20)
+    batches: list[list[str]] = []
+    chains: list[tuple[str, str]] = []
+
+    async def calc(events: list[Event]) -> None:
+        batches.append([event.payload["user"] for event in events])
+        if any(event.payload["user"] == "bad" and event.attempt == 0 for event in events):
+            raise RuntimeError("falha no lote")
+        for event in events:
+            await bus.publish(Event(name="coach", payload=event.payload, trace_id="t"))
+
+    async def coach(event: Event) -> None:
+        chains.append((event.payload["user"], "coach"))
+
+    bus.register_batch("calc", calc, max_batch=4)
+    bus.register("coach", coach)
+    for user in ("ana", "bia", "caio", "duda", "eva"):
+        await bus.publish(Event(name="calc", payload={"user": user}, trace_id="t"))
+    await bus.stop(timeout=1)
+
+    assert batches == [["ana", "bia", "caio", "duda"], ["eva"]]
+    assert sorted(chains) == [(user, "coach") for user in ("ana", "bia", "caio", "duda", "eva")]
+
+    # a failing batch is retried event by event, so the healthy users still go through
+    bus = AsyncEventBus(workers=1, batch_wait_ms=5, retry=RetryPolicy(base_delay_ms=1))
+    bus.register_batch("calc", calc)
+    bus.register("coach", coach)
+    chains.clear()
+    batches.clear()
+    for user in ("bad", "fine"):
+        await bus.publish(Event(name="calc", payload={"user": user}, trace_id="t"))
+    await bus.stop(timeout=1)
+
+    assert batches[0] == ["bad", "fine"]
+    assert sorted(batches[1:]) == [["bad"], ["fine"]]
+    assert sorted(chains) == [("bad", "coach"), ("fine", "coach")]
+    assert bus.drain_and_get_dlq() == []
+
+
+@pytest.mark.anyio
+async def test_user_without_a_plan_fails_only_its_own_event_in_a_calc_batch():
+    from dataclasses import replace
+
+    from src.agents.planner import PlannerAgent
+    from src.core.models import UserProfile
+    from src.core.orchestrator import Orchestrator
+    from src.core.serialization import plan_from_json, profile_to_json
+    from src.database.memory import MemoryRepository
+    from src.services.event_bus import RetryPolicy
+
+    profile = UserProfile(
+        name="template",
+        age=35,
+        weight_kg=72,
+        height_cm=175,
+        sex="female",
+        activity_level="moderate",
+        goal="maintain",
+        systolic_bp=118,
+        diastolic_bp=76,
+        sodium_mg=1600,
+    )
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(profile)}))["plan"])
+    repository = MemoryRepository()
+    for user in ("ana", "bia", "sem_plano"):
+        repository.upsert_profile(replace(profile, name=user))
+    for user in ("ana", "bia"):
+        repository.save_plan(replace(plan, user=user))
+    bus = AsyncEventBus(
+        workers=1,
+        batch_wait_ms=20,
+        retry=RetryPolicy(base_delay_ms=1, jitter=0, max_attempts=2),
+    )
+    Orchestrator(logging.getLogger("worker"), repository=repository, event_bus=bus)
+
+    events = [
+        Event(name="calc.requested", payload={"user": user}, trace_id=f"t-{user}")
+        for user in ("ana", "sem_plano", "bia")
+    ]
+    for event in events:
+        await bus.publish(event)
+    await bus.stop(timeout=2)
+
+    ana, sem_plano, bia = events
+    # the healthy users were handled once, in the shared batch, without a retry
+    assert (ana.attempt, bia.attempt) == (0, 0)
+    assert repository.dashboard("ana") is not None
+    assert repository.dashboard("bia") is not None
+    assert [(event.payload, error) for event, error in bus.drain_and_get_dlq()] == [
+        ({"user": "sem_plano"}, "Nenhum plano cadastrado")
+    ]
+    assert sem_plano.attempt == 2
+
+
+@pytest.mark.anyio
+async def test_failed_pipeline_queue_flush_is_logged_and_retried(tmp_path, caplog, monkeypatch):
+    from src.services import pipeline_queue
+
+    monkeypatch.setattr(pipeline_queue, "FLUSH_RETRY_SECONDS", 0.02)
+    logger = logging.getLogger("test.pipeline_queue")
+    path = str(tmp_path / "pipeline.db")
+    await pipeline_queue.PipelineQueue(path).put(
+        Event(name="calc", payload={"user": "ana"}, trace_id="t")
+    )
+    queue = pipeline_queue.PipelineQueue(path, flush_interval_ms=1, logger=logger)
+    (job,) = await queue.claim(10)
+    write = queue._write
+    attempts: list[int] = []
+
+    def broken_once(*args):
+        attempts.append(len(attempts))
+        if len(attempts) == 1:
+            raise OSError("disco cheio")
+        write(*args)
+
+    queue._write = broken_once
+    caplog.set_level(logging.ERROR, logger="test.pipeline_queue")
+    queue.ack(job.metadata["offset"])
+    await asyncio.sleep(0.1)
+
+    # the timer flush that failed is logged and a later one deletes the acked job
+    assert [record.msg for record in caplog.records] == ["pipeline_queue.flush_failed"]
+    assert len(attempts) == 2
+    assert queue.stats() == {"queued": 0, "leased": 0, "dead_letters": 0}
+    await queue.close()
+
+
+@pytest.mark.anyio
+async def test_pipeline_queue_leases_the_oldest_job_per_user_across_workers(tmp_path):
+    from src.services.pipeline_queue import PipelineQueue
+
+    path = str(tmp_path / "pipeline.db")
+    api = PipelineQueue(path)
+    first = PipelineQueue(path, lease_seconds=0.2, worker_id="worker-1")
+    second = PipelineQueue(path, lease_seconds=0.2, worker_id="worker-2")
+    for user, seq in (("ana", 0), ("ana", 1), ("bia", 0)):
+        await api.put(Event(name="calc", payload={"user": user, "seq": seq}, trace_id="t"))
+
+    claimed = await first.claim(10)
+    assert [(event.payload["user"], event.payload["seq"]) for event in claimed] == [
+        ("ana", 0),
+        ("bia", 0),
+    ]
+    # ana's next job waits until her first one is acked
+    assert await second.claim(10) == []
+    first.ack(claimed[0].metadata["offset"])
+    await first.flush()
+    (next_job,) = await second.claim(10)
+    assert next_job.payload["seq"] == 1
+    second.ack(next_job.metadata["offset"])
+    await second.flush()
+
+    # bia's job is claimed again once worker-1 stops renewing its lease
+    await asyncio.sleep(0.25)
+    assert [event.payload["user"] for event in await second.claim(10)] == ["bia"]
+    second.dead_letter(claimed[1].metadata["offset"], claimed[1], "calc", "falhou")
+    await second.flush()
+    assert api.stats() == {"queued": 0, "leased": 0, "dead_letters": 1}
+
+    # dead letters can be listed and handed back to the workers
+    from src.services.cli import list_dead_letters, requeue_dead_letters
+
+    await api.put(Event(name="calc", payload={"user": "bia", "seq": 1}, trace_id="t"))
+    assert [(entry["payload"], entry["error"]) for entry in list_dead_letters(api)] == [
+        ({"user": "bia", "seq": 0}, "falhou")
+    ]
+    assert requeue_dead_letters(api) == 1
+    assert api.stats() == {"queued": 2, "leased": 0, "dead_letters": 0}
+    # the requeued job goes behind the job bia got meanwhile
+    assert [event.payload["seq"] for event in await second.claim(10)] == [1]
+
+
+@pytest.mark.anyio
+async def test_api_only_enqueues_and_worker_process_builds_dashboards(tmp_path):
+    from dataclasses import replace
+
+    from src.agents.planner import PlannerAgent
+    from src.app.worker import run_worker
+    from src.core.models import UserProfile
+    from src.core.orchestrator import Orchestrator
+    from src.core.serialization import plan_from_json, profile_to_json
+    from src.database.memory import MemoryRepository
+    from src.services.pipeline_queue import PipelineQueue
+
+    profile = UserProfile(
+        name="template",
+        age=35,
+        weight_kg=72,
+        height_cm=175,
+        sex="female",
+        activity_level="moderate",
+        goal="maintain",
+        systolic_bp=118,
+        diastolic_bp=76,
+        sodium_mg=1600,
+    )
+    plan = plan_from_json((await PlannerAgent()({"profile": profile_to_json(profile)}))["plan"])
+    repository = MemoryRepository()
+    for user in ("ana", "bia"):
+        repository.upsert_profile(replace(profile, name=user))
+        repository.save_plan(replace(plan, user=user))
+
+    path = str(tmp_path / "pipeline.db")
+    api = Orchestrator(
+        logging.getLogger("api"),
+        repository=repository,
+        event_bus=AsyncEventBus(outbox=PipelineQueue(path)),
+    )
+    for user in ("ana", "bia"):
+        await api.ingest_diary(user, ["almoço: 120g frango grelhado e 150g arroz integral"])
+    assert repository.dashboard("ana") is None
+    assert PipelineQueue(path).stats()["queued"] == 2
+
+    queue = PipelineQueue(path, worker_id="worker-1")
+    worker = Orchestrator(
+        logging.getLogger("worker"),
+        repository=repository,
+        event_bus=AsyncEventBus(workers=2, journal=queue),
+    )
+    stop = asyncio.Event()
+    task = asyncio.create_task(run_worker(worker, queue, stop, poll_interval=0.01))
+    while repository.dashboard("bia") is None or repository.dashboard("ana") is None:
+        await asyncio.sleep(0.01)
+    stop.set()
+    assert await task == 2
+    assert queue.release() == 0
+    assert queue.stats() == {"queued": 0, "leased": 0, "dead_letters": 0}
+
+
+@pytest.mark.anyio
+async def test_worker_renews_leases_while_a_job_runs(tmp_path):
+    from types import SimpleNamespace
+
+    from src.app.worker import run_worker
+    from src.services.pipeline_queue import PipelineQueue
+
+    path = str(tmp_path / "pipeline.db")
+    await PipelineQueue(path).put(Event(name="calc", payload={"user": "ana"}, trace_id="t"))
+    queue = PipelineQueue(path, lease_seconds=0.15, worker_id="worker-1")
+    release = asyncio.Event()
+
+    async def slow(event: Event) -> None:
+        await release.wait()
+
+    bus = AsyncEventBus(workers=1, journal=queue)
+    bus.register("calc", slow)
+    stop = asyncio.Event()
+    worker = SimpleNamespace(event_bus=bus, logger=logging.getLogger("worker"))
+    task = asyncio.create_task(run_worker(worker, queue, stop, poll_interval=0.01))
+
+    # well past the lease: the job is still held, so no other worker can take it
+    await asyncio.sleep(0.4)
+    assert await PipelineQueue(path, worker_id="worker-2").claim(10) == []
+    stop.set()
+    await asyncio.sleep(0.3)
+    assert await PipelineQueue(path, worker_id="worker-2").claim(10) == []
+
+    release.set()
+    assert await task == 1
+    assert queue.stats() == {"queued": 0, "leased": 0, "dead_letters": 0}
@@ -1,4 +1,6 @@
+import json
 import pathlib
+from datetime import datetime
 
 import pytest
 from sqlalchemy import create_engine, select
@@ -21,3 +23,144 @@ async def test_migrate_seed_and_healthcheck(tmp_path: pathlib.Path, monkeypatch:
         limits = conn.execute(select(ClinicalLimitRecord).limit(1)).first()
     assert enums is not None
     assert limits is not None
+
+
+def test_plan_version_migration_numbers_existing_plans(tmp_path: pathlib.Path) -> None:
+    from alembic import command
+    from sqlalchemy import text
+
+    from src.database.cli import _config
+
+    db_url = f"sqlite+pysqlite:///{tmp_path}/plans.db"
+    config = _config(db_url)
+    command.upgrade(config, "20240601_0001")
+    engine = create_engine(db_url, future=True)
+    with engine.begin() as conn:
+        for plan_id, created_at in (("b", "2024-06-02"), ("a", "2024-06-01"), ("c", "2024-06-03")):
+            conn.execute(
+                text(
+                    'INSERT INTO nutrition_plans (id, "user", payload, created_at) '
+                    "VALUES (:id, 'u', '{}', :created_at)"
+                ),
+                {"id": plan_id, "created_at": created_at},
+            )
+
+    command.upgrade(config, "head")
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, version FROM nutrition_plans ORDER BY version")).all()
+    assert [tuple(row) for row in rows] == [("a", 1), ("b", 2), ("c", 3)]
+
+    command.downgrade(config, "20240601_0001")
+
+
+def test_daily_summary_migration_backfills_existing_logs(tmp_path: pathlib.Path) -> None:
+    from alembic import command
+    from sqlalchemy import text
+
+    from src.agents.calc import summarize_logs
+    from src.core.models import DailyLog, FoodPortion, MealEntry
+    from src.core.serialization import log_to_json
+    from src.database.cli import _config
+
+    db_url = f"sqlite+pysqlite:///{tmp_path}/summaries.db"
+    config = _config(db_url)
+    command.upgrade(config, "20241016_0002")
+    engine = create_engine(db_url, future=True)
+    logs = []
+    with engine.begin() as conn:
+        for log_id, hour in (("l1", 8), ("l2", 19)):
+            when = datetime(2024, 6, 3, hour)
+            log = DailyLog(
+                user="u",
+                date=when,
+                meals=[
+                    MealEntry(
+                        timestamp=when,
+                        description="meal",
+                        items=[
+                            FoodPortion(label="water", quantity=500, unit="ml"),
+                            FoodPortion(label="grilled chicken", quantity=120, unit="g"),
+                            FoodPortion(label="brown rice", quantity=1, unit="cup"),
+                        ],
+                    )
+                ],
+            )
+            logs.append(log)
+            conn.execute(
+                text(
+                    'INSERT INTO daily_logs (id, "user", log_date, payload) '
+                    "VALUES (:id, 'u', :log_date, :payload)"
+                ),
+                {"id": log_id, "log_date": when, "payload": json.dumps(log_to_json(log))},
+            )
+
+    command.upgrade(config, "head")
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                'SELECT "user", summary_date, calories_total, sodium_total, hydration_total, '
+                "log_count FROM daily_summaries"
+            )
+        ).all()
+    # the migration carries its own copy of the rollup; it must agree with the runtime one
+    (expected,) = summarize_logs(logs)
+    assert [tuple(row) for row in rows] == [
+        ("u", "2024-06-03", expected.macros.calories, expected.micros.sodium_mg, 1.48, 2)
+    ]
+
+    from sqlalchemy import inspect
+
+    from src.database.models import DailySummaryRecord
+
+    # the migrated table carries the model's NOT NULL constraints
+    migrated = inspect(engine).get_columns("daily_summaries")
+    assert {column["name"]: column["nullable"] for column in migrated} == {
+        column.name: column.nullable for column in DailySummaryRecord.__table__.columns
+    }
+
+
+def test_history_queries_use_composite_indexes(tmp_path: pathlib.Path) -> None:
+    from alembic import command
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    from src.database import operations
+    from src.database.cli import _config
+
+    db_url = f"sqlite+pysqlite:///{tmp_path}/plans.db"
+    command.upgrade(_config(db_url), "head")
+    engine = create_engine(db_url, future=True)
+    captured: list[tuple[str, object]] = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _capture(conn, cursor, statement, parameters, context, executemany):  # noqa: ANN001
+        captured.append((statement, parameters))
+
+    with Session(engine) as session:
+        queries = {
+            "logs": lambda: operations.logs(session, "u"),
+            "recent_logs": lambda: operations.recent_logs(session, "u", 30),
+            "logs_page": lambda: operations.logs_page(
+                session, "u", (datetime(2024, 6, 1), "id"), 50
+            ),
+            "latest_plan": lambda: operations.latest_plan(session, "u"),
+            "recent_summaries": lambda: operations.recent_summaries(session, "u", 30),
+        }
+        expected_index = {
+            "logs": "ix_daily_logs_user_log_date",
+            "recent_logs": "ix_daily_logs_user_log_date",
+            "logs_page": "ix_daily_logs_user_log_date",
+            "latest_plan": "uq_nutrition_plans_user_version",
+            "recent_summaries": "uq_daily_summaries_user_date",
+        }
+        for name, query in queries.items():
+            captured.clear()
+            query()
+            statement, parameters = captured[-1]
+            with engine.connect() as conn:
+                plan = " | ".join(
+                    row[-1]
+                    for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                )
+            assert expected_index[name] in plan, f"{name}: {plan}"
+            assert "TEMP B-TREE" not in plan, f"{name} sorts in memory: {plan}"
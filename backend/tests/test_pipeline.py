@@ -0,0 +1,148 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import pytest
+
+from src.core.cache import StageResultCache
+from src.core.pipeline import Stage, StageGraph
+
+
+@dataclass
+class _State:
+    source: int = 1
+    left: int | None = None
+    right: int | None = None
+    total: int | None = None
+    events: list[str] = field(default_factory=list)
+
+
+def _graph(executor=None, delay: float = 0.02) -> StageGraph:
+    async def left(state: _State, trace_id: str) -> None:
+        state.events.append("left:start")
+        await asyncio.sleep(delay)
+        state.left = state.source + 1
+        state.events.append("left:end")
+
+    async def right(state: _State, trace_id: str) -> None:
+        state.events.append("right:start")
+        await asyncio.sleep(delay * 2)
+        state.right = state.source * 10
+        state.events.append("right:end")
+
+    def total(state: _State, trace_id: str) -> None:
+        state.total = (state.left or 0) + (state.right or 0)
+        state.events.append(f"total:{threading.current_thread().name}")
+
+    return StageGraph(
+        [
+            Stage("total", frozenset({"left", "right"}), frozenset({"total"}), total, cpu_bound=True),
+            Stage("left", frozenset({"source"}), frozenset({"left"}), left),
+            Stage("right", frozenset({"source"}), frozenset({"right"}), right),
+        ],
+        executor=executor,
+    )
+
+
+@pytest.mark.anyio
+async def test_independent_stages_run_concurrently_and_report_critical_path():
+    graph = _graph()
+    state = _State()
+
+    run = await graph.run(state, "trace-dag")
+
+    assert state.total == 12
+    assert state.events[:2] == ["left:start", "right:start"]
+    assert graph.dependencies("total") == frozenset({"left", "right"})
+    assert run.critical_path == ["right", "total"]
+    assert run.wall_ms < run.timings["left"].duration_ms + run.timings["right"].duration_ms
+
+
+@pytest.mark.anyio
+async def test_selected_stages_and_executor_offload():
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="stage-test") as executor:
+        graph = _graph(executor=executor, delay=0)
+        state = _State(left=1, right=2)
+
+        run = await graph.run(state, "trace-subset", stages=["total"])
+
+    assert state.total == 3
+    assert list(run.timings) == ["total"]
+    assert state.events == ["total:stage-test_0"]
+
+
+@pytest.mark.anyio
+async def test_independent_cpu_bound_stages_overlap_without_an_executor():
+    both_running = threading.Barrier(2, timeout=1)
+    loop_threads: list[bool] = []
+
+    def left(state: _State, trace_id: str) -> None:
+        both_running.wait()  # raises unless right runs at the same time
+        state.left = 1
+
+    def right(state: _State, trace_id: str) -> None:
+        both_running.wait()
+        state.right = 2
+
+    async def total(state: _State, trace_id: str) -> None:
+        loop_threads.append(threading.current_thread() is threading.main_thread())
+        state.total = state.left + state.right
+
+    graph = StageGraph(
+        [
+            Stage("left", frozenset({"source"}), frozenset({"left"}), left, cpu_bound=True),
+            Stage("right", frozenset({"source"}), frozenset({"right"}), right, cpu_bound=True),
+            Stage("total", frozenset({"left", "right"}), frozenset({"total"}), total),
+        ]
+    )
+    state = _State()
+
+    await graph.run(state, "trace-cpu")
+
+    assert state.total == 3
+    assert loop_threads == [True]  # async stages stay on the running loop
+
+
+def test_graph_rejects_cycles_and_duplicate_writers():
+    async def noop(state, trace_id):
+        return None
+
+    with pytest.raises(ValueError):
+        StageGraph(
+            [
+                Stage("a", frozenset({"y"}), frozenset({"x"}), noop),
+                Stage("b", frozenset({"x"}), frozenset({"y"}), noop),
+            ]
+        )
+    with pytest.raises(ValueError):
+        StageGraph(
+            [
+                Stage("a", frozenset(), frozenset({"x"}), noop),
+                Stage("b", frozenset(), frozenset({"x"}), noop),
+            ]
+        )
+
+
+@pytest.mark.anyio
+async def test_memoized_stage_skips_work_for_identical_inputs():
+    calls: list[int] = []
+
+    async def double(state: _State, trace_id: str) -> None:
+        calls.append(state.source)
+        state.left = state.source * 2
+
+    memo = StageResultCache(max_entries=1)
+    graph = StageGraph(
+        [Stage("double", frozenset({"source"}), frozenset({"left"}), double, memoize=True)],
+        memo=memo,
+    )
+
+    first, second, third = _State(source=2), _State(source=2), _State(source=3)
+    await graph.run(first, "t1")
+    run = await graph.run(second, "t2")
+    await graph.run(third, "t3")
+
+    assert calls == [2, 3]
+    assert second.left == 4 and run.memoized == ["double"]
+    assert memo.stats()["double"] == {"hits": 1, "misses": 2, "evictions": 1}